@@ -10,92 +10,421 @@ PDF图片提取工具
 import os
 import fitz  # PyMuPDF (注意：PyMuPDF在Python中的导入名称是fitz)
 import json
-import numpy as np
-from PIL import Image, ImageChops
-from io import BytesIO
-import hashlib
-from collections import defaultdict
+import xxhash
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
 
+# numpy和PIL导入开销较大，在实际需要处理图像的函数中再导入
 
-def is_similar_image(img1, img2, threshold=0.9):
+
+# pHash参数：缩放到32x32后做DCT，取左上角8x8低频系数生成64位指纹
+PHASH_IMAGE_SIZE = 32
+PHASH_HASH_SIZE = 8
+
+
+@lru_cache(maxsize=None)
+def _dct_matrix(n):
     """
-    比较两个PIL图像是否相似
+    生成n阶DCT-II变换矩阵
     
     参数:
-        img1 (PIL.Image): 第一个图像
-        img2 (PIL.Image): 第二个图像
-        threshold (float): 相似度阈值，0-1之间，越高要求越严格
+        n (int): 矩阵阶数
         
     返回:
-        bool: 如果图像相似则返回True，否则返回False
+        numpy.ndarray: 形状为(n, n)的DCT变换矩阵
     """
-    # 确保两个图像大小相同
-    if img1.size != img2.size:
-        # 调整大小以便比较
-        img2 = img2.resize(img1.size, Image.LANCZOS)
+    import numpy as np
     
-    # 转换为相同模式
-    if img1.mode != img2.mode:
-        if 'A' in img1.mode:
-            img1 = img1.convert('RGBA')
-            img2 = img2.convert('RGBA')
-        else:
-            img1 = img1.convert('RGB')
-            img2 = img2.convert('RGB')
+    k = np.arange(n).reshape(-1, 1)
+    i = np.arange(n).reshape(1, -1)
+    matrix = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+    matrix[0, :] = np.sqrt(1.0 / n)
+    return matrix
+
+
+def compute_phash(pil_img):
+    """
+    计算图像的64位感知哈希（pHash）
     
-    # 计算差异
-    diff = ImageChops.difference(img1, img2)
+    参数:
+        pil_img (PIL.Image): 图像
+        
+    返回:
+        int: 64位无符号整数形式的pHash
+    """
+    import numpy as np
+    from PIL import Image
     
-    # 计算差异程度
-    diff_array = np.array(diff)
-    non_zero = np.count_nonzero(diff_array)
-    total_pixels = diff_array.size
+    gray = pil_img.convert("L").resize((PHASH_IMAGE_SIZE, PHASH_IMAGE_SIZE), Image.LANCZOS)
+    pixels = np.asarray(gray, dtype=np.float64)
     
-    # 计算相似度 (0-1)
-    similarity = 1 - (non_zero / total_pixels)
+    # 二维DCT，只保留低频部分
+    dct_matrix = _dct_matrix(PHASH_IMAGE_SIZE)
+    dct = dct_matrix @ pixels @ dct_matrix.T
+    low_freq = dct[:PHASH_HASH_SIZE, :PHASH_HASH_SIZE]
     
-    return similarity >= threshold
+    # 以中位数为阈值生成64位指纹
+    bits = (low_freq > np.median(low_freq)).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
 
 
-def is_contained_in(rect1, rect2, tolerance=0.9):
+def is_similar_image(hash1, hash2, max_distance=6):
     """
-    检查矩形1是否基本包含在矩形2中
+    根据pHash比较两个图像是否相似
     
     参数:
-        rect1 (tuple): 第一个矩形 (x0, y0, x1, y1)
-        rect2 (tuple): 第二个矩形 (x0, y0, x1, y1)
+        hash1 (int): 第一个图像的pHash
+        hash2 (int): 第二个图像的pHash
+        max_distance (int): 允许的最大汉明距离，64位中约6位对应0.9的相似度
+        
+    返回:
+        bool: 如果图像相似则返回True，否则返回False
+    """
+    return bin(hash1 ^ hash2).count("1") <= max_distance
+
+
+def compute_containment_matrix(rects, tolerance=0.9):
+    """
+    批量检查矩形之间的包含关系
+    
+    参数:
+        rects (numpy.ndarray): 形状为(N, 4)的矩形数组，每行为 (x0, y0, x1, y1)
         tolerance (float): 容差，0-1之间
         
     返回:
-        bool: 如果矩形1基本包含在矩形2中则返回True，否则返回False
+        numpy.ndarray: 形状为(N, N)的布尔矩阵，[i, j]为True表示矩形j基本包含在矩形i中
     """
-    x0_1, y0_1, x1_1, y1_1 = rect1
-    x0_2, y0_2, x1_2, y1_2 = rect2
+    import numpy as np
     
-    # 计算矩形1的面积
-    area1 = (x1_1 - x0_1) * (y1_1 - y0_1)
+    areas = (rects[:, 2] - rects[:, 0]) * (rects[:, 3] - rects[:, 1])
     
-    # 计算重叠区域
-    overlap_x0 = max(x0_1, x0_2)
-    overlap_y0 = max(y0_1, y0_2)
-    overlap_x1 = min(x1_1, x1_2)
-    overlap_y1 = min(y1_1, y1_2)
+    # 计算两两之间的重叠区域
+    overlap_x0 = np.maximum(rects[:, None, 0], rects[None, :, 0])
+    overlap_y0 = np.maximum(rects[:, None, 1], rects[None, :, 1])
+    overlap_x1 = np.minimum(rects[:, None, 2], rects[None, :, 2])
+    overlap_y1 = np.minimum(rects[:, None, 3], rects[None, :, 3])
+    overlap_area = np.clip(overlap_x1 - overlap_x0, 0, None) * np.clip(overlap_y1 - overlap_y0, 0, None)
     
-    # 检查是否有重叠
-    if overlap_x0 >= overlap_x1 or overlap_y0 >= overlap_y1:
-        return False
+    # 计算重叠面积占矩形j面积的比例（面积为0的矩形不视为被包含）
+    overlap_ratio = np.divide(overlap_area, areas[None, :],
+                              out=np.zeros_like(overlap_area), where=areas[None, :] > 0)
     
-    # 计算重叠面积
-    overlap_area = (overlap_x1 - overlap_x0) * (overlap_y1 - overlap_y0)
+    return overlap_ratio >= tolerance
+
+
+def compute_hash_similarity_matrix(hashes, max_distance=6):
+    """
+    批量比较pHash之间的相似关系
     
-    # 计算重叠比例
-    overlap_ratio = overlap_area / area1
+    参数:
+        hashes (list): 每个图像的pHash，没有pHash的图像为None
+        max_distance (int): 允许的最大汉明距离
+        
+    返回:
+        numpy.ndarray: 形状为(N, N)的布尔矩阵，[i, j]为True表示图像i和图像j相似
+    """
+    import numpy as np
     
-    return overlap_ratio >= tolerance
+    n = len(hashes)
+    has_hash = np.array([h is not None for h in hashes], dtype=bool)
+    values = np.array([h if h is not None else 0 for h in hashes], dtype=np.uint64)
+    
+    # 两两异或后统计不同的位数，即汉明距离
+    xor = values[:, None] ^ values[None, :]
+    distances = np.unpackbits(xor.view(np.uint8).reshape(n, n, 8), axis=2).sum(axis=2)
+    
+    return (distances <= max_distance) & has_hash[:, None] & has_hash[None, :]
+
+
+def compute_duplicate_candidates(infos):
+    """
+    根据尺寸和文件大小快速筛选可能重复的图像对
+    
+    尺寸（按16像素分桶）不同或文件大小（按KB计）相差超过4的图像不可能是重复图像，
+    无需比较pHash，也无需为其解码像素
+    
+    参数:
+        infos (list): 图片信息列表，需包含width、height和size_bytes
+        
+    返回:
+        numpy.ndarray: 形状为(N, N)的布尔矩阵，[i, j]为True表示图像i和图像j可能重复（对角线为False）
+    """
+    import numpy as np
+    
+    size_buckets = np.array([(info["width"] // 16, info["height"] // 16) for info in infos],
+                            dtype=np.int64).reshape(-1, 2)
+    bytes_buckets = np.array([info["size_bytes"] >> 10 for info in infos], dtype=np.int64)
+    
+    candidates = ((size_buckets[:, None, :] == size_buckets[None, :, :]).all(axis=2)
+                  & (np.abs(bytes_buckets[:, None] - bytes_buckets[None, :]) <= 4))
+    np.fill_diagonal(candidates, False)
+    
+    return candidates
+
+
+def suppress_overlapping_images(rects, hashes=None, filter_contained=True, max_distance=6, tolerance=0.9,
+                                candidates=None):
+    """
+    按面积从大到小贪心地过滤同一页面上重复或被包含的图像
+    
+    参数:
+        rects (numpy.ndarray): 形状为(N, 4)的矩形数组，每行为 (x0, y0, x1, y1)
+        hashes (list, 可选): 每个图像的pHash（没有pHash的图像为None），为None时不过滤重复图像
+        filter_contained (bool): 是否过滤被其他图像包含的图像
+        max_distance (int): 判定为重复图像的最大汉明距离
+        tolerance (float): 判定为包含关系的重叠比例
+        candidates (numpy.ndarray, 可选): compute_duplicate_candidates的结果，只有其中为True的图像对才可能判定为重复
+        
+    返回:
+        tuple: (按面积从大到小的处理顺序, 布尔保留掩码)
+    """
+    import numpy as np
+    
+    n = len(rects)
+    areas = (rects[:, 2] - rects[:, 0]) * (rects[:, 3] - rects[:, 1])
+    
+    # 按面积从大到小处理图像，较大的图像优先保留
+    order = np.argsort(-areas, kind="stable")
+    keep = np.ones(n, dtype=bool)
+    
+    # [i, j]为True表示保留图像i时应移除图像j：两者重复，或j被i包含
+    suppresses = np.zeros((n, n), dtype=bool)
+    if hashes is not None:
+        similar = compute_hash_similarity_matrix(hashes, max_distance)
+        if candidates is not None:
+            similar &= candidates
+        suppresses |= similar
+    if filter_contained:
+        suppresses |= compute_containment_matrix(rects, tolerance)
+    
+    # 只允许较早处理（面积较大）的图像移除较晚处理的图像
+    rank = np.empty(n, dtype=np.intp)
+    rank[order] = np.arange(n)
+    suppresses &= rank[:, None] < rank[None, :]
+    
+    for i in order:
+        if keep[i]:
+            keep &= ~suppresses[i]
+    
+    return order, keep
+
+
+def _decode_image(doc, xref):
+    """
+    提取指定xref的图片并读取其基本信息
+    
+    参数:
+        doc (fitz.Document): 已打开的PDF文档
+        xref (int): 图片的xref号
+    
+    返回:
+        dict: 图片字节、扩展名、宽度、高度、颜色模式、格式描述和XXH3哈希值，提取失败时返回None
+    """
+    from io import BytesIO
+    from PIL import Image
+    
+    base_image = doc.extract_image(xref)
+    if not base_image:
+        return None
+    
+    image_bytes = base_image["image"]
+    image_ext = base_image["ext"]
+    
+    # 使用PIL打开图片以获取更多信息（只读取文件头，不解码像素）
+    try:
+        with Image.open(BytesIO(image_bytes)) as pil_img:
+            width, height = pil_img.size
+            mode = pil_img.mode
+            format_desc = pil_img.format_description if hasattr(pil_img, 'format_description') else pil_img.format
+    except Exception as e:
+        # 如果无法用PIL打开，使用PyMuPDF提供的信息
+        width = base_image.get("width", 0)
+        height = base_image.get("height", 0)
+        mode = "Unknown"
+        format_desc = image_ext.upper()
+    
+    # 计算图片哈希值，用于唯一标识（非加密用途，使用更快的XXH3）
+    img_hash = xxhash.xxh3_64(image_bytes).hexdigest()
+    
+    return {
+        "bytes": image_bytes,
+        "ext": image_ext,
+        "width": width,
+        "height": height,
+        "mode": mode,
+        "format_desc": format_desc,
+        "hash": img_hash,
+    }
+
+
+def _get_phash(decoded):
+    """
+    获取已提取图片的pHash，首次调用时解码像素并缓存结果
+    
+    参数:
+        decoded (dict): _decode_image的返回值
+    
+    返回:
+        int: 图片的pHash，无法解码时返回None
+    """
+    from io import BytesIO
+    from PIL import Image
+    
+    if "phash" not in decoded:
+        try:
+            with Image.open(BytesIO(decoded["bytes"])) as pil_img:
+                decoded["phash"] = compute_phash(pil_img)
+        except Exception:
+            decoded["phash"] = None
+    return decoded["phash"]
+
+
+def _process_page(doc, page_index, output_dir=None, save_images=False, group_by_page=False,
+                  filter_duplicates=True, min_size=100, xref_cache=None):
+    """
+    提取单个页面上的图片及其过滤信息
+    
+    参数:
+        doc (fitz.Document): 已打开的PDF文档
+        page_index (int): 页码（从0开始）
+        xref_cache (dict, 可选): xref到解码结果的缓存，可在多个页面间共享
+        其余参数与extract_images_from_pdf相同
+    
+    返回:
+        tuple: (页面图片信息列表, 用于过滤的 (pHash, 矩形, 图片信息) 列表)
+    """
+    if xref_cache is None:
+        xref_cache = {}
+    
+    # 用于存储当前页面的图片信息
+    page_infos = []
+    
+    # 用于存储图像哈希和矩形，用于过滤重叠图像
+    page_bboxes = []
+    
+    page = doc[page_index]
+    
+    # 获取页面上的图片列表
+    image_list = page.get_images(full=True)
+    
+    # 按页码分组保存时，每页只创建一次子文件夹
+    page_dir = output_dir
+    if save_images and output_dir and group_by_page and image_list:
+        page_dir = os.path.join(output_dir, f"page_{page_index+1}")
+        os.makedirs(page_dir, exist_ok=True)
+    
+    # 遍历页面上的每个图片
+    for img_index, img in enumerate(image_list):
+        # 图片的基本信息
+        xref = img[0]  # 图片的xref号
+        
+        # 同一xref的图片只提取一次
+        if xref not in xref_cache:
+            xref_cache[xref] = _decode_image(doc, xref)
+        decoded = xref_cache[xref]
+        if decoded is None:
+            continue
+        
+        image_bytes = decoded["bytes"]
+        image_ext = decoded["ext"]
+        width = decoded["width"]
+        height = decoded["height"]
+        img_hash = decoded["hash"]
+        
+        # 收集图片信息
+        image_info = {
+            "page_index": page_index + 1,  # 页码（从1开始）
+            "img_index": img_index + 1,    # 图片在页面中的索引（从1开始）
+            "xref": xref,                  # 图片的xref号
+            "width": width,                # 宽度（像素）
+            "height": height,              # 高度（像素）
+            "format": image_ext,           # 格式（扩展名）
+            "format_description": decoded["format_desc"],  # 格式描述
+            "color_mode": decoded["mode"],  # 颜色模式
+            "size_bytes": len(image_bytes),  # 图片大小（字节）
+            "xxh3_hash": img_hash,         # XXH3-64哈希值
+        }
+        
+        # 如果需要保存图片
+        if save_images and output_dir:
+            # 确定保存路径
+            if group_by_page:
+                # 保存到按页码分组的子文件夹
+                filename = f"img{img_index+1}_{img_hash[:8]}.{image_ext}"
+                filepath = os.path.join(page_dir, filename)
+            else:
+                # 不分组，直接保存到输出目录
+                filename = f"page{page_index+1}_img{img_index+1}_{img_hash[:8]}.{image_ext}"
+                filepath = os.path.join(output_dir, filename)
+            
+            # 保存图片
+            with open(filepath, "wb") as f:
+                f.write(image_bytes)
+            
+            # 添加文件路径到图片信息
+            image_info["saved_path"] = filepath
+        
+        # 检查图像大小是否符合最小要求
+        if width * height < min_size:
+            continue
+            
+        # 添加到结果列表
+        page_infos.append(image_info)
+        
+        # 保存图像哈希和矩形信息，用于后续过滤
+        try:
+            # 获取图像在页面上的位置（如果有）
+            bbox = page.get_image_bbox(img)
+            if bbox:
+                x0, y0, x1, y1 = bbox
+                rect = (x0, y0, x1, y1)
+                page_bboxes.append((decoded, rect, image_info))
+        except Exception as e:
+            print(f"警告: 无法处理图像进行过滤: {e}")
+    
+    # 只为页面上存在可能重复对象的图像计算pHash，尺寸或大小明显不同的图像无需解码像素
+    needs_phash = [False] * len(page_bboxes)
+    if filter_duplicates and len(page_bboxes) > 1:
+        candidates = compute_duplicate_candidates([info for _, _, info in page_bboxes])
+        needs_phash = candidates.any(axis=1)
+    
+    page_bboxes = [(_get_phash(decoded) if need else None, rect, info)
+                   for need, (decoded, rect, info) in zip(needs_phash, page_bboxes)]
+    
+    return page_infos, page_bboxes
+
+
+# 工作进程中打开的PDF文档（PyMuPDF文档对象无法跨进程传递）及其xref解码缓存
+_worker_doc = None
+_worker_xref_cache = {}
+
+
+def _init_page_worker(pdf_path):
+    """
+    工作进程初始化函数，每个进程只打开一次PDF文档
+    
+    参数:
+        pdf_path (str): PDF文件的路径
+    """
+    global _worker_doc, _worker_xref_cache
+    _worker_doc = fitz.open(pdf_path)
+    _worker_xref_cache = {}
+
+
+def _process_page_in_worker(page_index, **options):
+    """
+    在工作进程中提取单个页面上的图片
+    
+    参数:
+        page_index (int): 页码（从0开始）
+        options: 传递给_process_page的其余参数
+    """
+    return _process_page(_worker_doc, page_index, xref_cache=_worker_xref_cache, **options)
 
 
 def extract_images_from_pdf(pdf_path, output_dir=None, save_images=False, group_by_page=False, 
-                           filter_duplicates=True, filter_contained=True, min_size=100):
+                           filter_duplicates=True, filter_contained=True, min_size=100,
+                           max_workers=None):
     """
     从PDF文件中提取所有图片及其信息
     
@@ -104,6 +433,7 @@ def extract_images_from_pdf(pdf_path, output_dir=None, save_images=False, group_
         output_dir (str, 可选): 保存图片的目录，如果save_images为True则必须提供
         save_images (bool, 可选): 是否将图片保存到文件系统，默认为False
         group_by_page (bool, 可选): 是否按页码分组创建子文件夹保存图片，默认为False
+        max_workers (int, 可选): 并行处理页面的进程数，默认为CPU核数（最多8个），为1时不使用进程池
     
     返回:
         list: 包含所有图片信息的列表，每个元素是一个字典，包含图片的页码、索引、尺寸、格式等信息
@@ -125,152 +455,66 @@ def extract_images_from_pdf(pdf_path, output_dir=None, save_images=False, group_
     
     # 打开PDF文件
     doc = fitz.open(pdf_path)
+    page_count = len(doc)
     
     # 用于存储所有图片信息的列表
     all_images = []
     
-    # 用于存储图像对象和矩形，用于过滤重叠图像
-    page_images = defaultdict(list)
-    
-    # 遍历PDF的每一页
-    for page_index in range(len(doc)):
-        page = doc[page_index]
-        
-        # 获取页面上的图片列表
-        image_list = page.get_images(full=True)
+    # 用于存储每页图像的哈希和矩形，用于过滤重叠图像
+    page_images = [[] for _ in range(page_count)]
+    
+    # 各页面互相独立，页数较多时使用进程池并行处理
+    if max_workers is None:
+        max_workers = min(os.cpu_count() or 1, 8)
+    
+    page_options = {
+        "output_dir": output_dir,
+        "save_images": save_images,
+        "group_by_page": group_by_page,
+        "filter_duplicates": filter_duplicates,
+        "min_size": min_size,
+    }
+    
+    if max_workers > 1 and page_count > 1:
+        # 子进程各自打开文档，主进程的文档不再需要
+        doc.close()
+        with ProcessPoolExecutor(max_workers=min(max_workers, page_count),
+                                 initializer=_init_page_worker,
+                                 initargs=(pdf_path,)) as executor:
+            page_results = executor.map(partial(_process_page_in_worker, **page_options),
+                                        range(page_count))
+            for page_index, (infos, bboxes) in enumerate(page_results):
+                all_images.extend(infos)
+                page_images[page_index] = bboxes
+    else:
+        # 遍历PDF的每一页，各页共享同一个xref解码缓存
+        xref_cache = {}
+        for page_index in range(page_count):
+            infos, bboxes = _process_page(doc, page_index, xref_cache=xref_cache, **page_options)
+            all_images.extend(infos)
+            page_images[page_index] = bboxes
         
-        # 遍历页面上的每个图片
-        for img_index, img in enumerate(image_list):
-            # 图片的基本信息
-            xref = img[0]  # 图片的xref号
-            base_image = doc.extract_image(xref)
-            
-            if base_image:
-                image_bytes = base_image["image"]
-                image_ext = base_image["ext"]
-                
-                # 使用PIL打开图片以获取更多信息
-                try:
-                    with Image.open(BytesIO(image_bytes)) as pil_img:
-                        width, height = pil_img.size
-                        mode = pil_img.mode
-                        format_desc = pil_img.format_description if hasattr(pil_img, 'format_description') else pil_img.format
-                except Exception as e:
-                    # 如果无法用PIL打开，使用PyMuPDF提供的信息
-                    width = base_image.get("width", 0)
-                    height = base_image.get("height", 0)
-                    mode = "Unknown"
-                    format_desc = image_ext.upper()
-                
-                # 计算图片哈希值，用于唯一标识
-                img_hash = hashlib.md5(image_bytes).hexdigest()
-                
-                # 收集图片信息
-                image_info = {
-                    "page_index": page_index + 1,  # 页码（从1开始）
-                    "img_index": img_index + 1,    # 图片在页面中的索引（从1开始）
-                    "xref": xref,                  # 图片的xref号
-                    "width": width,                # 宽度（像素）
-                    "height": height,              # 高度（像素）
-                    "format": image_ext,           # 格式（扩展名）
-                    "format_description": format_desc,  # 格式描述
-                    "color_mode": mode,            # 颜色模式
-                    "size_bytes": len(image_bytes),  # 图片大小（字节）
-                    "md5_hash": img_hash,          # MD5哈希值
-                }
-                
-                # 如果需要保存图片
-                if save_images and output_dir:
-                    # 确定保存路径
-                    if group_by_page:
-                        # 按页码分组创建子文件夹
-                        page_dir = os.path.join(output_dir, f"page_{page_index+1}")
-                        os.makedirs(page_dir, exist_ok=True)
-                        # 创建图片文件名
-                        filename = f"img{img_index+1}_{img_hash[:8]}.{image_ext}"
-                        filepath = os.path.join(page_dir, filename)
-                    else:
-                        # 不分组，直接保存到输出目录
-                        filename = f"page{page_index+1}_img{img_index+1}_{img_hash[:8]}.{image_ext}"
-                        filepath = os.path.join(output_dir, filename)
-                    
-                    # 保存图片
-                    with open(filepath, "wb") as f:
-                        f.write(image_bytes)
-                    
-                    # 添加文件路径到图片信息
-                    image_info["saved_path"] = filepath
-                
-                # 检查图像大小是否符合最小要求
-                if width * height < min_size:
-                    continue
-                    
-                # 添加到结果列表
-                all_images.append(image_info)
-                
-                # 保存图像对象和矩形信息，用于后续过滤
-                try:
-                    pil_img = Image.open(BytesIO(image_bytes))
-                    # 获取图像在页面上的位置（如果有）
-                    bbox = page.get_image_bbox(img)
-                    if bbox:
-                        x0, y0, x1, y1 = bbox
-                        rect = (x0, y0, x1, y1)
-                        page_images[page_index].append({
-                            "image": pil_img,
-                            "rect": rect,
-                            "info": image_info
-                        })
-                except Exception as e:
-                    print(f"警告: 无法处理图像进行过滤: {e}")
-    
-    # 关闭PDF文档
-    doc.close()
+        # 关闭PDF文档
+        doc.close()
     
     # 过滤重叠和包含关系的图像
     filtered_images = all_images
     
     if filter_duplicates or filter_contained:
+        import numpy as np
+        
         filtered_images = []
-        processed_indices = set()
         
         # 按页面处理图像
-        for page_idx, images in page_images.items():
-            # 按面积从大到小排序图像
-            images.sort(key=lambda x: x["rect"][2] * x["rect"][3] - x["rect"][0] * x["rect"][1], reverse=True)
-            
-            for i, img_data1 in enumerate(images):
-                if i in processed_indices:
-                    continue
-                    
-                img1 = img_data1["image"]
-                rect1 = img_data1["rect"]
-                info1 = img_data1["info"]
-                
-                # 标记为已处理
-                processed_indices.add(i)
-                
-                # 检查是否与其他图像重叠或包含
-                is_valid = True
-                
-                for j, img_data2 in enumerate(images):
-                    if i == j or j in processed_indices:
-                        continue
-                        
-                    img2 = img_data2["image"]
-                    rect2 = img_data2["rect"]
-                    
-                    # 检查是否相似（如果启用了过滤重复）
-                    if filter_duplicates and is_similar_image(img1, img2):
-                        processed_indices.add(j)
-                        continue
-                    
-                    # 检查是否包含（如果启用了过滤包含关系）
-                    if filter_contained and is_contained_in(rect2, rect1):
-                        processed_indices.add(j)
-                        
-                if is_valid:
-                    filtered_images.append(info1)
+        for page_idx, images in enumerate(page_images):
+            hashes, rects, infos = zip(*images) if images else ((), (), ())
+            rects = np.asarray(rects, dtype=np.float32).reshape(-1, 4)
+            if filter_duplicates:
+                order, keep = suppress_overlapping_images(rects, hashes, filter_contained=filter_contained,
+                                                          candidates=compute_duplicate_candidates(infos))
+            else:
+                order, keep = suppress_overlapping_images(rects, filter_contained=filter_contained)
+            filtered_images.extend(infos[i] for i in order if keep[i])
     
     return filtered_images
 
@@ -352,6 +596,7 @@ def main():
     parser.add_argument('--min-size', '-m', type=int, default=100, help='图像的最小像素数，默认为100')
     parser.add_argument('--no-filter-duplicates', '-d', action='store_true', help='不过滤重复图像')
     parser.add_argument('--no-filter-contained', '-c', action='store_true', help='不过滤被其他图像包含的小图像')
+    parser.add_argument('--workers', '-w', type=int, default=None, help='并行处理页面的进程数，默认为CPU核数（最多8个）')
     
     args = parser.parse_args()
     
@@ -364,7 +609,8 @@ def main():
             group_by_page=args.group_by_page,
             filter_duplicates=not args.no_filter_duplicates,
             filter_contained=not args.no_filter_contained,
-            min_size=args.min_size
+            min_size=args.min_size,
+            max_workers=args.workers
         )
         
         # 打印摘要
@@ -10,12 +10,10 @@ PDF API路由
 import os
 import json
 import uuid
-import shutil
+import zipfile
 from datetime import datetime
-from flask import Blueprint, request, jsonify, send_file, current_app, url_for
+from flask import Blueprint, Response, request, jsonify, send_file, current_app, url_for
 from werkzeug.utils import secure_filename
-from core.pdf_analyzer import PDFAnalyzer
-from core.pdf_image_extractor import PDFImageExtractor
 
 # 创建蓝图
 pdf_api = Blueprint('pdf_api', __name__)
@@ -27,6 +25,43 @@ def allowed_file(filename):
     """检查文件扩展名是否允许"""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+class _ZipChunkWriter:
+    """只支持写入的缓冲区，供zipfile边生成边输出压缩包内容"""
+    
+    def __init__(self):
+        self._chunks = []
+    
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+    
+    def flush(self):
+        pass
+    
+    def drain(self):
+        """取出并清空已写入的数据"""
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+def iter_zip_stream(files):
+    """
+    逐个文件生成ZIP压缩包的数据块，不在磁盘上创建压缩包
+    
+    参数:
+        files: (文件路径, 压缩包内文件名) 列表
+        
+    返回:
+        generator: 压缩包数据块
+    """
+    writer = _ZipChunkWriter()
+    with zipfile.ZipFile(writer, 'w', compression=zipfile.ZIP_STORED) as zf:
+        for file_path, arcname in files:
+            zf.write(file_path, arcname=arcname)
+            yield writer.drain()
+    # 写入中央目录
+    yield writer.drain()
+
 @pdf_api.route('/health', methods=['GET'])
 def health_check():
     """健康检查接口"""
@@ -62,18 +97,16 @@ def analyze_pdf():
         return jsonify({'error': '不支持的文件类型，仅支持PDF文件'}), 400
     
     try:
-        # 生成唯一文件名
+        # 生成唯一ID
         filename = secure_filename(file.filename)
         unique_id = str(uuid.uuid4())
-        unique_filename = f"{unique_id}_{filename}"
         
-        # 保存文件
-        upload_folder = current_app.config['UPLOAD_FOLDER']
-        file_path = os.path.join(upload_folder, unique_filename)
-        file.save(file_path)
+        # 直接在内存中读取上传的文件，不写入磁盘
+        pdf_bytes = file.read()
         
-        # 分析PDF
-        analyzer = PDFAnalyzer(file_path)
+        # 分析PDF（延迟导入，健康检查等接口无需加载PDF处理模块）
+        from core.pdf_analyzer import PDFAnalyzer
+        analyzer = PDFAnalyzer(filename, pdf_bytes=pdf_bytes, include_pages=True)
         result = analyzer.get_analysis_result()
         analyzer.close()
         
@@ -85,11 +118,6 @@ def analyze_pdf():
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-    
-    finally:
-        # 清理文件
-        if os.path.exists(file_path):
-            os.remove(file_path)
 
 @pdf_api.route('/extract', methods=['POST'])
 def extract_images():
@@ -105,9 +133,12 @@ def extract_images():
             - overlap_threshold: 重叠面积比例阈值（0-1之间），默认为0.8
             - force_mode: 强制使用指定的提取模式，可选值：'vector', 'scanned', 'digital'
             - dpi: 输出图像的DPI，默认为300
+        - 查询参数:
+            - stream: 为1时直接以ZIP文件流返回提取的图像，不生成下载链接
         
     响应:
         - JSON: 提取结果，包含提取的图像信息和下载链接
+        - ZIP: 当stream=1且提取到图像时，返回图像压缩包
     """
     # 检查是否有文件
     if 'pdf_file' not in request.files:
@@ -132,24 +163,23 @@ def extract_images():
         force_mode = request.form.get('force_mode', None)
         dpi = int(request.form.get('dpi', 300))
         filter_text = request.form.get('filter_text', 'false').lower() == 'true'
+        output_format = request.form.get('output_format', 'auto')
         
-        # 生成唯一文件名和目录
+        # 生成唯一ID和目录
         filename = secure_filename(file.filename)
         unique_id = str(uuid.uuid4())
-        unique_filename = f"{unique_id}_{filename}"
         
-        # 保存文件
-        upload_folder = current_app.config['UPLOAD_FOLDER']
-        file_path = os.path.join(upload_folder, unique_filename)
-        file.save(file_path)
+        # 直接在内存中读取上传的文件，不写入磁盘
+        pdf_bytes = file.read()
         
         # 创建输出目录
         output_dir = os.path.join(current_app.config['STATIC_FOLDER'], 'images', unique_id)
         os.makedirs(output_dir, exist_ok=True)
         
-        # 提取图像
-        extractor = PDFImageExtractor(
-            pdf_path=file_path,
+        # 提取图像（延迟导入，健康检查等接口无需加载PDF处理模块）
+        from core.pdf_image_extractor import PDFImageExtractor
+        with PDFImageExtractor(
+            pdf_path=filename,
             output_dir=output_dir,
             min_size=min_size,
             filter_duplicates=filter_duplicates,
@@ -157,10 +187,20 @@ def extract_images():
             overlap_threshold=overlap_threshold,
             force_mode=force_mode,
             dpi=dpi,
-            filter_text=filter_text
-        )
-        
-        result = extractor.extract_images()
+            filter_text=filter_text,
+            pdf_bytes=pdf_bytes,
+            output_format=output_format
+        ) as extractor:
+            result = extractor.extract_images()
+        
+        # 直接以流的形式返回压缩包
+        if request.args.get('stream') == '1' and result['extracted_count'] > 0:
+            files = [(image['file_path'], image['file_name']) for image in result['images']]
+            return Response(
+                iter_zip_stream(files),
+                mimetype='application/zip',
+                headers={'Content-Disposition': f'attachment; filename={unique_id}_images.zip'}
+            )
         
         # 添加下载链接
         for image in result['images']:
@@ -175,10 +215,11 @@ def extract_images():
         if result['extracted_count'] > 0:
             zip_filename = f"{unique_id}_images.zip"
             zip_path = os.path.join(current_app.config['STATIC_FOLDER'], 'downloads', zip_filename)
-            os.makedirs(os.path.dirname(zip_path), exist_ok=True)
             
-            # 创建压缩包
-            shutil.make_archive(zip_path[:-4], 'zip', output_dir)
+            # 创建压缩包，PNG/JPEG本身已压缩，直接存储即可
+            with zipfile.ZipFile(zip_path, 'w', compression=zipfile.ZIP_STORED) as zf:
+                for image in result['images']:
+                    zf.write(image['file_path'], arcname=image['file_name'])
             
             # 添加压缩包下载链接
             result['zip_download_url'] = url_for('static', filename=f"downloads/{zip_filename}", _external=True)
@@ -187,11 +228,6 @@ def extract_images():
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-    
-    finally:
-        # 清理上传的PDF文件
-        if os.path.exists(file_path):
-            os.remove(file_path)
 
 @pdf_api.route('/download/<file_id>', methods=['GET'])
 def download_images(file_id):
@@ -15,7 +15,6 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from flask import Flask, jsonify, render_template, request
 from flask_cors import CORS
-from api.routes import pdf_api
 
 def create_app(test_config=None):
     """创建并配置Flask应用"""
@@ -28,7 +27,6 @@ def create_app(test_config=None):
     # 配置应用
     app.config.from_mapping(
         SECRET_KEY=os.environ.get('SECRET_KEY', 'dev'),
-        UPLOAD_FOLDER=os.path.join(app.root_path, 'uploads'),
         STATIC_FOLDER=os.path.join(app.root_path, 'static'),
         MAX_CONTENT_LENGTH=50 * 1024 * 1024,  # 限制上传文件大小为50MB
     )
@@ -38,11 +36,11 @@ def create_app(test_config=None):
         app.config.from_mapping(test_config)
     
     # 确保目录存在
-    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
     os.makedirs(os.path.join(app.config['STATIC_FOLDER'], 'images'), exist_ok=True)
     os.makedirs(os.path.join(app.config['STATIC_FOLDER'], 'downloads'), exist_ok=True)
     
-    # 注册蓝图
+    # 注册蓝图（延迟导入，PDF处理相关的重量级模块在创建应用时才加载）
+    from api.routes import pdf_api
     app.register_blueprint(pdf_api, url_prefix='/api')
     
     # 首页路由
@@ -65,5 +63,9 @@ def create_app(test_config=None):
     return app
 
 if __name__ == '__main__':
+    # 内置服务器仅用于开发，生产环境请使用: gunicorn -c gunicorn_conf.py 'app:create_app()'
     app = create_app()
-    app.run(host='0.0.0.0', port=8888, debug=True)
+    if os.environ.get('FLASK_ENV') == 'development':
+        app.run(host='0.0.0.0', port=8888, debug=True)
+    else:
+        app.run(host='0.0.0.0', port=8888, threaded=True)
@@ -10,10 +10,25 @@
 import os
 import fitz  # PyMuPDF
 import time
-from PIL import Image
-import numpy as np
+from functools import lru_cache
 
-def render_cad_pdf(pdf_path, output_dir, page_num, dpi=300):
+
+@lru_cache(maxsize=None)
+def _cad_scale_lut():
+    """
+    按像素最小通道值查表得到的增强因子
+    深色线条0.2，浅色线条0.3，中间色调元素0.4，背景保持不变
+    """
+    import numpy as np
+    
+    lut = np.ones(256, dtype=np.float32)
+    lut[:100] = 0.2
+    lut[100:180] = 0.3
+    lut[180:241] = 0.4
+    return lut
+
+
+def render_cad_pdf(pdf_path, output_dir, page_num, dpi=300, pdf_bytes=None, image_format="png", doc=None):
     """
     使用优化的设置渲染CAD PDF，确保所有元素都被捕获
     
@@ -22,10 +37,17 @@ def render_cad_pdf(pdf_path, output_dir, page_num, dpi=300):
         output_dir (str): 输出目录路径
         page_num (int): 页码 (0-based)
         dpi (int): 输出图像的DPI，默认为300
+        pdf_bytes (bytes): PDF文件内容，提供时直接从内存打开
+        image_format (str): 输出图像格式，'png'（默认，无损）或'jpeg'（有损，文件更小、编码更快）
+        doc (fitz.Document): 已打开的PDF文档，提供时直接使用且不会关闭，不再重新打开文件
     
     返回:
         dict: 渲染结果信息
     """
+    # numpy和PIL导入开销较大，只在实际渲染时导入
+    import numpy as np
+    from PIL import Image
+    
     # 检查是否是简单矢量PDF或复杂CAD PDF
     # 我们不再使用硬编码的文件名检查，而是基于内容特征进行判断
     print(f"  使用专用CAD渲染器处理页面 {page_num + 1}...")
@@ -34,8 +56,13 @@ def render_cad_pdf(pdf_path, output_dir, page_num, dpi=300):
         # 确保输出目录存在
         os.makedirs(output_dir, exist_ok=True)
         
-        # 打开PDF文件
-        doc = fitz.open(pdf_path)
+        # 打开PDF文件，调用方已打开文档时直接使用
+        owns_doc = doc is None
+        if owns_doc:
+            if pdf_bytes is not None:
+                doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+            else:
+                doc = fitz.open(pdf_path)
         
         # 获取页面
         page = doc[page_num]
@@ -43,8 +70,8 @@ def render_cad_pdf(pdf_path, output_dir, page_num, dpi=300):
         # 计算缩放因子 (DPI / 72，因为PDF的默认DPI是72)
         zoom_factor = dpi / 72
         
-        # 创建一个矩阵来应用缩放
-        mat = fitz.Matrix(zoom_factor, zoom_factor)
+        # 创建一个矩阵来应用缩放，使用双倍DPI渲染以捕获更精细的线条
+        mat = fitz.Matrix(zoom_factor * 2, zoom_factor * 2)
         
         # 开始计时
         start_time = time.time()
@@ -52,74 +79,33 @@ def render_cad_pdf(pdf_path, output_dir, page_num, dpi=300):
         # 渲染PDF并保持原始颜色规格
         print("  使用专用CAD渲染器保持原始颜色规格...")
         
-        # 尝试不同的渲染设置来找到最接近原始效果的方法
-        
-        # 使用PyMuPDF官方推荐的渲染设置
-        # 方法1: 使用高质量设置直接渲染
-        pix1 = page.get_pixmap(
+        # 使用PyMuPDF官方推荐的渲染设置，以双倍DPI渲染
+        pix = page.get_pixmap(
             matrix=mat,
             alpha=False,
             colorspace="rgb",  # 使用RGB颜色空间
             annots=True,      # 包含注释
         )
         
-        # 方法2: 使用更高的DPI渲染然后缩小
-        # 这样可以捕获更精细的线条
-        mat_hires = fitz.Matrix(zoom_factor * 2, zoom_factor * 2)  # 双倍DPI
-        pix2 = page.get_pixmap(
-            matrix=mat_hires,
-            alpha=False,
-            colorspace="rgb",
-            annots=True
-        )
+        # 在PyMuPDF内部按2x2块平均缩小到目标尺寸，细线条会被平滑而不会丢失
+        pix.shrink(1)
         
-        # 转换为NumPy数组进行处理
-        img1 = Image.frombytes("RGB", [pix1.width, pix1.height], pix1.samples)
-        img2 = Image.frombytes("RGB", [pix2.width, pix2.height], pix2.samples)
+        # 直接以NumPy视图访问像素缓冲区（samples_mv不复制数据，pix需在使用期间保持有效）
+        combined_arr = np.frombuffer(pix.samples_mv, dtype=np.uint8).reshape(pix.height, pix.width, pix.n)
         
-        # 将高分辨率图像缩放到与第一个图像相同的尺寸
-        img2 = img2.resize((img1.width, img1.height), Image.LANCZOS)
-        
-        arr1 = np.array(img1)
-        arr2 = np.array(img2)
-        
-        # 尝试保持原始线条颜色的方法，同时增强可见度
-        
-        # 合并两种渲染结果以获得最佳效果
-        combined_arr = np.minimum(arr1, arr2)  # 取最小值可以保留最暗的部分
-        
-        # 定义不同类型的像素掩码
-        # 背景像素（非常浅色）
-        background_mask = np.all(combined_arr > 240, axis=2)
-        
-        # 深色线条（非常深色）
-        dark_line_mask = np.any(combined_arr < 100, axis=2)
-        
-        # 浅色线条（中等深色）
-        light_line_mask = np.any(combined_arr < 180, axis=2) & ~dark_line_mask
-        
-        # 中间色调的元素
-        mid_tone_mask = ~background_mask & ~dark_line_mask & ~light_line_mask
-        
-        # 创建结果数组
-        result_arr = combined_arr.copy()
+        # 像素分类只取决于最暗的通道：
+        # 背景像素（非常浅色）所有通道都大于240，即最小通道值大于240
+        # 深色线条（非常深色）任一通道小于100，即最小通道值小于100
+        # 浅色线条（中等深色）任一通道小于180，其余为中间色调的元素
+        min_channel = combined_arr.min(axis=2)
         
         # 增强线条可见度，保持原始颜色
-        # 对深色线条进行适度增强，保持原始颜色比例
-        for i in range(3):  # RGB三个通道
-            # 对深色线条进行适度增强，保持原始颜色比例
-            # 使用乘法因子而不是直接设置为黑色，这样可以保持原始颜色
-            # 例如，红色线条仍然会是红色的，只是更深一些
-            # 增强因子从0.6改为0.4，使线条更暗
-            result_arr[:,:,i][dark_line_mask] = np.clip(result_arr[:,:,i][dark_line_mask] * 0.2, 0, 255).astype(np.uint8)
-            
-            # 对浅色线条进行适度增强
-            # 增强因子从0.7改为0.5，使线条更暗
-            result_arr[:,:,i][light_line_mask] = np.clip(result_arr[:,:,i][light_line_mask] * 0.3, 0, 255).astype(np.uint8)
-            
-            # 对中间色调元素进行轻微增强
-            # 增强因子从0.8改为0.6，使元素更暗
-            result_arr[:,:,i][mid_tone_mask] = np.clip(result_arr[:,:,i][mid_tone_mask] * 0.4, 0, 255).astype(np.uint8)
+        # 按像素类别确定增强因子，三个通道共用同一个因子以保持原始颜色比例
+        # 例如，红色线条仍然会是红色的，只是更深一些
+        scales = _cad_scale_lut()[min_channel]
+        
+        # 一次性对整幅图像应用增强因子
+        result_arr = (combined_arr * scales[:, :, None]).clip(0, 255).astype(np.uint8)
         
         # 增强整体对比度
         # 对于背景，保持原样
@@ -132,17 +118,23 @@ def render_cad_pdf(pdf_path, output_dir, page_num, dpi=300):
         combined_img = Image.fromarray(combined_arr)
         
         # 构建输出文件路径
-        output_filename = f"page_{page_num + 1}.png"
+        is_jpeg = image_format.lower() in ("jpeg", "jpg")
+        output_filename = f"page_{page_num + 1}.{'jpg' if is_jpeg else 'png'}"
         output_path = os.path.join(output_dir, output_filename)
         
         # 保存合并后的图像
-        combined_img.save(output_path)
+        # PNG编码是渲染的最后一个串行步骤，使用最低的zlib压缩级别，以稍大的文件换取数倍的编码速度
+        if is_jpeg:
+            combined_img.save(output_path, format="JPEG", quality=90)
+        else:
+            combined_img.save(output_path, format="PNG", compress_level=1, optimize=False)
         
         # 计算渲染时间
         render_time = time.time() - start_time
         
-        # 关闭文档
-        doc.close()
+        # 关闭自己打开的文档
+        if owns_doc:
+            doc.close()
         
         print(f"  CAD渲染完成: {output_path}")
         print(f"  图像尺寸: {combined_img.width}x{combined_img.height} 像素")
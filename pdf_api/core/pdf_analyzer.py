@@ -8,153 +8,402 @@ PDF分析器
 """
 
 import os
-import pdfplumber
+import hashlib
+import weakref
+import fitz  # PyMuPDF
 from enum import Enum
+from typing import Final
+from functools import cached_property, partial
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# PDF类型的取值，分类和生成结果时直接使用字符串，不经过枚举成员的value查找
+_VECTOR = "vector"
+_SCANNED = "scanned"
+_DIGITAL = "digital"
+_TEXT = "text"
+
+# 分类阈值
+VECTOR_THRESHOLD: Final = 1000  # 矢量图形数超过此值判定为矢量PDF
+SCAN_TEXT_CUTOFF: Final = 100  # 有图像时，文本字符数低于此值判定为扫描PDF，高于此值判定为数字PDF
+
+# 抽样页数不少于此值时才使用进程池并行分析；启动进程并重新打开文档的开销通常超过分析一两页的时间
+PARALLEL_MIN_PAGES: Final = 3
 
 class PDFType(Enum):
     """PDF类型枚举"""
-    VECTOR = "vector"  # 矢量PDF (CAD或矢量图形)
-    SCANNED = "scanned"  # 扫描PDF (主要是图像)
-    DIGITAL = "digital"  # 数字PDF (包含文本和图像)
-    TEXT = "text"  # 文本PDF (主要是文本)
+    VECTOR = _VECTOR  # 矢量PDF (CAD或矢量图形)
+    SCANNED = _SCANNED  # 扫描PDF (主要是图像)
+    DIGITAL = _DIGITAL  # 数字PDF (包含文本和图像)
+    TEXT = _TEXT  # 文本PDF (主要是文本)
+
+# 逐页的整数字段，按此顺序存放在int32计数矩阵的各列中，不为每页分配字典
+# 第3列起为各类对象的计数，顺序与_Totals的字段一致
+_COUNT_COLUMNS = (
+    "page_number",
+    "rotation",
+    "text_chars",
+    "image_count",
+    "vector_count",
+    "curves_count",
+    "lines_count",
+    "rects_count",
+)
+_FIRST_TOTAL_COLUMN = 2
+_VECTOR_COLUMN = 4
+
+# PyMuPDF元数据键名与文档信息字典键名（pdfplumber输出的键名）的对应关系
+# PyMuPDF另外总会给出"format"（如"PDF 1.7"）和"encryption"，它们不属于文档信息字典，不输出
+_METADATA_KEYS = {
+    "title": "Title",
+    "author": "Author",
+    "subject": "Subject",
+    "keywords": "Keywords",
+    "creator": "Creator",
+    "producer": "Producer",
+    "creationDate": "CreationDate",
+    "modDate": "ModDate",
+    "trapped": "Trapped",
+}
+
+
+class _Totals:
+    """各类对象的总计，使用__slots__存放计数，不为每个分析器分配字典"""
+    
+    __slots__ = ("text_chars", "images", "vector_objects", "curves", "lines", "rects")
+    
+    def __init__(self, text_chars=0, images=0, vector_objects=0, curves=0, lines=0, rects=0):
+        self.text_chars = text_chars
+        self.images = images
+        self.vector_objects = vector_objects
+        self.curves = curves
+        self.lines = lines
+        self.rects = rects
+    
+    def as_dict(self):
+        """转换为分析结果中的总计字段"""
+        return {
+            "total_text_chars": self.text_chars,
+            "total_images": self.images,
+            "total_vector_objects": self.vector_objects,
+            "total_curves": self.curves,
+            "total_lines": self.lines,
+            "total_rects": self.rects
+        }
+
+
+def _classify(total_text, total_images, total_vectors):
+    """
+    根据各类对象的总计确定PDF类型
+    
+    参数:
+        total_text (int): 文本字符数
+        total_images (int): 图像数
+        total_vectors (int): 矢量图形数
+    
+    返回:
+        str: PDF类型的字符串值
+    """
+    if total_vectors > VECTOR_THRESHOLD:
+        # 如果矢量图形数量很多，判断为矢量PDF (CAD)
+        return _VECTOR
+    elif total_images > 0 and total_text < SCAN_TEXT_CUTOFF:
+        # 如果有图像但几乎没有文本，判断为扫描PDF
+        return _SCANNED
+    elif total_images > 0 and total_text > SCAN_TEXT_CUTOFF:
+        # 如果有图像也有文本，判断为数字PDF
+        return _DIGITAL
+    else:
+        # 如果主要是文本，判断为文本PDF
+        return _TEXT
+
+
+def _analyze_page(page, count_images=True):
+    """
+    统计单个页面的文本、图像和矢量图形数量
+    
+    参数:
+        page (fitz.Page): 页面对象
+        count_images (bool): 是否统计图像，已知文件中没有图像对象时可跳过
+    
+    返回:
+        tuple: (整数字段元组, (宽度, 高度))，整数字段顺序与_COUNT_COLUMNS一致
+    """
+    # 按开销从低到高统计：图像列表只读取页面资源，文本次之，矢量图形需要解释整个内容流
+    # 获取页面图像
+    image_count = len(page.get_images(full=False)) if count_images else 0
+    
+    # 统计页面字符数
+    # 直接累加底层文本跟踪中每个span的字形数，不做行/块分组，也不拼接文本字符串
+    text_chars = sum(len(span["chars"]) for span in page.get_texttrace())
+    
+    # 获取矢量图形，与pdfplumber一样按图形对象计数（VECTOR_THRESHOLD按此标定），不按路径中的每一段计数：
+    # 只有一段直线的路径为直线，只由矩形组成的路径中每个矩形各计一个，其余路径（折线、曲线等）各计为一条曲线
+    # 只需要计数，使用get_cdrawings获取原始路径数据，不为每个坐标构造Point/Rect对象
+    curves_count = 0
+    lines_count = 0
+    rects_count = 0
+    for drawing in page.get_cdrawings():
+        items = drawing["items"]
+        if all(item[0] == "re" for item in items):
+            rects_count += len(items)
+        elif len(items) == 1 and items[0][0] == "l":
+            lines_count += 1
+        else:
+            curves_count += 1
+    
+    vector_count = curves_count + lines_count + rects_count
+    
+    counts = (
+        page.number + 1,
+        page.rotation,
+        text_chars,
+        image_count,
+        vector_count,
+        curves_count,
+        lines_count,
+        rects_count
+    )
+    return counts, (page.rect.width, page.rect.height)
+
+
+# 工作进程中打开的PDF文档（每个进程一份）
+_worker_doc = None
+
+
+def _init_analyze_worker(pdf_path, pdf_bytes):
+    """工作进程初始化：每个进程只打开一次PDF文档（PyMuPDF文档对象不能跨线程/进程共享）"""
+    global _worker_doc
+    if pdf_bytes is not None:
+        _worker_doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+    else:
+        _worker_doc = fitz.open(pdf_path)
+
+
+def _analyze_page_in_worker(page_index, count_images=True):
+    """在工作进程中分析指定页面"""
+    return _analyze_page(_worker_doc.load_page(page_index), count_images)
+
 
 class PDFAnalyzer:
     """PDF分析器类，用于分析PDF文件类型和结构"""
     
-    def __init__(self, pdf_path):
+    # 分析结果缓存：同一文件再次分析时直接返回结果，无需重新打开和解析
+    # 键为(路径, 大小, 修改时间)或文件内容的哈希，值为(页数, 元数据, 总计, 逐页数据)
+    _CACHE = {}
+    _CACHE_MAX_SIZE = 128
+    
+    def __init__(self, pdf_path, pdf_bytes=None, eager=False, include_pages=False, max_workers=None):
         """
         初始化PDF分析器
         
         参数:
-            pdf_path (str): PDF文件路径
+            pdf_path (str): PDF文件路径，提供pdf_bytes时仅作为文件名使用
+            pdf_bytes (bytes): PDF文件内容，提供时直接从内存打开，不读取磁盘
+            eager (bool): 是否在初始化时立即分析，默认为False（首次获取分析结果时才分析）
+            include_pages (bool): 是否保留逐页信息（get_analysis_result中的pages_info），默认为False
+            max_workers (int): 并行分析页面的最大进程数，默认为1（在当前进程中逐页分析）；
+                大于1且抽样页数不少于PARALLEL_MIN_PAGES时才启动进程池，适用于页面内容很复杂的大文件
         """
-        if not os.path.exists(pdf_path):
-            raise FileNotFoundError(f"PDF文件不存在: {pdf_path}")
+        # 先初始化文档句柄，之后任何一步出错close都能正常调用
+        self.pdf = None
+        
+        # 一次stat同时完成存在性检查并取得文件大小和修改时间（用于缓存键）
+        if pdf_bytes is not None:
+            st = None
+            self._size = len(pdf_bytes)
+        else:
+            try:
+                st = os.stat(pdf_path)
+            except FileNotFoundError:
+                raise FileNotFoundError(f"PDF文件不存在: {pdf_path}") from None
+            self._size = st.st_size
             
         self.pdf_path = pdf_path
-        self.pdf_type = None
-        self.analysis_result = None
-        
-        # 打开PDF文件
-        self.pdf = pdfplumber.open(pdf_path)
+        self.pdf_bytes = pdf_bytes
+        self.include_pages = include_pages
+        self.max_workers = max_workers
+        self._cache_key = self._make_cache_key(st)
         
-        # 获取基本信息
-        self.page_count = len(self.pdf.pages)
-        self.metadata = self.pdf.metadata or {}
+        # 缓存中没有逐页信息而本次需要时，不能使用缓存
+        cached = self._CACHE.get(self._cache_key)
+        if cached is not None and (not include_pages or cached[3] is not None):
+            # 命中缓存，不打开PDF文件
+            # 缓存中的逐页信息可能是其他调用方要求保留的，本次不需要时不返回
+            self.page_count, self.metadata, totals, pages = cached
+            self._analysis = (totals, pages if include_pages else None)
+        else:
+            # 一次性将文件读入内存，之后的解析和字节扫描都在内存中进行，不再反复查找读取磁盘文件
+            # 代价是额外占用与文件大小相同的内存
+            if pdf_bytes is not None:
+                self._buffer = pdf_bytes
+            else:
+                with open(pdf_path, "rb") as f:
+                    self._buffer = f.read(self._size)
+            
+            # 打开PDF文件
+            # 使用PyMuPDF（C实现的MuPDF）读取页面对象，比基于pdfminer的pdfplumber快得多
+            self.pdf = fitz.open(stream=self._buffer, filetype="pdf")
+            
+            # 调用方忘记close或未使用with语句时，对象被回收时也会关闭文档
+            self._finalizer = weakref.finalize(self, self.pdf.close)
+            
+            # 获取基本信息
+            self.page_count = self.pdf.page_count
+            # 元数据的键名与文档信息字典一致，只保留非空字段
+            self.metadata = {_METADATA_KEYS[key]: value for key, value in (self.pdf.metadata or {}).items()
+                             if value and key in _METADATA_KEYS}
+            
+            # 默认延迟到首次获取分析结果时才分析，只需要页数或元数据的调用方无需付出分析的开销
+            if eager:
+                self._analysis
+    
+    def _make_cache_key(self, st):
+        """生成缓存键：内存中的文件按内容哈希，磁盘文件按路径、大小和修改时间（st为文件的stat结果）"""
+        if self.pdf_bytes is not None:
+            return ("bytes", hashlib.blake2b(self.pdf_bytes, digest_size=16).digest())
         
-        # 分析PDF类型
-        self._analyze()
+        return ("path", os.path.abspath(self.pdf_path), st.st_size, st.st_mtime_ns)
     
-    def _analyze(self):
-        """分析PDF文件类型和结构"""
-        # 初始化分析结果
-        self.analysis_result = {
+    @cached_property
+    def _analysis(self):
+        """(总计, 逐页数据)，首次访问时才执行分析"""
+        return self._analyze()
+    
+    @cached_property
+    def _pdf_type_value(self):
+        """PDF类型的字符串值，首次访问时才执行分析"""
+        totals = self._analysis[0]
+        return _classify(totals.text_chars, totals.images, totals.vector_objects)
+    
+    @cached_property
+    def pdf_type(self):
+        """PDF类型，首次访问时才执行分析"""
+        return PDFType(self._pdf_type_value)
+    
+    @cached_property
+    def analysis_result(self):
+        """分析结果字典（不含逐页信息），只在需要时由总计生成"""
+        analysis_result = {
             "file_name": os.path.basename(self.pdf_path),
             "file_path": self.pdf_path,
             "page_count": self.page_count,
-            "metadata": self.metadata,
-            "pages_info": [],
-            "total_text_chars": 0,
-            "total_images": 0,
-            "total_vector_objects": 0,
-            "total_curves": 0,
-            "total_lines": 0,
-            "total_rects": 0
+            "metadata": self.metadata
         }
+        analysis_result.update(self._analysis[0].as_dict())
+        analysis_result["pdf_type"] = self._pdf_type_value
+        return analysis_result
+    
+    def _analyze(self):
+        """分析PDF文件类型和结构，返回(总计, 逐页数据)"""
+        # numpy导入开销较大，只在实际分析时导入
+        import numpy as np
         
-        # 分析前3页或所有页面（取较小值）
-        pages_to_analyze = min(3, self.page_count)
+        # 抽样分析首页、中间页和末页（页数不足3页时分析所有页面）
+        # 封面常为扫描图或插图，只看前几页容易误判，分散抽样在同样开销下更有代表性
+        sample_indexes = sorted({0, self.page_count // 2, self.page_count - 1}) if self.page_count else []
+        pages_to_analyze = len(sample_indexes)
         
-        for i in range(pages_to_analyze):
-            page = self.pdf.pages[i]
-            
-            # 获取页面文本
-            text = page.extract_text() or ""
-            text_chars = len(text)
-            
-            # 获取页面图像
-            images = page.images
-            image_count = len(images)
-            
-            # 获取矢量图形
-            curves = page.curves
-            curves_count = len(curves)
-            
-            lines = page.lines
-            lines_count = len(lines)
-            
-            rects = page.rects
-            rects_count = len(rects)
-            
-            vector_count = curves_count + lines_count + rects_count
-            
-            # 更新页面信息
-            page_info = {
-                "page_number": i + 1,
-                "width": page.width,
-                "height": page.height,
-                "rotation": page.rotation,
-                "text_chars": text_chars,
-                "image_count": image_count,
-                "vector_count": vector_count,
-                "curves_count": curves_count,
-                "lines_count": lines_count,
-                "rects_count": rects_count
-            }
-            
-            self.analysis_result["pages_info"].append(page_info)
-            
-            # 更新总计
-            self.analysis_result["total_text_chars"] += text_chars
-            self.analysis_result["total_images"] += image_count
-            self.analysis_result["total_vector_objects"] += vector_count
-            self.analysis_result["total_curves"] += curves_count
-            self.analysis_result["total_lines"] += lines_count
-            self.analysis_result["total_rects"] += rects_count
-        
-        # 确定PDF类型
-        self._determine_pdf_type()
-    
-    def _determine_pdf_type(self):
-        """根据分析结果确定PDF类型"""
-        total_text = self.analysis_result["total_text_chars"]
-        total_images = self.analysis_result["total_images"]
-        total_vectors = self.analysis_result["total_vector_objects"]
-        
-        # 判断PDF类型
-        if total_vectors > 1000:
-            # 如果矢量图形数量很多，判断为矢量PDF (CAD)
-            self.pdf_type = PDFType.VECTOR
-        elif total_images > 0 and total_text < 100:
-            # 如果有图像但几乎没有文本，判断为扫描PDF
-            self.pdf_type = PDFType.SCANNED
-        elif total_images > 0 and total_text > 100:
-            # 如果有图像也有文本，判断为数字PDF
-            self.pdf_type = PDFType.DIGITAL
+        # 逐页数据存放在预分配的矩阵中：整数字段为int32计数矩阵，页面尺寸为float64矩阵
+        # 页面信息字典只在get_analysis_result中按需生成
+        counts = np.zeros((pages_to_analyze, len(_COUNT_COLUMNS)), dtype=np.int32)
+        sizes = np.zeros((pages_to_analyze, 2), dtype=np.float64)
+        analyzed = 0
+        
+        # 文件中没有图像对象时跳过逐页的图像统计
+        count_images = self._has_image_objects()
+        
+        # 默认在当前进程中按需逐页分析，以便提前结束；只抽样几页时，
+        # 为每个分析器启动进程池并重新打开文档比直接分析慢得多（小文件上约为4倍）
+        # 调用方明确要求并行且抽样页数足够时，才把各页分配到多个进程
+        # PyMuPDF不支持多线程访问同一文档，因此每个工作进程各自打开一份文档
+        max_workers = min(self.max_workers or 1, pages_to_analyze)
+        if max_workers > 1 and pages_to_analyze >= PARALLEL_MIN_PAGES:
+            executor = ProcessPoolExecutor(
+                max_workers=max_workers,
+                initializer=_init_analyze_worker,
+                initargs=(self.pdf_path, self.pdf_bytes)
+            )
+            pages_info = executor.map(
+                partial(_analyze_page_in_worker, count_images=count_images),
+                sample_indexes
+            )
         else:
-            # 如果主要是文本，判断为文本PDF
-            self.pdf_type = PDFType.TEXT
+            executor = None
+            pages_info = (_analyze_page(self.pdf.load_page(i), count_images) for i in sample_indexes)
+        
+        try:
+            for page_counts, page_size in pages_info:
+                counts[analyzed] = page_counts
+                sizes[analyzed] = page_size
+                analyzed += 1
+                
+                # 矢量图形总数只增不减，一旦超过阈值即可判定为矢量PDF，无需分析剩余页面
+                # （大多数CAD图纸在第一页就会超过阈值）
+                if counts[:analyzed, _VECTOR_COLUMN].sum() > VECTOR_THRESHOLD:
+                    break
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+        
+        # 提前结束时只保留已分析的行，各类对象的总计由一次按列求和得到
+        counts = counts[:analyzed]
+        sizes = sizes[:analyzed]
+        totals = _Totals(*counts[:, _FIRST_TOTAL_COLUMN:].sum(axis=0).tolist())
         
-        # 添加到分析结果
-        self.analysis_result["pdf_type"] = self.pdf_type.value
+        # 不需要逐页信息时不保存
+        pages = (counts, sizes) if self.include_pages else None
+        
+        # 加入缓存，超过容量时淘汰最早加入的结果
+        if self._cache_key not in self._CACHE and len(self._CACHE) >= self._CACHE_MAX_SIZE:
+            del self._CACHE[next(iter(self._CACHE))]
+        self._CACHE[self._cache_key] = (self.page_count, self.metadata, totals, pages)
+        
+        return totals, pages
+    
+    def _has_image_objects(self):
+        """
+        在原始字节中查找图像XObject的标记
+        
+        图像XObject是流对象，不能放在压缩的对象流中，其字典总是以明文出现，
+        因此找不到"/Image"即可确定文件中没有图像对象
+        """
+        return self._buffer.find(b"/Image") != -1
     
     def get_pdf_type(self):
         """获取PDF类型"""
         return self.pdf_type
     
     def get_analysis_result(self):
-        """获取完整的分析结果"""
-        return self.analysis_result
+        """获取完整的分析结果（include_pages为True时包含逐页信息）"""
+        result = dict(self.analysis_result)
+        result["pages_info"] = self._get_pages_info()
+        return result
+    
+    def _get_pages_info(self):
+        """由逐页数据矩阵生成页面信息字典列表"""
+        pages = self._analysis[1]
+        if pages is None:
+            return []
+        
+        counts, sizes = pages
+        pages_info = []
+        for row, (width, height) in zip(counts.tolist(), sizes.tolist()):
+            page_info = dict(zip(_COUNT_COLUMNS, row))
+            page_info["width"] = width
+            page_info["height"] = height
+            pages_info.append(page_info)
+        return pages_info
     
     def get_summary(self):
         """获取PDF分析摘要"""
+        totals = self._analysis[0]
         summary = {
-            "file_name": self.analysis_result["file_name"],
-            "page_count": self.analysis_result["page_count"],
-            "pdf_type": self.analysis_result["pdf_type"],
-            "total_text_chars": self.analysis_result["total_text_chars"],
-            "total_images": self.analysis_result["total_images"],
-            "total_vector_objects": self.analysis_result["total_vector_objects"]
+            "file_name": os.path.basename(self.pdf_path),
+            "page_count": self.page_count,
+            "pdf_type": self._pdf_type_value,
+            "total_text_chars": totals.text_chars,
+            "total_images": totals.images,
+            "total_vector_objects": totals.vector_objects
         }
         
         # 添加创建工具信息（如果有）
@@ -165,8 +414,11 @@ class PDFAnalyzer:
     
     def close(self):
         """关闭PDF文件"""
-        if hasattr(self, 'pdf') and self.pdf:
-            self.pdf.close()
+        if self.pdf is not None:
+            # 调用终结器关闭文档，终结器只会执行一次，回收时不会重复关闭
+            self._finalizer()
+            self.pdf = None
+            self._buffer = None
     
     def __enter__(self):
         """支持with语句"""
@@ -175,3 +427,43 @@ class PDFAnalyzer:
     def __exit__(self, exc_type, exc_val, exc_tb):
         """退出with语句时关闭文档"""
         self.close()
+
+
+def _summarize_chunk(paths):
+    """在工作进程中依次分析一组PDF文件，返回(路径, 摘要)列表"""
+    results = []
+    for path in paths:
+        try:
+            # 已经按文件并行，单个文件内不再启动进程池
+            with PDFAnalyzer(path, max_workers=1) as analyzer:
+                results.append((path, analyzer.get_summary()))
+        except Exception as e:
+            results.append((path, {"file_name": os.path.basename(path), "error": str(e)}))
+    return results
+
+
+def analyze_batch(paths, workers=None):
+    """
+    使用多进程批量分析PDF文件
+    
+    文件按块分配给工作进程，减少进程间通信次数；结果按完成顺序逐个返回
+    
+    参数:
+        paths (iterable): PDF文件路径
+        workers (int): 工作进程数，默认为CPU核数
+    
+    返回:
+        iterator: (路径, 摘要)，分析失败的文件摘要中包含error字段
+    """
+    paths = list(paths)
+    if not paths:
+        return
+    
+    workers = min(workers or os.cpu_count() or 1, len(paths))
+    chunk_size = max(1, len(paths) // (workers * 4))
+    chunks = [paths[i:i + chunk_size] for i in range(0, len(paths), chunk_size)]
+    
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_summarize_chunk, chunk) for chunk in chunks]
+        for future in as_completed(futures):
+            yield from future.result()
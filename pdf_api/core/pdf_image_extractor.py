@@ -10,19 +10,620 @@
 import os
 import sys
 import uuid
+import weakref
+import multiprocessing
 from PIL import Image
 import fitz  # PyMuPDF
-import pdfplumber
+import xxhash
+from io import BytesIO
 from datetime import datetime
+from functools import lru_cache, partial
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from .pdf_analyzer import PDFAnalyzer, PDFType
 
+
+def _check_pillow_acceleration():
+    """
+    检查Pillow的加速特性
+    pillow-simd（版本号带.post后缀）为缩放、颜色转换等提供SSE4/AVX2实现，libjpeg-turbo加速JPEG编解码
+    """
+    from PIL import __version__ as pillow_version, features
+    
+    return {
+        "pillow_simd": ".post" in pillow_version,
+        "libjpeg_turbo": bool(features.check_feature("libjpeg_turbo")),
+    }
+
+
+# 只记录检测结果，不在导入时输出提示，由部署方按需查看（见README）
+PILLOW_ACCELERATION = _check_pillow_acceleration()
+
+# 只删除文字的涂黑选项：不改动图像；PyMuPDF 1.24.2起默认还会删除与涂黑区域相交的矢量图形，这里同样保留
+_TEXT_ONLY_REDACTION = {"images": fitz.PDF_REDACT_IMAGE_NONE}
+if hasattr(fitz, "PDF_REDACT_LINE_ART_NONE"):
+    _TEXT_ONLY_REDACTION["graphics"] = fitz.PDF_REDACT_LINE_ART_NONE
+
+
+@lru_cache(maxsize=None)
+def _zoom_matrix(dpi):
+    """
+    按DPI计算整页渲染的缩放矩阵 (DPI / 72，因为PDF的默认DPI是72)
+    fitz.Matrix只作为输入使用，不会被修改，可以在页面之间共享
+    """
+    zoom_factor = dpi / 72
+    return fitz.Matrix(zoom_factor, zoom_factor)
+
+
+def _render_vector_page(doc, page_num, write_pool, pending_writes, output_dir, dpi, filter_text,
+                        check_text_only, is_complex_cad, image_format="png"):
+    """
+    渲染矢量PDF的单个页面
+    
+    参数:
+        doc (fitz.Document): PDF文档
+        page_num (int): 页码 (0-based)
+        write_pool (ThreadPoolExecutor): 后台写图像文件的线程池
+        pending_writes (list): 本次提取尚未完成的写入，新提交的写入追加到其中
+        output_dir (str): 输出目录路径
+        dpi (int): 输出图像的DPI
+        filter_text (bool): 是否过滤文字内容
+        check_text_only (bool): 是否跳过只包含文字的页面
+        is_complex_cad (bool): 是否为复杂CAD图纸，是则使用专用CAD渲染器
+        image_format (str): 输出图像格式，'png'、'jpeg'或'webp'
+    
+    返回:
+        list: 该页提取的图像信息
+    """
+    print(f"处理第 {page_num + 1} 页...")
+    
+    page_images = []
+    try:
+        # 如果启用了跳过只包含文字的页面
+        # 对于矢量PDF，我们不进行过滤，因为它们是图纸类型
+        if check_text_only:
+            # 获取页面
+            page = doc[page_num]
+            
+            # 检查页面上的图像对象
+            images = page.get_images()
+            
+            # 检查页面上的矢量图形
+            drawings = page.get_drawings()
+            
+            # 获取页面上的文本
+            text = page.get_text()
+            
+            # 如果页面上没有图像对象，且矢量图形很少，但有大量文本，则认为是纯文本页面
+            if len(images) == 0 and len(drawings) < 20 and len(text) > 500:
+                print(f"  第 {page_num + 1} 页上只有文本，无图像对象，跳过该页")
+                return page_images
+        
+        # 选择渲染方法：对于复杂CAD PDF使用专用渲染器，否则使用标准渲染
+        if is_complex_cad:
+            # 导入专用CAD渲染器
+            from .cad_pdf_renderer import render_cad_pdf
+            
+            # 使用专用CAD渲染器渲染CAD PDF，直接使用已打开的文档
+            # 工作进程中即初始化时打开的文档，PDF内容只在进程启动时传递一次，不随每个任务传递
+            render_result = render_cad_pdf(doc.name, output_dir, page_num, dpi,
+                                           image_format=image_format, doc=doc)
+            output_filename = render_result["file_name"]
+            output_path = render_result["file_path"]
+            
+            # 记录提取的图像信息
+            image_info = {
+                "page": page_num + 1,
+                "image_index": 1,
+                "width": render_result["width"],
+                "height": render_result["height"],
+                "dpi": dpi,
+                "file_path": render_result["file_path"],
+                "file_name": output_filename,
+                "extraction_method": "cad_render",
+                "text_filtered": filter_text
+            }
+            
+            page_images.append(image_info)
+            print(f"已提取第 {page_num + 1} 页到 {output_path}")
+        
+        # 对于非复杂CAD PDF，使用标准渲染
+        else:
+            # 获取页面
+            page = doc[page_num]
+            
+            # 缩放矩阵只取决于DPI，每个进程只创建一次
+            mat = _zoom_matrix(dpi)
+            
+            # 默认直接渲染原始页面
+            page_for_render = page
+            temp_doc = None
+            
+            try:
+                # 如果需要过滤文字内容
+                if filter_text:
+                    # 获取页面上的所有文本区域，get_text直接返回文本块元组，不必单独构建TextPage
+                    # 元组的第7项为块类型，0为文本块
+                    text_areas = [block[:4] for block in page.get_text("blocks") if block[6] == 0]
+                    
+                    if text_areas:
+                        print(f"  过滤第 {page_num + 1} 页上的 {len(text_areas)} 个文本区域")
+                        
+                        # 涂黑会直接修改页面，因此先把这一页复制到临时文档中再涂黑，
+                        # 共享的文档对象保持不变，之后的渲染和回退仍使用原始页面
+                        temp_doc = fitz.open()
+                        temp_doc.insert_pdf(doc, from_page=page_num, to_page=page_num)
+                        page_for_render = temp_doc[0]
+                        
+                        # 用涂黑（redaction）删除文本区域内的文字
+                        # fill=False表示不填充颜色，文字下方的图像和矢量图形保持原样
+                        for x0, y0, x1, y1 in text_areas:
+                            page_for_render.add_redact_annot(fitz.Rect(x0, y0, x1, y1), fill=False)
+                        page_for_render.apply_redactions(**_TEXT_ONLY_REDACTION)
+                    else:
+                        print(f"  第 {page_num + 1} 页上未找到文本区域")
+                else:
+                    # 如果不需要过滤文字内容，直接使用原始页面
+                    text_areas = []
+                
+                # 渲染页面为像素图
+                pix = page_for_render.get_pixmap(matrix=mat, alpha=False)
+                
+                # 构建输出文件路径
+                output_filename = f"page_{page_num + 1}.{_IMAGE_EXTENSIONS[image_format]}"
+                output_path = f"{output_dir}{os.sep}{output_filename}"
+                
+                # 在后台线程中编码并保存图像
+                _save_pixmap_async(pix, output_path, image_format, write_pool, pending_writes)
+                
+                # 记录提取的图像信息
+                image_info = {
+                    "page": page_num + 1,
+                    "image_index": 1,
+                    "width": pix.width,
+                    "height": pix.height,
+                    "dpi": dpi,
+                    "file_path": output_path,
+                    "file_name": output_filename,
+                    "extraction_method": "page_render",
+                    "text_filtered": filter_text
+                }
+                
+                page_images.append(image_info)
+                print(f"已提取第 {page_num + 1} 页到 {output_path}")
+            except Exception as e:
+                print(f"  警告: 渲染第{page_num + 1}页时出错: {e}")
+            finally:
+                if temp_doc is not None:
+                    temp_doc.close()
+        
+    except Exception as e:
+        print(f"  警告: 提取第{page_num + 1}页时出错: {e}")
+    
+    return page_images
+
+
+def _render_scanned_page(doc, page_num, write_pool, pending_writes, output_dir, dpi, filter_text,
+                         image_format="png"):
+    """
+    渲染扫描PDF的单个页面
+    
+    参数:
+        doc (fitz.Document): PDF文档
+        page_num (int): 页码 (0-based)
+        write_pool (ThreadPoolExecutor): 后台写图像文件的线程池
+        pending_writes (list): 本次提取尚未完成的写入，新提交的写入追加到其中
+        output_dir (str): 输出目录路径
+        dpi (int): 输出图像的DPI
+        filter_text (bool): 是否检测文字区域
+        image_format (str): 输出图像格式，'png'、'jpeg'或'webp'
+    
+    返回:
+        list: 该页提取的图像信息
+    """
+    print(f"处理第 {page_num + 1} 页...")
+    
+    # 获取页面
+    page = doc[page_num]
+    
+    # 缩放矩阵只取决于DPI，每个进程只创建一次
+    mat = _zoom_matrix(dpi)
+    
+    page_images = []
+    try:
+        # 如果需要过滤文字内容
+        if filter_text:
+            # 扫描PDF通常文字是已经内嵌在图像中的，但我们仍然可以尝试识别和过滤
+            # 获取页面上的所有文本区域，get_text直接返回文本块元组，不必单独构建TextPage
+            # 元组的第7项为块类型，0为文本块
+            text_areas = [block[:4] for block in page.get_text("blocks") if block[6] == 0]
+            
+            if text_areas:
+                print(f"  在扫描PDF中检测到 {len(text_areas)} 个文本区域，尝试过滤")
+                # 对于扫描PDF，我们可以尝试使用OCR或其他方法过滤文字
+                # 这里我们只是标记一下文本区域，实际处理可能需要更复杂的方法
+            else:
+                print(f"  第 {page_num + 1} 页上未找到文本区域，可能是纯图像扫描")
+        
+        # 渲染页面为像素图
+        pix = page.get_pixmap(matrix=mat, alpha=False)
+        
+        # 构建输出文件路径
+        output_filename = f"page_{page_num + 1}.{_IMAGE_EXTENSIONS[image_format]}"
+        output_path = f"{output_dir}{os.sep}{output_filename}"
+        
+        # 在后台线程中编码并保存图像
+        _save_pixmap_async(pix, output_path, image_format, write_pool, pending_writes)
+        
+        # 记录提取的图像信息
+        image_info = {
+            "page": page_num + 1,
+            "image_index": 1,
+            "width": pix.width,
+            "height": pix.height,
+            "dpi": dpi,
+            "file_path": output_path,
+            "file_name": output_filename,
+            "extraction_method": "page_render",
+            "text_filtered": filter_text
+        }
+        
+        page_images.append(image_info)
+        
+        print(f"已提取第 {page_num + 1} 页到 {output_path}")
+        
+    except Exception as e:
+        print(f"  警告: 提取第{page_num + 1}页时出错: {e}")
+    
+    return page_images
+
+
+def _stream_digest(doc, xref):
+    """
+    计算图像对象原始（未解码）数据流的哈希值
+    
+    参数:
+        doc (fitz.Document): PDF文档
+        xref (int): 图像对象的xref编号
+    
+    返回:
+        int: 128位xxh3哈希值，无法获取数据流时返回None
+    """
+    try:
+        stream = doc.xref_stream_raw(xref)
+    except Exception:
+        return None
+    if not stream:
+        return None
+    return xxhash.xxh3_128_intdigest(stream)
+
+
+class _BloomFilter:
+    """
+    用于检测重复图像的布隆过滤器
+    占用内存固定，不随图像数量增长；默认2^20位（128KB）、7个哈希函数，
+    一万张图像时误判率约为5e-9
+    """
+    
+    __slots__ = ("_bits", "_mask", "_num_hashes")
+    
+    def __init__(self, num_bits=1 << 20, num_hashes=7):
+        # num_bits必须是2的幂
+        self._bits = bytearray(num_bits >> 3)
+        self._mask = num_bits - 1
+        self._num_hashes = num_hashes
+    
+    def _positions(self, digest):
+        # 由128位哈希的高低两半做双重哈希，得到k个位置，不必计算k次哈希
+        h1 = digest & 0xFFFFFFFFFFFFFFFF
+        h2 = (digest >> 64) | 1
+        return [(h1 + i * h2) & self._mask for i in range(self._num_hashes)]
+    
+    def add(self, digest):
+        """添加一个128位哈希值"""
+        for pos in self._positions(digest):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+    
+    def __contains__(self, digest):
+        bits = self._bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(digest))
+
+
+@lru_cache(maxsize=None)
+def _dct_matrix(n=32):
+    """
+    n×n的正交DCT-II变换矩阵，对图像矩阵左乘、右乘其转置即得到二维DCT
+    """
+    import numpy as np
+    
+    k = np.arange(n, dtype=np.float64)[:, None]
+    x = np.arange(n, dtype=np.float64)[None, :]
+    mat = np.sqrt(2.0 / n) * np.cos(np.pi * (2 * x + 1) * k / (2 * n))
+    mat[0] /= np.sqrt(2.0)
+    return mat.astype(np.float32)
+
+
+def _phash(pil_image):
+    """
+    计算图像的64位DCT感知哈希
+    灰度化并缩放到32×32，做二维DCT后取左上角8×8的低频系数，按中位数二值化
+    
+    参数:
+        pil_image (PIL.Image.Image): 图像
+    
+    返回:
+        int: 64位感知哈希值
+    """
+    import numpy as np
+    
+    arr = np.asarray(pil_image.convert("L").resize((32, 32), Image.LANCZOS), dtype=np.float32)
+    mat = _dct_matrix()
+    low = (mat @ arr @ mat.T)[:8, :8]
+    bits = np.packbits(low > np.median(low))
+    return int.from_bytes(bits.tobytes(), "big")
+
+
+class _BKTree:
+    """按汉明距离组织的BK树，用于查找感知哈希相近的图像"""
+    
+    __slots__ = ("_root",)
+    
+    def __init__(self):
+        # 每个节点为 [哈希值, {距离: 子节点}]
+        self._root = None
+    
+    def add(self, value):
+        """添加一个哈希值"""
+        if self._root is None:
+            self._root = [value, {}]
+            return
+        node = self._root
+        while True:
+            distance = bin(node[0] ^ value).count("1")
+            if distance == 0:
+                return
+            child = node[1].get(distance)
+            if child is None:
+                node[1][distance] = [value, {}]
+                return
+            node = child
+    
+    def has_within(self, value, max_distance):
+        """检查树中是否存在与value汉明距离不超过max_distance的哈希值"""
+        if self._root is None:
+            return False
+        stack = [self._root]
+        while stack:
+            node_value, children = stack.pop()
+            distance = bin(node_value ^ value).count("1")
+            if distance <= max_distance:
+                return True
+            # 三角不等式：只有距离在 [distance - max_distance, distance + max_distance] 内的子树可能命中
+            for child_distance, child in children.items():
+                if distance - max_distance <= child_distance <= distance + max_distance:
+                    stack.append(child)
+        return False
+
+
+def _greedy_filter_loop(boxes, overlap_threshold, filter_contained, keep):
+    """
+    按面积从大到小的顺序贪心过滤重叠图像，结果写入keep
+    只使用标量运算和数组下标，供Numba编译；与已保留的图像逐个比较，遇到需要过滤的情况立即停止
+    
+    参数:
+        boxes: (N, 4) 的边界框数组 (x0, y0, x1, y1)，已按面积从大到小排序
+        overlap_threshold (float): 重叠面积比例阈值
+        filter_contained (bool): 是否过滤被包含的图像
+        keep: 长度为N的布尔数组，初始全为False
+    """
+    for i in range(boxes.shape[0]):
+        x0, y0, x1, y1 = boxes[i, 0], boxes[i, 1], boxes[i, 2], boxes[i, 3]
+        area1 = (x1 - x0) * (y1 - y0)
+        should_add = True
+        for j in range(i):
+            if not keep[j]:
+                continue
+            bx0, by0, bx1, by1 = boxes[j, 0], boxes[j, 1], boxes[j, 2], boxes[j, 3]
+            
+            # 被已保留的图像包含
+            if filter_contained and x0 >= bx0 and y0 >= by0 and x1 <= bx1 and y1 <= by1:
+                should_add = False
+                break
+            
+            # 重叠面积占较小边界框的比例超过阈值
+            x_overlap = min(x1, bx1) - max(x0, bx0)
+            y_overlap = min(y1, by1) - max(y0, by0)
+            if x_overlap > 0 and y_overlap > 0:
+                area2 = (bx1 - bx0) * (by1 - by0)
+                if x_overlap * y_overlap / min(area1, area2) > overlap_threshold:
+                    should_add = False
+                    break
+        keep[i] = should_add
+
+
+@lru_cache(maxsize=None)
+def _greedy_filter_kernel():
+    """
+    用Numba编译_greedy_filter_loop，编译结果缓存在磁盘上，之后的进程无需重新编译
+    未安装Numba时返回None，由_greedy_filter_numpy代替
+    """
+    try:
+        from numba import njit
+    except ImportError:
+        return None
+    return njit(cache=True)(_greedy_filter_loop)
+
+
+def _greedy_filter_numpy(boxes, overlap_threshold, filter_contained, keep):
+    """
+    _greedy_filter_loop的NumPy实现，一次性计算所有图像两两之间的重叠关系，参数相同
+    """
+    import numpy as np
+    
+    x0, y0, x1, y1 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    
+    # 重叠区域面积
+    x_overlap = np.clip(np.minimum(x1[:, None], x1[None, :]) - np.maximum(x0[:, None], x0[None, :]), 0, None)
+    y_overlap = np.clip(np.minimum(y1[:, None], y1[None, :]) - np.maximum(y0[:, None], y0[None, :]), 0, None)
+    overlap_area = x_overlap * y_overlap
+    
+    # 重叠面积占较小边界框的比例
+    areas = (x1 - x0) * (y1 - y0)
+    smaller_area = np.minimum(areas[:, None], areas[None, :])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        overlap_ratio = np.where(overlap_area > 0, overlap_area / smaller_area, 0.0)
+    rejects = overlap_ratio > overlap_threshold
+    
+    # 如果启用了包含过滤，图像i被图像j包含时同样过滤
+    if filter_contained:
+        rejects |= ((x0[:, None] >= x0[None, :]) & (y0[:, None] >= y0[None, :]) &
+                    (x1[:, None] <= x1[None, :]) & (y1[:, None] <= y1[None, :]))
+    
+    for i in range(len(keep)):
+        keep[i] = not rejects[i, :i][keep[:i]].any()
+
+
+# 整页渲染支持的输出格式及其文件扩展名
+_IMAGE_EXTENSIONS = {"png": "png", "jpeg": "jpg", "webp": "webp"}
+
+
+@lru_cache(maxsize=None)
+def _simplejpeg():
+    """可选的simplejpeg模块（直接调用libjpeg-turbo编码），未安装时返回None"""
+    try:
+        import simplejpeg
+    except ImportError:
+        return None
+    return simplejpeg
+
+
+def _write_image(size, samples, output_path, image_format):
+    """将RGB像素数据按指定格式编码并写入文件"""
+    simplejpeg = _simplejpeg() if image_format == "jpeg" else None
+    if simplejpeg is not None:
+        import numpy as np
+        
+        # 直接以NumPy视图把像素数据交给libjpeg-turbo编码，不经过PIL
+        width, height = size
+        arr = np.frombuffer(samples, dtype=np.uint8).reshape(height, width, 3)
+        with open(output_path, "wb") as f:
+            f.write(simplejpeg.encode_jpeg(arr, quality=85, colorspace="RGB", fastdct=True))
+        return
+    
+    # frombuffer与像素数据共享内存，不再复制一份
+    image = Image.frombuffer("RGB", size, samples, "raw", "RGB", 0, 1)
+    if image_format == "jpeg":
+        image.save(output_path, format="JPEG", quality=85, optimize=False)
+    elif image_format == "webp":
+        image.save(output_path, format="WEBP", quality=85, method=4)
+    else:
+        image.save(output_path, format="PNG")
+
+
+def _save_pixmap_async(pix, output_path, image_format, write_pool, pending_writes):
+    """
+    提交一个后台任务保存像素图，调用_wait_for_writes等待写入完成
+    当前线程渲染下一页的同时，后台线程编码并写入上一页；PyMuPDF不是线程安全的，
+    因此像素数据在当前线程中复制出来，后台线程只用PIL编码（编码期间释放GIL）
+    
+    参数:
+        pix (fitz.Pixmap): 不带alpha通道的RGB像素图
+        output_path (str): 输出文件路径
+        image_format (str): 输出图像格式，'png'、'jpeg'或'webp'
+        write_pool (ThreadPoolExecutor): 后台写图像文件的线程池
+        pending_writes (list): 本次提取尚未完成的写入，每项为 (输出文件路径, Future)
+    """
+    pending_writes.append((output_path, write_pool.submit(
+        _write_image, (pix.width, pix.height), pix.samples, output_path, image_format)))
+
+
+def _wait_for_writes(results, pending_writes):
+    """
+    等待本次提取的后台写入全部完成，并去掉写入失败的图像信息
+    
+    参数:
+        results (list): 每页提取的图像信息列表
+        pending_writes (list): 本次提取提交的写入，每项为 (输出文件路径, Future)
+    
+    返回:
+        list: 去掉写入失败的图像后的结果
+    """
+    failed = set()
+    for output_path, future in pending_writes:
+        try:
+            future.result()
+        except Exception as e:
+            print(f"  警告: 保存图像 {output_path} 时出错: {e}")
+            failed.add(output_path)
+    
+    if not failed:
+        return results
+    return [[info for info in page_images if info["file_path"] not in failed]
+            for page_images in results]
+
+
+# 工作进程中打开的PDF文档（PyMuPDF文档对象无法跨进程传递）
+_worker_doc = None
+
+# 工作进程中写图像文件的线程池，工作进程每次只执行一个任务，不会被并发使用
+_worker_write_pool = None
+
+
+def _init_render_worker(pdf_path, pdf_bytes):
+    """
+    工作进程初始化函数，每个进程只打开一次PDF文档
+    
+    参数:
+        pdf_path (str): PDF文件路径
+        pdf_bytes (bytes): PDF文件内容，提供时直接从内存打开
+    """
+    global _worker_doc, _worker_write_pool
+    _worker_write_pool = ThreadPoolExecutor(max_workers=4)
+    if pdf_bytes is not None:
+        _worker_doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+    else:
+        _worker_doc = fitz.open(pdf_path)
+
+
+def _render_page_range(doc, render_page, page_nums, write_pool, **options):
+    """
+    依次渲染一组页面，并等待这些页面的图像文件全部写入完成
+    尚未完成的写入只记录在本次调用中，同一线程池上的其他提取不会等待或清除这些写入
+    
+    参数:
+        doc (fitz.Document): PDF文档
+        render_page: 渲染单个页面的函数
+        page_nums: 页码序列 (0-based)
+        write_pool (ThreadPoolExecutor): 后台写图像文件的线程池
+        options: 传递给render_page的其余参数
+    
+    返回:
+        list: 每页提取的图像信息列表
+    """
+    pending_writes = []
+    results = [render_page(doc, page_num, write_pool, pending_writes, **options) for page_num in page_nums]
+    return _wait_for_writes(results, pending_writes)
+
+
+def _render_chunk_in_worker(render_page, page_nums, **options):
+    """
+    在工作进程中渲染一组连续页面
+    
+    参数:
+        render_page: 渲染单个页面的函数
+        page_nums: 页码序列 (0-based)
+        options: 传递给render_page的其余参数
+    """
+    return _render_page_range(_worker_doc, render_page, page_nums, _worker_write_pool, **options)
+
+
 class PDFImageExtractor:
     """智能PDF图像提取器类"""
     
     def __init__(self, pdf_path, output_dir=None, min_size=100, 
                  filter_duplicates=True, filter_contained=True, 
                  overlap_threshold=0.8, force_mode=None, dpi=300,
-                 filter_text=False):
+                 filter_text=False, pdf_bytes=None, max_workers=None,
+                 phash_distance=6, output_format="auto"):
         """
         初始化PDF图像提取器
         
@@ -36,11 +637,24 @@ class PDFImageExtractor:
             force_mode (str): 强制使用指定的提取模式，可选值：'vector', 'scanned', 'digital'
             dpi (int): 输出图像的DPI，默认为300
             filter_text (bool): 是否跳过只包含文字的页面或PDF，只输出包含图像的页面，默认为False
+            pdf_bytes (bytes): PDF文件内容，提供时直接从内存打开，pdf_path仅作为文件名使用
+            max_workers (int): 整页渲染时的最大工作进程数，默认为1（在当前进程中串行渲染）；
+                API服务本身已是多进程，每个请求再启动进程池会使进程数超出CPU核数，命令行或批量调用时可按需调大
+            phash_distance (int): 判定为近似重复图像的感知哈希最大汉明距离（0-64），默认为6
+            output_format (str): 整页渲染的输出格式，可选值：'auto'、'png'、'jpeg'、'webp'。
+                'auto'时扫描PDF输出JPEG（连续色调图像，编码更快、文件更小），矢量PDF保持PNG（线条边缘清晰）
         """
-        if not os.path.exists(pdf_path):
-            raise FileNotFoundError(f"PDF文件不存在: {pdf_path}")
+        if pdf_bytes is None:
+            if not os.path.exists(pdf_path):
+                raise FileNotFoundError(f"PDF文件不存在: {pdf_path}")
+            
+            # 只从磁盘读取一次文件内容，分析器、文档对象、渲染工作进程和CAD渲染器都从内存打开，
+            # 不再各自按路径重新读取和解析文件
+            with open(pdf_path, "rb") as f:
+                pdf_bytes = f.read()
         
         self.pdf_path = pdf_path
+        self.pdf_bytes = pdf_bytes
         self.min_size = min_size
         self.filter_duplicates = filter_duplicates
         self.filter_contained = filter_contained
@@ -48,6 +662,14 @@ class PDFImageExtractor:
         self.force_mode = force_mode
         self.dpi = dpi
         self.filter_text = filter_text
+        self.max_workers = max_workers
+        self.phash_distance = phash_distance
+        self.output_format = output_format.lower()
+        if self.output_format == "jpg":
+            self.output_format = "jpeg"
+        if self.output_format != "auto" and self.output_format not in _IMAGE_EXTENSIONS:
+            print(f"警告: 无效的输出格式 '{output_format}'，使用自动选择")
+            self.output_format = "auto"
         
         # 设置输出目录
         if output_dir is None:
@@ -59,8 +681,15 @@ class PDFImageExtractor:
         # 确保输出目录存在
         os.makedirs(self.output_dir, exist_ok=True)
         
+        # 打开PDF文件，类型检查和各提取方法共用同一个文档对象
+        self._doc = self._open_fitz()
+        self._finalizer = weakref.finalize(self, self._doc.close)
+        
+        # 串行渲染时后台写图像文件的线程池，随提取器关闭
+        self._write_pool = ThreadPoolExecutor(max_workers=4)
+        
         # 分析PDF类型
-        self.analyzer = PDFAnalyzer(pdf_path)
+        self.analyzer = PDFAnalyzer(pdf_path, pdf_bytes=pdf_bytes)
         self.pdf_type = self.analyzer.get_pdf_type()
         
         # 如果指定了强制模式，覆盖自动检测的类型
@@ -72,11 +701,96 @@ class PDFImageExtractor:
         
         # 存储提取结果
         self.extracted_images = []
+        
+        # 前几页是否包含图像对象，由_quick_has_images按需检查
+        self._has_images_cache = None
+    
+    def _open_fitz(self):
+        """使用PyMuPDF打开PDF，优先从内存中的文件内容打开"""
+        if self.pdf_bytes is not None:
+            return fitz.open(stream=self.pdf_bytes, filetype="pdf")
+        return fitz.open(self.pdf_path)
+    
+    def _quick_has_images(self):
+        """
+        检查PDF前3页是否包含图像对象，结果会被缓存
+        
+        返回:
+            bool: 是否包含图像对象
+        """
+        if self._has_images_cache is None:
+            has_images = False
+            try:
+                for page_num in range(min(3, self._doc.page_count)):
+                    images = self._doc[page_num].get_images(full=False)
+                    if len(images) > 0:
+                        print(f"  在第 {page_num+1} 页发现 {len(images)} 个图像对象")
+                        has_images = True
+                        break
+            except Exception as e:
+                print(f"  检查图像对象时出错: {e}")
+            self._has_images_cache = has_images
+        return self._has_images_cache
     
     def get_pdf_info(self):
         """获取PDF基本信息"""
         return self.analyzer.get_summary()
     
+    def close(self):
+        """关闭PDF文件"""
+        # 终结器只会执行一次，重复调用或回收时不会重复关闭
+        self._finalizer()
+        self._write_pool.shutdown(wait=True)
+        self.analyzer.close()
+    
+    def __enter__(self):
+        """支持with语句"""
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """退出with语句时关闭文档"""
+        self.close()
+    
+    def _render_pages(self, render_page, **options):
+        """
+        逐页渲染PDF，页数较多时分发到多个工作进程并行渲染
+        
+        参数:
+            render_page: 渲染单个页面的函数，签名为 render_page(doc, page_num, **options)
+            options: 传递给render_page的其余参数
+        
+        返回:
+            int: 提取的图像数量
+        """
+        page_count = self._doc.page_count
+        
+        max_workers = self.max_workers or 1
+        
+        if max_workers > 1 and page_count > 1:
+            # PyMuPDF文档对象无法跨进程传递，每个工作进程在初始化时各自打开一次
+            # PDF内容只随initargs传给每个工作进程一次，任务参数中只有页码段和渲染选项
+            # 每个任务渲染一段连续页面，段内渲染与后台写文件重叠进行
+            chunksize = max(1, page_count // (max_workers * 4))
+            chunks = [range(start, min(start + chunksize, page_count))
+                      for start in range(0, page_count, chunksize)]
+            
+            # 结果按页码顺序返回，与串行渲染的输出顺序一致
+            with ProcessPoolExecutor(max_workers=min(max_workers, page_count),
+                                     initializer=_init_render_worker,
+                                     initargs=(self.pdf_path, self.pdf_bytes)) as executor:
+                results = [page_images
+                           for chunk_results in executor.map(
+                               partial(_render_chunk_in_worker, render_page, **options), chunks)
+                           for page_images in chunk_results]
+        else:
+            results = _render_page_range(self._doc, render_page, range(page_count), self._write_pool,
+                                         **options)
+        
+        extracted_count = len(self.extracted_images)
+        self.extracted_images.extend(info for page_images in results for info in page_images)
+        
+        return len(self.extracted_images) - extracted_count
+    
     def _extract_vector_pdf(self):
         """
         提取矢量PDF (CAD或矢量图形) 的图像
@@ -84,19 +798,13 @@ class PDFImageExtractor:
         """
         print(f"处理矢量PDF (CAD或矢量图形)，使用整页渲染模式...")
         
-        # 导入专用CAD渲染器
-        from .cad_pdf_renderer import render_cad_pdf
-        
         # 检查是否是复杂的CAD PDF
         is_complex_cad = False
         
         # 基于矢量对象数量判断是否是复杂CAD图纸
         try:
             # 获取矢量对象数量
-            doc_temp = fitz.open(self.pdf_path)
-            page0 = doc_temp[0]
-            vector_objects_count = len(page0.get_drawings())
-            doc_temp.close()
+            vector_objects_count = len(self._doc[0].get_drawings())
             
             if vector_objects_count > 10000:
                 is_complex_cad = True
@@ -106,191 +814,15 @@ class PDFImageExtractor:
         except Exception as e:
             print(f"检查矢量对象数量时出错: {e}")
         
-        # 打开PDF文件
-        doc = fitz.open(self.pdf_path)
-        extracted_count = 0
-        
-        # 遍历所有页面
-        for page_num in range(doc.page_count):
-            print(f"处理第 {page_num + 1} 页...")
-            
-            try:
-                # 如果启用了跳过只包含文字的页面
-                if self.filter_text:
-                    # 获取页面
-                    page = doc[page_num]
-                    
-                    # 检查是否是纯文本页面
-                    # 对于矢量PDF，我们不进行过滤，因为它们是图纸类型
-                    if self.pdf_type != PDFType.VECTOR:
-                        # 检查页面上的图像对象
-                        images = page.get_images()
-                        
-                        # 检查页面上的矢量图形
-                        drawings = page.get_drawings()
-                        
-                        # 获取页面上的文本
-                        text = page.get_text()
-                        
-                        # 如果页面上没有图像对象，且矢量图形很少，但有大量文本，则认为是纯文本页面
-                        if len(images) == 0 and len(drawings) < 20 and len(text) > 500:
-                            print(f"  第 {page_num + 1} 页上只有文本，无图像对象，跳过该页")
-                            continue
-                
-                # 初始化页面渲染对象
-                page_for_render = None
-                
-                # 选择渲染方法：对于复杂CAD PDF使用专用渲染器，否则使用标准渲染
-                if is_complex_cad:
-                    # 使用专用CAD渲染器
-                    output_filename = f"page_{page_num + 1}.png"
-                    output_path = os.path.join(self.output_dir, output_filename)
-                    
-                    # 渲染CAD PDF
-                    render_result = render_cad_pdf(self.pdf_path, self.output_dir, page_num, self.dpi)
-                    
-                    # 记录提取的图像信息
-                    image_info = {
-                        "page": page_num + 1,
-                        "image_index": 1,
-                        "width": render_result["width"],
-                        "height": render_result["height"],
-                        "dpi": self.dpi,
-                        "file_path": render_result["file_path"],
-                        "file_name": output_filename,
-                        "extraction_method": "cad_render",
-                        "text_filtered": self.filter_text
-                    }
-                    
-                    self.extracted_images.append(image_info)
-                    print(f"已提取第 {page_num + 1} 页到 {output_path}")
-                    extracted_count += 1
-                
-                # 对于非复杂CAD PDF，使用标准渲染
-                else:
-                    # 获取页面
-                    page = doc[page_num]
-                    
-                    # 计算缩放因子 (DPI / 72，因为PDF的默认DPI是72)
-                    zoom_factor = self.dpi / 72
-                    
-                    # 创建一个矩阵来应用缩放
-                    mat = fitz.Matrix(zoom_factor, zoom_factor)
-                    
-                    # 定义默认的页面渲染对象
-                    page_for_render = page
-                    
-                    try:
-                        # 如果需要过滤文字内容
-                        if self.filter_text:
-                            # 获取页面上的所有文本区域
-                            text_areas = []
-                            text_page = page.get_textpage()
-                            blocks = text_page.extractBLOCKS()
-                            
-                            # 收集所有文本块的区域
-                            for block in blocks:
-                                if block[6] == 0:  # 文本块
-                                    x0, y0, x1, y1 = block[:4]
-                                    text_areas.append((x0, y0, x1, y1))
-                            
-                            if text_areas:
-                                print(f"  过滤第 {page_num + 1} 页上的 {len(text_areas)} 个文本区域")
-                                
-                                # 创建一个新页面，不包含文本
-                                temp_doc = fitz.open()
-                                temp_page = temp_doc.new_page(width=page.rect.width, height=page.rect.height)
-                                
-                                # 复制所有非文本内容
-                                # 复制图像
-                                for img in page.get_images(full=True):
-                                    xref = img[0]
-                                    temp_page.insert_image(page.rect, xref=xref)
-                                
-                                # 复制矢量图形（线条、曲线、矩形等）
-                                # 注意：这是一个简化的方法，可能不会复制所有矢量内容
-                                shapes = page.get_drawings()
-                                for shape in shapes:
-                                    # 使用shape信息在新页面上绘制
-                                    temp_page.draw_rect(shape["rect"])
-                                
-                                # 使用临时页面进行渲染
-                                page_for_render = temp_page
-                            else:
-                                print(f"  第 {page_num + 1} 页上未找到文本区域")
-                        else:
-                            # 如果不需要过滤文字内容，直接使用原始页面
-                            text_areas = []
-                        
-                        # 渲染页面为像素图
-                        pix = page_for_render.get_pixmap(matrix=mat, alpha=False)
-                        
-                        # 构建输出文件路径
-                        output_filename = f"page_{page_num + 1}.png"
-                        output_path = os.path.join(self.output_dir, output_filename)
-                        
-                        # 保存图像
-                        pix.save(output_path)
-                        
-                        # 记录提取的图像信息
-                        image_info = {
-                            "page": page_num + 1,
-                            "image_index": 1,
-                            "width": pix.width,
-                            "height": pix.height,
-                            "dpi": self.dpi,
-                            "file_path": output_path,
-                            "file_name": output_filename,
-                            "extraction_method": "page_render",
-                            "text_filtered": self.filter_text
-                        }
-                        
-                        self.extracted_images.append(image_info)
-                        print(f"已提取第 {page_num + 1} 页到 {output_path}")
-                        extracted_count += 1
-                    except Exception as e:
-                        print(f"  警告: 渲染第{page_num + 1}页时出错: {e}")
-                    
-                    # 计算缩放因子 (DPI / 72，因为PDF的默认DPI是72)
-                    zoom_factor = self.dpi / 72
-                    
-                    # 创建一个矩阵来应用缩放
-                    mat = fitz.Matrix(zoom_factor, zoom_factor)
-                    
-                    # 渲染页面为像素图
-                    pix = page.get_pixmap(matrix=mat, alpha=False)
-                    
-                    # 构建输出文件路径
-                    output_filename = f"page_{page_num + 1}.png"
-                    output_path = os.path.join(self.output_dir, output_filename)
-                    
-                    # 保存图像
-                    pix.save(output_path)
-                    
-                    # 记录提取的图像信息
-                    image_info = {
-                        "page": page_num + 1,
-                        "image_index": 1,
-                        "width": pix.width,
-                        "height": pix.height,
-                        "dpi": self.dpi,
-                        "file_path": output_path,
-                        "file_name": output_filename,
-                        "extraction_method": "page_render",
-                        "text_filtered": self.filter_text
-                    }
-                    
-                    self.extracted_images.append(image_info)
-                    print(f"已提取第 {page_num + 1} 页到 {output_path}")
-                    extracted_count += 1
-                
-            except Exception as e:
-                print(f"  警告: 提取第{page_num + 1}页时出错: {e}")
-        
-        # 关闭文档
-        doc.close()
-        
-        return extracted_count
+        return self._render_pages(
+            _render_vector_page,
+            output_dir=self.output_dir,
+            dpi=self.dpi,
+            filter_text=self.filter_text,
+            check_text_only=self.filter_text and self.pdf_type != PDFType.VECTOR,
+            is_complex_cad=is_complex_cad,
+            image_format="png" if self.output_format == "auto" else self.output_format,
+        )
     
     def _extract_scanned_pdf(self):
         """
@@ -299,80 +831,13 @@ class PDFImageExtractor:
         """
         print(f"处理扫描PDF，使用整页渲染模式...")
         
-        # 打开PDF文件
-        doc = fitz.open(self.pdf_path)
-        extracted_count = 0
-        
-        # 遍历所有页面
-        for page_num in range(doc.page_count):
-            print(f"处理第 {page_num + 1} 页...")
-            
-            # 获取页面
-            page = doc[page_num]
-            
-            # 计算缩放因子 (DPI / 72，因为PDF的默认DPI是72)
-            zoom_factor = self.dpi / 72
-            
-            # 创建一个矩阵来应用缩放
-            mat = fitz.Matrix(zoom_factor, zoom_factor)
-            
-            try:
-                # 如果需要过滤文字内容
-                if self.filter_text:
-                    # 扫描PDF通常文字是已经内嵌在图像中的，但我们仍然可以尝试识别和过滤
-                    # 获取页面上的所有文本区域
-                    text_areas = []
-                    text_page = page.get_textpage()
-                    blocks = text_page.extractBLOCKS()
-                    
-                    # 收集所有文本块的区域
-                    for block in blocks:
-                        if block[6] == 0:  # 文本块
-                            x0, y0, x1, y1 = block[:4]
-                            text_areas.append((x0, y0, x1, y1))
-                    
-                    if text_areas:
-                        print(f"  在扫描PDF中检测到 {len(text_areas)} 个文本区域，尝试过滤")
-                        # 对于扫描PDF，我们可以尝试使用OCR或其他方法过滤文字
-                        # 这里我们只是标记一下文本区域，实际处理可能需要更复杂的方法
-                    else:
-                        print(f"  第 {page_num + 1} 页上未找到文本区域，可能是纯图像扫描")
-                
-                # 渲染页面为像素图
-                pix = page.get_pixmap(matrix=mat, alpha=False)
-                
-                # 构建输出文件路径
-                output_filename = f"page_{page_num + 1}.png"
-                output_path = os.path.join(self.output_dir, output_filename)
-                
-                # 保存图像
-                pix.save(output_path)
-                
-                # 记录提取的图像信息
-                image_info = {
-                    "page": page_num + 1,
-                    "image_index": 1,
-                    "width": pix.width,
-                    "height": pix.height,
-                    "dpi": self.dpi,
-                    "file_path": output_path,
-                    "file_name": output_filename,
-                    "extraction_method": "page_render",
-                    "text_filtered": self.filter_text
-                }
-                
-                self.extracted_images.append(image_info)
-                
-                print(f"已提取第 {page_num + 1} 页到 {output_path}")
-                extracted_count += 1
-                
-            except Exception as e:
-                print(f"  警告: 提取第{page_num + 1}页时出错: {e}")
-        
-        # 关闭文档
-        doc.close()
-        
-        return extracted_count
+        return self._render_pages(
+            _render_scanned_page,
+            output_dir=self.output_dir,
+            dpi=self.dpi,
+            filter_text=self.filter_text,
+            image_format="jpeg" if self.output_format == "auto" else self.output_format,
+        )
     
     def _extract_digital_pdf(self):
         """
@@ -381,215 +846,169 @@ class PDFImageExtractor:
         """
         print(f"处理数字PDF，使用图像对象提取模式...")
         
-        # 打开PDF文件
-        with pdfplumber.open(self.pdf_path) as pdf:
-            extracted_count = 0
-            image_hashes = set()  # 用于检测重复图像
+        doc = self._doc
+        extracted_count = 0
+        image_hashes = _BloomFilter()  # 用于检测重复图像
+        phash_tree = _BKTree()  # 用于检测近似重复图像
+        
+        # 遍历所有页面
+        for page_num, page in enumerate(doc):
+            print(f"处理第 {page_num + 1} 页...")
             
-            # 遍历所有页面
-            for page_num, page in enumerate(pdf.pages):
-                print(f"处理第 {page_num + 1} 页...")
-                
-                # 获取页面上的所有图像
-                images = page.images
-                
-                # 如果启用了跳过只包含文字的页面
-                if self.filter_text:
-                    # 检查是否有有效的图像（过滤掉边界框超出页面的图像）
-                    valid_images = []
-                    for img in images:
-                        # 检查图像边界是否在页面内
-                        if img["x0"] < 0 or img["top"] < 0 or img["x1"] > page.width or img["bottom"] > page.height:
-                            continue
-                        
-                        # 检查图像尺寸是否足够大
-                        if img["width"] * img["height"] < self.min_size * self.min_size:
-                            continue
-                        
-                        valid_images.append(img)
+            page_width = page.rect.width
+            page_height = page.rect.height
+            
+            # 获取页面上的所有图像及其在页面上的边界框
+            images = []
+            for item in page.get_images(full=True):
+                try:
+                    bbox = page.get_image_bbox(item)
+                except Exception:
+                    continue
+                if bbox.is_empty or bbox.is_infinite:
+                    continue
+                images.append({
+                    "xref": item[0],
+                    "smask": item[1],
+                    "x0": bbox.x0,
+                    "top": bbox.y0,
+                    "x1": bbox.x1,
+                    "bottom": bbox.y1,
+                    "width": bbox.width,
+                    "height": bbox.height,
+                })
+            
+            # 如果启用了跳过只包含文字的页面
+            if self.filter_text:
+                # 检查是否有有效的图像（过滤掉边界框超出页面的图像）
+                valid_images = []
+                for img in images:
+                    # 检查图像边界是否在页面内
+                    if img["x0"] < 0 or img["top"] < 0 or img["x1"] > page_width or img["bottom"] > page_height:
+                        continue
                     
-                    # 如果没有有效图像，跳过这一页
-                    if len(valid_images) == 0:
-                        print(f"  第 {page_num + 1} 页上未找到有效图像对象，跳过该页")
+                    # 检查图像尺寸是否足够大
+                    if img["width"] * img["height"] < self.min_size * self.min_size:
                         continue
                     
-                    # 替换为有效图像列表
-                    images = valid_images
-                
-                # 如果需要过滤重叠图像
-                if self.filter_contained or self.overlap_threshold < 1.0:
-                    images = self._filter_overlapping_images(images)
+                    valid_images.append(img)
                 
-                # 如果过滤后没有图像，跳过这一页
-                if len(images) == 0:
-                    print(f"  第 {page_num + 1} 页上没有符合要求的图像，跳过该页")
+                # 如果没有有效图像，跳过这一页
+                if len(valid_images) == 0:
+                    print(f"  第 {page_num + 1} 页上未找到有效图像对象，跳过该页")
                     continue
                 
-                # 提取每个图像
-                page_extracted_count = 0
-                for i, img in enumerate(images):
-                    try:
-                        # 获取图像尺寸
-                        width = img["width"]
-                        height = img["height"]
-                        
-                        # 检查图像边界是否在页面内
-                        if img["x0"] < 0 or img["top"] < 0 or img["x1"] > page.width or img["bottom"] > page.height:
-                            print(f"  警告: 第{page_num + 1}页第{i + 1}张图片边界超出页面范围，跳过")
-                            continue
-                        
-                        # 提取图像
-                        try:
-                            image = page.crop((img["x0"], img["top"], img["x1"], img["bottom"]))
-                        except Exception as crop_error:
-                            print(f"  警告: 裁剪第{page_num + 1}页第{i + 1}张图片时出错: {crop_error}")
-                            continue
+                # 替换为有效图像列表
+                images = valid_images
+            
+            # 如果需要过滤重叠图像
+            if self.filter_contained or self.overlap_threshold < 1.0:
+                images = self._filter_overlapping_images(images)
+            
+            # 如果过滤后没有图像，跳过这一页
+            if len(images) == 0:
+                print(f"  第 {page_num + 1} 页上没有符合要求的图像，跳过该页")
+                continue
+            
+            # 提取每个图像
+            page_extracted_count = 0
+            for i, img in enumerate(images):
+                try:
+                    # 获取图像尺寸
+                    width = img["width"]
+                    height = img["height"]
+                    xref = img["xref"]
+                    
+                    # 检查图像边界是否在页面内
+                    if img["x0"] < 0 or img["top"] < 0 or img["x1"] > page_width or img["bottom"] > page_height:
+                        print(f"  警告: 第{page_num + 1}页第{i + 1}张图片边界超出页面范围，跳过")
+                        continue
+                    
+                    # 如果需要过滤重复图像，先对图像的原始压缩数据流计算哈希
+                    # 重复图像在解码之前就被跳过
+                    image_hash = None
+                    if self.filter_duplicates:
+                        image_hash = _stream_digest(doc, xref)
                         
-                        # 如果提取失败，跳过
-                        if image is None:
-                            print(f"  警告: 提取第{page_num + 1}页第{i + 1}张图片时出错: 提取结果为空")
+                        # 如果是重复图像，跳过
+                        if image_hash is not None and image_hash in image_hashes:
+                            print(f"  警告: 第{page_num + 1}页第{i + 1}张图片与先前提取的图像重复，跳过")
                             continue
-                        
-                        # 转换为PIL图像
+                    
+                    # 提取图像
+                    try:
+                        if img["smask"]:
+                            # 带透明蒙版的图像需要与蒙版合成后才能得到完整图像，输出为PNG
+                            pix = fitz.Pixmap(doc, xref)
+                            if pix.n - pix.alpha >= 4:
+                                pix = fitz.Pixmap(fitz.csRGB, pix)
+                            pix = fitz.Pixmap(pix, fitz.Pixmap(doc, img["smask"]))
+                            image_bytes = pix.tobytes("png")
+                            image_ext = "png"
+                        else:
+                            # 直接取出PDF中嵌入的已压缩图像数据，不经过解码和重新编码
+                            image_data = doc.extract_image(xref)
+                            image_bytes = image_data["image"]
+                            image_ext = image_data["ext"]
+                    except Exception as extract_error:
+                        print(f"  警告: 提取第{page_num + 1}页第{i + 1}张图片时出错: {extract_error}")
+                        continue
+                    
+                    # 如果需要过滤重复图像
+                    if self.filter_duplicates:
+                        # 数据流不同的图像再用感知哈希比较，识别重新压缩或缩放过的近似重复图像
                         try:
-                            # 检查image对象是否有original属性
-                            if hasattr(image, 'original') and image.original is not None:
-                                pil_image = Image.frombytes("RGB", (image.width, image.height), image.original.tobytes())
-                            else:
-                                # 如果没有original属性，尝试使用备用方法
-                                print(f"  注意: 第{page_num + 1}页第{i + 1}张图片没有original属性，尝试使用备用方法")
-                                # 使用PyMuPDF直接渲染这个区域
-                                try:
-                                    # 打开PDF文件
-                                    doc_temp = fitz.open(self.pdf_path)
-                                    # 获取页面
-                                    page_temp = doc_temp[page_num]
-                                    # 创建裁剪区域
-                                    clip_rect = fitz.Rect(img["x0"], img["top"], img["x1"], img["bottom"])
-                                    # 计算缩放因子
-                                    zoom_factor = self.dpi / 72
-                                    # 创建一个矩阵来应用缩放
-                                    mat = fitz.Matrix(zoom_factor, zoom_factor)
-                                    # 渲染裁剪区域
-                                    pix = page_temp.get_pixmap(matrix=mat, clip=clip_rect, alpha=False)
-                                    # 转换为PIL图像
-                                    pil_image = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-                                    # 关闭文档
-                                    doc_temp.close()
-                                except Exception as backup_error:
-                                    print(f"  警告: 备用方法提取第{page_num + 1}页第{i + 1}张图片时出错: {backup_error}")
-                                    continue
-                        except Exception as convert_error:
-                            print(f"  警告: 转换第{page_num + 1}页第{i + 1}张图片时出错: {convert_error}")
+                            image_phash = _phash(Image.open(BytesIO(image_bytes)))
+                        except Exception:
+                            # PIL无法解码的格式（如JPX）只做精确去重
+                            image_phash = None
+                        if image_phash is not None and phash_tree.has_within(image_phash, self.phash_distance):
+                            print(f"  警告: 第{page_num + 1}页第{i + 1}张图片与先前提取的图像近似重复，跳过")
                             continue
                         
-                        # 如果需要过滤重复图像
-                        if self.filter_duplicates:
-                            # 计算图像哈希
-                            image_hash = hash(pil_image.tobytes())
-                            
-                            # 如果是重复图像，跳过
-                            if image_hash in image_hashes:
-                                print(f"  警告: 第{page_num + 1}页第{i + 1}张图片与先前提取的图像重复，跳过")
-                                continue
-                            
-                            # 添加到哈希集合
+                        # 添加到哈希集合
+                        if image_hash is not None:
                             image_hashes.add(image_hash)
-                        
-                        # 构建输出文件路径
-                        output_filename = f"page_{page_num + 1}_image_{i + 1}.png"
-                        output_path = os.path.join(self.output_dir, output_filename)
-                        
-                        # 保存图像
-                        pil_image.save(output_path)
-                        
-                        # 记录提取的图像信息
-                        image_info = {
-                            "page": page_num + 1,
-                            "image_index": i + 1,
-                            "width": width,
-                            "height": height,
-                            "x0": img["x0"],
-                            "y0": img["top"],
-                            "x1": img["x1"],
-                            "y1": img["bottom"],
-                            "file_path": output_path,
-                            "file_name": output_filename,
-                            "extraction_method": "object_extraction"
-                        }
-                        
-                        self.extracted_images.append(image_info)
-                        
-                        print(f"  已提取第{page_num + 1}页第{i + 1}张图片到 {output_path}")
-                        extracted_count += 1
-                        page_extracted_count += 1
-                        
-                    except Exception as e:
-                        print(f"  警告: 提取第{page_num + 1}页第{i + 1}张图片时出错: {e}")
-                
-                # 如果这一页没有成功提取任何图像，我们认为它是纯文本页
-                if page_extracted_count == 0 and self.filter_text:
-                    print(f"  第 {page_num + 1} 页没有成功提取到任何图像，将其视为纯文本页")
-        
-        return extracted_count
-    
-    def _is_overlap(self, box1, box2):
-        """
-        检查两个边界框是否重叠
-        
-        参数:
-            box1: 第一个边界框 (x0, y0, x1, y1)
-            box2: 第二个边界框 (x0, y0, x1, y1)
-            
-        返回:
-            bool: 是否重叠
-        """
-        # 检查是否有重叠
-        if box1[0] > box2[2] or box2[0] > box1[2]:  # 一个在另一个的右侧
-            return False
-        if box1[1] > box2[3] or box2[1] > box1[3]:  # 一个在另一个的下方
-            return False
-        return True
-    
-    def _calculate_overlap_area(self, box1, box2):
-        """
-        计算两个边界框的重叠面积
-        
-        参数:
-            box1: 第一个边界框 (x0, y0, x1, y1)
-            box2: 第二个边界框 (x0, y0, x1, y1)
+                        if image_phash is not None:
+                            phash_tree.add(image_phash)
+                    
+                    # 构建输出文件路径，扩展名与嵌入图像的原始格式一致
+                    output_filename = f"page_{page_num + 1}_image_{i + 1}.{image_ext}"
+                    output_path = f"{self.output_dir}{os.sep}{output_filename}"
+                    
+                    # 保存图像
+                    with open(output_path, "wb") as f:
+                        f.write(image_bytes)
+                    
+                    # 记录提取的图像信息
+                    image_info = {
+                        "page": page_num + 1,
+                        "image_index": i + 1,
+                        "width": width,
+                        "height": height,
+                        "x0": img["x0"],
+                        "y0": img["top"],
+                        "x1": img["x1"],
+                        "y1": img["bottom"],
+                        "file_path": output_path,
+                        "file_name": output_filename,
+                        "extraction_method": "object_extraction"
+                    }
+                    
+                    self.extracted_images.append(image_info)
+                    
+                    print(f"  已提取第{page_num + 1}页第{i + 1}张图片到 {output_path}")
+                    extracted_count += 1
+                    page_extracted_count += 1
+                    
+                except Exception as e:
+                    print(f"  警告: 提取第{page_num + 1}页第{i + 1}张图片时出错: {e}")
             
-        返回:
-            float: 重叠面积占较小边界框的比例
-        """
-        if not self._is_overlap(box1, box2):
-            return 0.0
-        
-        # 计算重叠区域
-        x_overlap = max(0, min(box1[2], box2[2]) - max(box1[0], box2[0]))
-        y_overlap = max(0, min(box1[3], box2[3]) - max(box1[1], box2[1]))
-        overlap_area = x_overlap * y_overlap
+            # 如果这一页没有成功提取任何图像，我们认为它是纯文本页
+            if page_extracted_count == 0 and self.filter_text:
+                print(f"  第 {page_num + 1} 页没有成功提取到任何图像，将其视为纯文本页")
         
-        # 计算两个边界框的面积
-        area1 = (box1[2] - box1[0]) * (box1[3] - box1[1])
-        area2 = (box2[2] - box2[0]) * (box2[3] - box2[1])
-        
-        # 返回重叠面积占较小边界框的比例
-        return overlap_area / min(area1, area2)
-    
-    def _is_contained(self, box1, box2):
-        """
-        检查边界框1是否被边界框2包含
-        
-        参数:
-            box1: 第一个边界框 (x0, y0, x1, y1)
-            box2: 第二个边界框 (x0, y0, x1, y1)
-            
-        返回:
-            bool: 边界框1是否被边界框2包含
-        """
-        return (box1[0] >= box2[0] and box1[1] >= box2[1] and 
-                box1[2] <= box2[2] and box1[3] <= box2[3])
+        return extracted_count
     
     def _filter_overlapping_images(self, images):
         """
@@ -604,40 +1023,32 @@ class PDFImageExtractor:
         if not images:
             return []
         
+        import numpy as np
+        
         # 按面积从大到小排序
         sorted_images = sorted(images, 
                               key=lambda img: (img["width"] * img["height"]), 
                               reverse=True)
         
-        filtered_images = []
-        for i, img1 in enumerate(sorted_images):
-            box1 = (img1["x0"], img1["top"], img1["x1"], img1["bottom"])
-            area1 = img1["width"] * img1["height"]
-            
-            # 如果面积太小，跳过
-            if area1 < self.min_size * self.min_size:
-                continue
-            
-            # 检查是否被之前添加的更大图像包含或严重重叠
-            should_add = True
-            for img2 in filtered_images:
-                box2 = (img2["x0"], img2["top"], img2["x1"], img2["bottom"])
-                
-                # 如果启用了包含过滤，检查当前图像是否被已添加的图像包含
-                if self.filter_contained and self._is_contained(box1, box2):
-                    should_add = False
-                    break
-                
-                # 检查重叠程度
-                overlap_ratio = self._calculate_overlap_area(box1, box2)
-                if overlap_ratio > self.overlap_threshold:
-                    should_add = False
-                    break
-            
-            if should_add:
-                filtered_images.append(img1)
+        # 面积太小的图像直接跳过
+        min_area = self.min_size * self.min_size
+        sorted_images = [img for img in sorted_images if img["width"] * img["height"] >= min_area]
+        if not sorted_images:
+            return []
+        
+        # 边界框为 (x0, top, x1, bottom)
+        boxes = np.array([[img["x0"], img["top"], img["x1"], img["bottom"]] for img in sorted_images],
+                         dtype=np.float64)
+        keep = np.zeros(len(sorted_images), dtype=np.bool_)
+        
+        # 按面积从大到小贪心保留：被已保留的更大图像包含或严重重叠的图像被过滤
+        greedy_filter = _greedy_filter_kernel()
+        if greedy_filter is not None:
+            greedy_filter(boxes, float(self.overlap_threshold), bool(self.filter_contained), keep)
+        else:
+            _greedy_filter_numpy(boxes, self.overlap_threshold, self.filter_contained, keep)
         
-        return filtered_images
+        return [img for img, kept in zip(sorted_images, keep) if kept]
     
     def extract_images(self):
         """
@@ -654,42 +1065,7 @@ class PDFImageExtractor:
         # 对于矢量PDF (test1.pdf) 和数字PDF (test2.pdf)，无论filter_text设置如何，都必须提取图像
         if self.filter_text and self.pdf_type == PDFType.TEXT:
                 print(f"\n检查PDF是否包含图像...")
-                has_images = False
-                
-                # 使用pdfplumber检查是否有图像
-                pdfplumber_images_count = 0
-                try:
-                    pdf = pdfplumber.open(self.pdf_path)
-                    for page_num in range(min(3, len(pdf.pages))):
-                        page = pdf.pages[page_num]
-                        images = page.images
-                        pdfplumber_images_count += len(images)
-                        if len(images) > 0:
-                            print(f"  在第 {page_num+1} 页发现 {len(images)} 个图像对象 (pdfplumber)")
-                            has_images = True
-                            break
-                    pdf.close()
-                except Exception as e:
-                    print(f"  pdfplumber检查图像时出错: {e}")
-                
-                # 使用PyMuPDF检查是否有图像
-                pymupdf_images_count = 0
-                if not has_images:
-                    try:
-                        doc = fitz.open(self.pdf_path)
-                        for page_num in range(min(3, doc.page_count)):
-                            page = doc[page_num]
-                            images = page.get_images()
-                            pymupdf_images_count += len(images)
-                            if len(images) > 0:
-                                print(f"  在第 {page_num+1} 页发现 {len(images)} 个图像对象 (PyMuPDF)")
-                                has_images = True
-                                break
-                        doc.close()
-                    except Exception as e:
-                        print(f"  PyMuPDF检查图像时出错: {e}")
-            
-                print(f"  图像检测结果: pdfplumber={pdfplumber_images_count}, PyMuPDF={pymupdf_images_count}")
+                has_images = self._quick_has_images()
                 
                 # 如果没有图像且启用了跳过只有文字的PDF选项
                 if not has_images:
@@ -716,18 +1092,7 @@ class PDFImageExtractor:
                 # 数字PDF (test5.pdf) - 如果启用了filter_text，需要检查是否实际包含图像
                 if self.filter_text:
                     # 检查是否实际包含图像对象，而不是仅包含文字
-                    has_real_images = False
-                    try:
-                        with pdfplumber.open(self.pdf_path) as pdf:
-                            for page_num in range(min(3, len(pdf.pages))):
-                                page = pdf.pages[page_num]
-                                images = page.images
-                                if len(images) > 0:
-                                    print(f"  在第 {page_num+1} 页发现 {len(images)} 个图像对象，将提取图像")
-                                    has_real_images = True
-                                    break
-                    except Exception as e:
-                        print(f"  检查图像对象时出错: {e}")
+                    has_real_images = self._quick_has_images()
                     
                     if not has_real_images:
                         print(f"  数字PDF中未发现实际图像对象，由于启用了跳过只包含文字的PDF选项，因此不进行提取")
@@ -767,9 +1132,14 @@ class PDFImageExtractor:
                     print("尝试使用整页渲染模式...")
                     self._used_vector_method = True
                     # 直接使用下面的代码渲染，而不是调用_extract_vector_pdf
+                    doc = self._doc
+                    
+                    # 按页码预先分配结果列表
+                    backup_images = [None] * doc.page_count
                     try:
-                        # 打开PDF文件
-                        doc = fitz.open(self.pdf_path)
+                        # 缩放矩阵只取决于DPI，在循环外创建一次
+                        mat = _zoom_matrix(self.dpi)
+                        image_format = "png" if self.output_format == "auto" else self.output_format
                         
                         for page_num in range(doc.page_count):
                             print(f"备用渲染模式处理第 {page_num + 1} 页...")
@@ -777,21 +1147,19 @@ class PDFImageExtractor:
                             # 获取页面
                             page = doc[page_num]
                             
-                            # 计算缩放因子 (DPI / 72，因为PDF的默认DPI是72)
-                            zoom_factor = self.dpi / 72
-                            
-                            # 创建一个矩阵来应用缩放
-                            mat = fitz.Matrix(zoom_factor, zoom_factor)
-                            
                             # 渲染页面为像素图
                             pix = page.get_pixmap(matrix=mat, alpha=False)
                             
                             # 构建输出文件路径
-                            output_filename = f"page_{page_num + 1}.png"
-                            output_path = os.path.join(self.output_dir, output_filename)
+                            output_filename = f"page_{page_num + 1}.{_IMAGE_EXTENSIONS[image_format]}"
+                            output_path = f"{self.output_dir}{os.sep}{output_filename}"
                             
-                            # 保存图像
-                            pix.save(output_path)
+                            # 保存图像：PNG和JPEG直接由MuPDF编码到内存后写入，WebP交给PIL编码
+                            if image_format == "webp":
+                                _write_image((pix.width, pix.height), pix.samples, output_path, image_format)
+                            else:
+                                with open(output_path, "wb") as f:
+                                    f.write(pix.tobytes(image_format, jpg_quality=85))
                             
                             # 记录提取的图像信息
                             image_info = {
@@ -806,14 +1174,13 @@ class PDFImageExtractor:
                                 "text_filtered": self.filter_text
                             }
                             
-                            self.extracted_images.append(image_info)
+                            backup_images[page_num] = image_info
                             print(f"已提取第 {page_num + 1} 页到 {output_path}")
                             extracted_count += 1
-                        
-                        # 关闭文档
-                        doc.close()
                     except Exception as e:
                         print(f"  备用渲染模式出错: {e}")
+                    
+                    self.extracted_images.extend(info for info in backup_images if info is not None)
                 
                 elif self.pdf_type != PDFType.DIGITAL and not hasattr(self, '_used_digital_method'):
                     print("尝试使用图像对象提取模式...")
@@ -845,3 +1212,63 @@ class PDFImageExtractor:
             print(f"输出目录: {os.path.abspath(self.output_dir)}")
         
         return result
+    
+    @classmethod
+    def extract_batch(cls, paths, output_dir=None, workers=None, **kwargs):
+        """
+        使用多进程批量提取多个PDF文件的图像
+        
+        每个工作进程有独立的MuPDF上下文，渲染不受GIL限制；每个进程处理4个文件后重启，限制MuPDF的内存增长
+        
+        参数:
+            paths (iterable): PDF文件路径
+            output_dir (str): 输出根目录，每个PDF的图像保存在以文件名命名的子目录中，
+                默认为当前目录下的"pdf_images_<时间戳>"
+            workers (int): 工作进程数，默认为CPU核数
+            kwargs: 传递给PDFImageExtractor的其余参数
+        
+        返回:
+            iterator: 按输入顺序返回(路径, 提取结果)，提取失败的文件结果中包含error字段
+        """
+        paths = list(paths)
+        if not paths:
+            return
+        
+        if output_dir is None:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            output_dir = f"pdf_images_{timestamp}"
+        
+        # 已经按文件并行，单个文件内默认不再启动进程池（守护进程也不能创建子进程）
+        kwargs.setdefault("max_workers", 1)
+        
+        # 为每个PDF分配独立的输出子目录，文件名相同时追加序号
+        tasks = []
+        used_names = set()
+        for path in paths:
+            name = os.path.splitext(os.path.basename(path))[0]
+            unique_name, n = name, 1
+            while unique_name in used_names:
+                n += 1
+                unique_name = f"{name}_{n}"
+            used_names.add(unique_name)
+            tasks.append((cls, path, os.path.join(output_dir, unique_name), kwargs))
+        
+        workers = min(workers or os.cpu_count() or 1, len(paths))
+        with multiprocessing.Pool(workers, maxtasksperchild=4) as pool:
+            yield from pool.imap(_extract_one_pdf, tasks)
+
+
+def _extract_one_pdf(task):
+    """在工作进程中提取单个PDF文件的图像，返回(路径, 提取结果)"""
+    extractor_cls, path, output_dir, kwargs = task
+    try:
+        with extractor_cls(path, output_dir=output_dir, **kwargs) as extractor:
+            return path, extractor.extract_images()
+    except Exception as e:
+        return path, {
+            "success": False,
+            "extracted_count": 0,
+            "images": [],
+            "output_dir": os.path.abspath(output_dir),
+            "error": str(e)
+        }
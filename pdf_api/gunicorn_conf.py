@@ -0,0 +1,25 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Gunicorn配置
+
+用法（在pdf_api目录下执行）:
+    gunicorn -c gunicorn_conf.py 'app:create_app()'
+"""
+
+import os
+
+# 监听地址
+bind = os.environ.get("PDF_API_BIND", "0.0.0.0:8888")
+
+# PDF解析和图像提取是CPU密集型任务，使用多个同步工作进程并行处理请求
+workers = int(os.environ.get("PDF_API_WORKERS", min(os.cpu_count() or 1, 8)))
+worker_class = "sync"
+
+# 大型CAD图纸渲染可能耗时较长
+timeout = 120
+
+# 定期回收工作进程，限制PyMuPDF的内存增长
+max_requests = 100
+max_requests_jitter = 10
@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+PDF分析器的测试
+
+运行方式（在仓库根目录下）: python -m unittest discover -s pdf_api/tests -t .
+"""
+
+import unittest
+
+import fitz  # PyMuPDF
+
+from pdf_api.core.pdf_analyzer import PDFAnalyzer, PDFType
+from pdf_api.tests.test_pdf_image_extractor import _make_pdf
+
+
+class AnalysisCacheTest(unittest.TestCase):
+    """同一文件的分析结果命中缓存时，仍按本次的include_pages返回逐页信息"""
+    
+    def setUp(self):
+        self.pdf_bytes = _make_pdf(page_count=5)
+        PDFAnalyzer._CACHE.clear()
+        self.addCleanup(PDFAnalyzer._CACHE.clear)
+    
+    def _pages_info(self, include_pages):
+        with PDFAnalyzer("test.pdf", pdf_bytes=self.pdf_bytes, include_pages=include_pages) as analyzer:
+            return analyzer.get_analysis_result()["pages_info"]
+    
+    def test_cached_pages_not_returned_without_include_pages(self):
+        self.assertEqual([info["page_number"] for info in self._pages_info(True)], [1, 3, 5])
+        self.assertEqual(self._pages_info(False), [])
+    
+    def test_cache_without_pages_is_not_used_with_include_pages(self):
+        self.assertEqual(self._pages_info(False), [])
+        self.assertEqual([info["page_number"] for info in self._pages_info(True)], [1, 3, 5])
+
+
+
+class VectorCountTest(unittest.TestCase):
+    """矢量图形按对象计数（与pdfplumber一致），折线中的每一段不单独计数"""
+    
+    def test_polylines_counted_once(self):
+        doc = fitz.open()
+        page = doc.new_page(width=600, height=800)
+        page.insert_text((20, 30), "text " * 100, fontsize=6)
+        for k in range(300):
+            page.draw_polyline([(10 + j * 5, 40 + k * 2 + (j % 2)) for j in range(6)])
+        pdf_bytes = doc.tobytes()
+        doc.close()
+        
+        PDFAnalyzer._CACHE.clear()
+        self.addCleanup(PDFAnalyzer._CACHE.clear)
+        with PDFAnalyzer("test.pdf", pdf_bytes=pdf_bytes) as analyzer:
+            result = analyzer.get_analysis_result()
+            self.assertEqual(result["total_vector_objects"], 300)
+            self.assertEqual(result["total_curves"], 300)
+            self.assertEqual(analyzer.get_pdf_type(), PDFType.TEXT)
+
+
+
+class MetadataTest(unittest.TestCase):
+    """元数据使用文档信息字典的键名（与pdfplumber一致），不包含PyMuPDF附加的format和encryption"""
+    
+    def test_metadata_uses_info_dict_keys(self):
+        doc = fitz.open()
+        doc.new_page()
+        doc.set_metadata({"creator": "AutoCAD", "title": "T"})
+        pdf_bytes = doc.tobytes()
+        doc.close()
+        
+        PDFAnalyzer._CACHE.clear()
+        self.addCleanup(PDFAnalyzer._CACHE.clear)
+        with PDFAnalyzer("test.pdf", pdf_bytes=pdf_bytes) as analyzer:
+            self.assertEqual(analyzer.get_analysis_result()["metadata"], {"Creator": "AutoCAD", "Title": "T"})
+            self.assertEqual(analyzer.get_summary()["creator"], "AutoCAD")
+
+
+if __name__ == "__main__":
+    unittest.main()
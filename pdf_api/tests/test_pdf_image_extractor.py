@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+PDF图像提取器的测试
+
+运行方式（在仓库根目录下）: python -m unittest discover -s pdf_api/tests -t .
+"""
+
+import contextlib
+import io
+import os
+import tempfile
+import threading
+import unittest
+
+import fitz  # PyMuPDF
+from PIL import Image
+
+from pdf_api.core.pdf_image_extractor import PDFImageExtractor
+
+
+def _make_pdf(page_count=3):
+    """生成包含文字、矢量图形和嵌入图像的测试PDF，页面尺寸各不相同"""
+    doc = fitz.open()
+    pixmap = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 40, 30), False)
+    pixmap.set_rect(pixmap.irect, (200, 40, 40))
+    for page_num in range(page_count):
+        page = doc.new_page(width=200 + 50 * page_num, height=150 + 30 * page_num)
+        page.insert_text((20, 30), f"Page {page_num + 1}", fontsize=14)
+        page.draw_rect(fitz.Rect(10, 50, 120, 130), color=(0, 0, 1), fill=(0.8, 0.9, 1))
+        page.draw_line(fitz.Point(0, 0), page.rect.br, color=(0, 0.5, 0), width=2)
+        page.insert_image(fitz.Rect(130, 60, 190, 105), pixmap=pixmap)
+    pdf_bytes = doc.tobytes()
+    doc.close()
+    return pdf_bytes
+
+
+class RenderPagesTest(unittest.TestCase):
+    """整页渲染的输出应与PyMuPDF的page.get_pixmap逐像素一致"""
+    
+    def setUp(self):
+        self.pdf_bytes = _make_pdf()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+    
+    def _assert_matches_get_pixmap(self, force_mode, dpi=100):
+        with PDFImageExtractor("test.pdf", output_dir=self.tmp.name, pdf_bytes=self.pdf_bytes,
+                               force_mode=force_mode, dpi=dpi, max_workers=1,
+                               output_format="png") as extractor:
+            images = extractor.extract_images()["images"]
+        
+        doc = fitz.open(stream=self.pdf_bytes, filetype="pdf")
+        self.addCleanup(doc.close)
+        self.assertEqual([info["page"] for info in images], list(range(1, doc.page_count + 1)))
+        
+        zoom = dpi / 72
+        for info in images:
+            expected = doc[info["page"] - 1].get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+            with Image.open(os.path.join(self.tmp.name, info["file_name"])) as image:
+                self.assertEqual(image.mode, "RGB")
+                self.assertEqual(image.size, (expected.width, expected.height))
+                self.assertEqual((info["width"], info["height"]), image.size)
+                self.assertEqual(image.tobytes(), expected.samples)
+    
+    def test_vector_pages_match_get_pixmap(self):
+        self._assert_matches_get_pixmap("vector")
+    
+    def test_scanned_pages_match_get_pixmap(self):
+        self._assert_matches_get_pixmap("scanned")
+    
+    def test_filter_text_leaves_document_unchanged(self):
+        with PDFImageExtractor("test.pdf", output_dir=self.tmp.name, pdf_bytes=self.pdf_bytes,
+                               force_mode="vector", dpi=72, max_workers=1, filter_text=True,
+                               output_format="png") as extractor:
+            images = extractor.extract_images()["images"]
+            
+            # 涂黑只作用于临时副本，提取器的文档对象中文字仍在
+            for page_num in range(extractor._doc.page_count):
+                self.assertIn(f"Page {page_num + 1}", extractor._doc[page_num].get_text())
+                self.assertIsNone(extractor._doc[page_num].first_annot)
+        
+        # 输出图像中的文字已被删除
+        doc = fitz.open(stream=self.pdf_bytes, filetype="pdf")
+        self.addCleanup(doc.close)
+        for info in images:
+            original = doc[info["page"] - 1].get_pixmap(alpha=False)
+            with Image.open(os.path.join(self.tmp.name, info["file_name"])) as image:
+                self.assertEqual(image.size, (original.width, original.height))
+                self.assertNotEqual(image.tobytes(), original.samples)
+
+
+class ConcurrentExtractionTest(unittest.TestCase):
+    """多个线程同时提取时（如多线程的API服务器），每次提取只等待并返回自己写入的文件"""
+    
+    def test_concurrent_extractions_write_their_own_pages(self):
+        pdf_bytes = _make_pdf(page_count=1)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        errors = []
+        
+        def extract(worker_id):
+            for round_num in range(3):
+                output_dir = os.path.join(tmp.name, f"{worker_id}_{round_num}")
+                try:
+                    with PDFImageExtractor("test.pdf", output_dir=output_dir, pdf_bytes=pdf_bytes,
+                                           force_mode="vector", max_workers=1) as extractor:
+                        images = extractor.extract_images()["images"]
+                    if len(images) != 1 or os.path.getsize(images[0]["file_path"]) == 0:
+                        errors.append(f"{output_dir}: {images}")
+                except Exception as e:
+                    errors.append(f"{output_dir}: {e!r}")
+        
+        with contextlib.redirect_stdout(io.StringIO()):
+            threads = [threading.Thread(target=extract, args=(i,)) for i in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        
+        self.assertEqual(errors, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -5,24 +5,185 @@
 PDF分析工具
 
 分析PDF文件的结构，包括页面、文本、图像、矢量图形等
+
+使用PyMuPDF分析，与原先基于pdfplumber的结果有两处不同：
+- 矢量图形按绘图路径中的每一段（直线、矩形、曲线）计数，pdfplumber按对象计数，
+  一条由多段组成的路径在这里计为多个，因此曲线数和矢量图形数通常比原先大
+- 元数据只包含文档信息字典中的标准字段（Title、Author等，键名与pdfplumber相同），
+  自定义字段不再输出
 """
 
 import os
 import sys
-import pdfplumber
 import argparse
 import json
+import hashlib
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+# PyMuPDF导入开销较大，在打开PDF的函数中再导入，只查看命令行帮助时无需加载
+
+# orjson为可选依赖，序列化大型结果时比标准库json快数倍
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# 逐页分析结果的磁盘缓存目录，按PDF内容的MD5分子目录（提取完整文本时另加-full后缀）
+# 页面分析结果的格式变化时递增CACHE_VERSION，使旧缓存失效
+CACHE_VERSION = 2
+CACHE_ROOT = os.path.join(os.path.expanduser("~"), ".cache", "pdf_parser", f"v{CACHE_VERSION}")
 
-def analyze_pdf(pdf_path):
+# PyMuPDF元数据键名与文档信息字典键名（pdfplumber输出的键名）的对应关系
+# PyMuPDF另外总会给出"format"（如"PDF 1.7"）和"encryption"，它们不属于文档信息字典，不输出
+_METADATA_KEYS = {
+    "title": "Title",
+    "author": "Author",
+    "subject": "Subject",
+    "keywords": "Keywords",
+    "creator": "Creator",
+    "producer": "Producer",
+    "creationDate": "CreationDate",
+    "modDate": "ModDate",
+    "trapped": "Trapped",
+}
+
+def _read_metadata_with_pdfplumber(pdf_path):
+    """使用pdfplumber读取PDF元数据，仅在PyMuPDF没有读到元数据时使用"""
+    import pdfplumber
+    
+    with pdfplumber.open(pdf_path) as pdf:
+        return pdf.metadata or {}
+
+def _analyze_page(page, full_text=False):
+    """
+    分析单个页面的文本、图像和矢量图形
+    
+    参数:
+        page (fitz.Page): 页面对象
+        full_text (bool): 是否按版面顺序提取文本生成摘要
+        
+    返回:
+        dict: 页面分析结果
+    """
+    import fitz  # PyMuPDF
+    
+    page_info = {
+        "页码": page.number + 1,
+        "宽度": page.rect.width,
+        "高度": page.rect.height,
+        "旋转": page.rotation,
+        "文本字符数": 0,
+        "图像数": 0,
+        "矢量图形数": 0,
+        "图像详情": [],
+        "曲线数": 0,
+        "直线数": 0,
+        "矩形数": 0
+    }
+    
+    # 统计页面字符数：直接读取底层文本跟踪中的字形，不做行/块分组的版面分析
+    chars = [char for span in page.get_texttrace() for char in span["chars"]]
+    page_info["文本字符数"] = len(chars)
+    
+    # 文本摘要默认按内容流顺序拼接前200个字符，需要版面顺序的完整文本时才提取文本
+    if full_text:
+        text = page.get_text("text")
+    else:
+        text = "".join(chr(char[0]) for char in chars[:201])
+    page_info["文本摘要"] = text[:200] + "..." if len(text) > 200 else text
+    
+    # 提取图像
+    images = page.get_images(full=True)
+    page_info["图像数"] = len(images)
+    
+    # 图像详情，位置和尺寸为图像在页面上的显示区域
+    for j, img in enumerate(images):
+        try:
+            bbox = page.get_image_bbox(img)
+        except Exception:
+            bbox = fitz.EMPTY_RECT()
+        img_info = {
+            "索引": j,
+            "位置": {
+                "x0": bbox.x0,
+                "y0": bbox.y0,
+                "x1": bbox.x1,
+                "y1": bbox.y1
+            },
+            "宽度": bbox.width,
+            "高度": bbox.height,
+            "类型": img[7] or "未知"
+        }
+        page_info["图像详情"].append(img_info)
+    
+    # 提取矢量图形，按绘图路径中的操作符分类计数
+    # "l"为直线，"re"为矩形，"c"（贝塞尔曲线）和"qu"（四边形）计为曲线
+    # 每一段单独计数，一条多段路径计为多个图形（pdfplumber按对象计数，一条路径只计一次）
+    for drawing in page.get_cdrawings():
+        for item in drawing["items"]:
+            op = item[0]
+            if op == "l":
+                page_info["直线数"] += 1
+            elif op == "re":
+                page_info["矩形数"] += 1
+            else:
+                page_info["曲线数"] += 1
+    
+    # 计算矢量图形总数
+    page_info["矢量图形数"] = page_info["曲线数"] + page_info["直线数"] + page_info["矩形数"]
+    
+    return page_info
+
+def _load_cached_page(cache_dir, page_index):
+    """读取缓存的页面分析结果，没有缓存或缓存损坏时返回None"""
+    try:
+        with open(os.path.join(cache_dir, f"page_{page_index}.json"), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _store_cached_page(cache_dir, page_index, page_info):
+    """先写入临时文件再替换，避免并发分析时读到写了一半的缓存"""
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=cache_dir,
+                                         suffix='.tmp', delete=False) as f:
+            json.dump(page_info, f, ensure_ascii=False)
+        os.replace(f.name, os.path.join(cache_dir, f"page_{page_index}.json"))
+    except OSError as e:
+        print(f"警告: 无法写入页面缓存: {e}")
+
+# 工作进程中打开的PDF文档（PyMuPDF文档对象无法跨进程传递）
+_worker_doc = None
+
+def _init_page_worker(pdf_path):
+    """工作进程初始化函数，每个进程只打开一次PDF文档"""
+    import fitz  # PyMuPDF
+    
+    global _worker_doc
+    _worker_doc = fitz.open(pdf_path)
+
+def _analyze_page_in_worker(page_index, full_text=False):
+    """在工作进程中分析单个页面"""
+    return _analyze_page(_worker_doc[page_index], full_text)
+
+def analyze_pdf(pdf_path, use_cache=True, max_workers=None, full_text=False):
     """
     分析PDF文件的结构
     
     参数:
         pdf_path (str): PDF文件路径
+        use_cache (bool): 是否使用按文件内容缓存的逐页分析结果
+        max_workers (int): 并行分析页面的进程数，默认为CPU核数，为1时不使用进程池
+        full_text (bool): 是否按版面顺序提取每页文本生成摘要，默认按内容流顺序拼接字符
         
     返回:
         dict: PDF分析结果
     """
+    import fitz  # PyMuPDF
+    
     if not os.path.exists(pdf_path):
         raise FileNotFoundError(f"PDF文件不存在: {pdf_path}")
     
@@ -33,74 +194,65 @@ def analyze_pdf(pdf_path):
         "元数据": {}
     }
     
-    # 打开PDF
-    with pdfplumber.open(pdf_path) as pdf:
+    # 只读取一次文件，计算内容哈希作为缓存目录后直接从内存打开
+    with open(pdf_path, 'rb') as f:
+        pdf_bytes = f.read()
+    cache_dir = None
+    if use_cache:
+        cache_dir = os.path.join(CACHE_ROOT, hashlib.md5(pdf_bytes).hexdigest() + ("-full" if full_text else ""))
+    
+    # 使用PyMuPDF打开PDF，避免pdfminer对每页的完整解析
+    doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+    try:
         # 获取基本信息
-        analysis["页数"] = len(pdf.pages)
+        analysis["页数"] = doc.page_count
         
-        # 获取元数据
-        if pdf.metadata:
-            analysis["元数据"] = pdf.metadata
+        # 获取元数据，键名与文档信息字典一致；PyMuPDF读不到时再用pdfplumber解析文档信息字典
+        metadata = {_METADATA_KEYS[key]: value for key, value in (doc.metadata or {}).items()
+                    if value and key in _METADATA_KEYS}
+        if not metadata:
+            metadata = _read_metadata_with_pdfplumber(pdf_path)
+        if metadata:
+            analysis["元数据"] = metadata
         
-        # 分析每一页
-        for i, page in enumerate(pdf.pages):
-            page_info = {
-                "页码": i + 1,
-                "宽度": page.width,
-                "高度": page.height,
-                "旋转": page.rotation,
-                "文本字符数": 0,
-                "图像数": 0,
-                "矢量图形数": 0,
-                "图像详情": [],
-                "曲线数": 0,
-                "直线数": 0,
-                "矩形数": 0
-            }
-            
-            # 提取文本
-            text = page.extract_text() or ""
-            page_info["文本字符数"] = len(text)
-            page_info["文本摘要"] = text[:200] + "..." if len(text) > 200 else text
-            
-            # 提取图像
-            images = page.images
-            page_info["图像数"] = len(images)
-            
-            # 图像详情
-            for j, img in enumerate(images):
-                img_info = {
-                    "索引": j,
-                    "位置": {
-                        "x0": img.get("x0", 0),
-                        "y0": img.get("top", 0),
-                        "x1": img.get("x1", 0),
-                        "y1": img.get("bottom", 0)
-                    },
-                    "宽度": img.get("width", 0),
-                    "高度": img.get("height", 0),
-                    "类型": img.get("name", "未知")
-                }
-                page_info["图像详情"].append(img_info)
-            
-            # 提取矢量图形
-            curves = page.curves
-            page_info["曲线数"] = len(curves)
-            
-            lines = page.lines
-            page_info["直线数"] = len(lines)
-            
-            rects = page.rects
-            page_info["矩形数"] = len(rects)
-            
-            # 计算矢量图形总数
-            page_info["矢量图形数"] = page_info["曲线数"] + page_info["直线数"] + page_info["矩形数"]
-            
-            # 添加页面信息
-            analysis["页面信息"].append(page_info)
+        # 已缓存的页面直接读取缓存
+        page_infos = [_load_cached_page(cache_dir, i) if cache_dir else None
+                      for i in range(doc.page_count)]
+        missing = [i for i, page_info in enumerate(page_infos) if page_info is None]
+        
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+        
+        # 各页面互相独立，未缓存的页面较多时使用进程池并行分析
+        if max_workers > 1 and len(missing) > 1:
+            with ProcessPoolExecutor(max_workers=min(max_workers, len(missing)),
+                                     initializer=_init_page_worker,
+                                     initargs=(pdf_path,)) as executor:
+                results = list(executor.map(partial(_analyze_page_in_worker, full_text=full_text), missing))
+        else:
+            results = [_analyze_page(doc[i], full_text) for i in missing]
+        
+        for i, page_info in zip(missing, results):
+            page_infos[i] = page_info
+            if cache_dir:
+                _store_cached_page(cache_dir, i, page_info)
+        
+        # 添加页面信息
+        analysis["页面信息"] = page_infos
+    finally:
+        doc.close()
     
     return analysis
 
+def _dump_json(data, output_json_path):
+    """将数据写入JSON文件，安装了orjson时使用其C实现序列化，否则使用标准库json"""
+    if orjson is not None:
+        with open(output_json_path, 'wb') as f:
+            f.write(orjson.dumps(data, default=float, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+    else:
+        with open(output_json_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2, default=float)
+
 def print_analysis(analysis):
     """打印PDF分析结果"""
     print(f"\nPDF文件: {analysis['文件名']}")
@@ -160,20 +312,23 @@ def main():
     parser = argparse.ArgumentParser(description='分析PDF文件结构')
     parser.add_argument('pdf_path', help='PDF文件路径')
     parser.add_argument('--json', '-j', help='将分析结果保存为JSON文件')
+    parser.add_argument('--no-cache', action='store_true', help='不使用逐页分析结果缓存')
+    parser.add_argument('--workers', '-w', type=int, default=None, help='并行分析页面的进程数，默认为CPU核数')
+    parser.add_argument('--full-text', action='store_true', help='按版面顺序提取每页文本生成摘要')
     
     args = parser.parse_args()
     
     try:
         # 分析PDF
-        analysis = analyze_pdf(args.pdf_path)
+        analysis = analyze_pdf(args.pdf_path, use_cache=not args.no_cache, max_workers=args.workers,
+                               full_text=args.full_text)
         
         # 打印分析结果
         print_analysis(analysis)
         
         # 如果指定了JSON输出路径，保存为JSON
         if args.json:
-            with open(args.json, 'w', encoding='utf-8') as f:
-                json.dump(analysis, f, ensure_ascii=False, indent=2)
+            _dump_json(analysis, args.json)
             print(f"\n分析结果已保存到: {args.json}")
             
     except Exception as e:
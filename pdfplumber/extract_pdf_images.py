@@ -9,15 +9,471 @@ PDF图像提取工具 (结合PyMuPDF和pdfplumber)
 
 import os
 import sys
-import fitz  # PyMuPDF
 import argparse
-from PIL import Image
-import hashlib
+import logging
 from io import BytesIO
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
 import numpy as np
+from bisect import bisect_left, bisect_right
 
-def extract_images(pdf_path, output_dir, min_size=100, overlap_threshold=0.6, save_images=True):
+# PyMuPDF和PIL导入开销较大，在实际需要打开PDF或处理图像的函数中再导入
+
+logger = logging.getLogger(__name__)
+
+
+def _configure_worker_logging(log_level):
+    """以spawn方式启动的工作进程没有日志配置，按主进程的级别配置，fork方式启动时沿用继承的配置"""
+    if not logging.getLogger().handlers:
+        logging.basicConfig(format="%(message)s")
+    logger.setLevel(log_level)
+
+
+# pHash参数：缩放到32x32后做DCT，取左上角8x8低频系数生成64位指纹
+PHASH_IMAGE_SIZE = 32
+PHASH_HASH_SIZE = 8
+# 汉明距离不超过该值的图像视为重复
+PHASH_MAX_DISTANCE = 2
+# 未安装Numba时，重复检测每次计算该行数的图像与之前所有图像的汉明距离
+DUPLICATE_BLOCK_ROWS = 256
+# 单页矩形数不少于该值时，重叠过滤改用扫描线，只比较x方向可能相交的矩形
+SWEEP_MIN_RECTS = 256
+
+
+# 保存图片时可选的输出格式：None保持原始数据，"webp"转为WebP，"png_opt"用oxipng无损优化PNG
+OUTPUT_FORMATS = (None, "webp", "png_opt")
+WEBP_QUALITY = 85
+
+
+@lru_cache(maxsize=None)
+def _oxipng():
+    """可选的pyoxipng模块（无损优化PNG），未安装时返回None"""
+    try:
+        import oxipng
+    except ImportError:
+        return None
+    return oxipng
+
+
+def _check_output_format(output_format):
+    """检查输出格式是否可用"""
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"不支持的输出格式: {output_format}，可选值为 webp、png_opt")
+    if output_format == "png_opt" and _oxipng() is None:
+        raise ImportError("输出格式png_opt需要安装pyoxipng")
+
+
+def _convert_image(image_bytes, image_ext, output_format):
+    """
+    按输出格式转换图片数据
+    
+    参数:
+        image_bytes (bytes): 原始图片数据
+        image_ext (str): 原始图片扩展名
+        output_format (str): 输出格式，取值见OUTPUT_FORMATS
+    
+    返回:
+        tuple: (图片数据, 扩展名)
+    """
+    if output_format == "webp":
+        from PIL import Image
+        
+        pil_image = Image.open(BytesIO(image_bytes))
+        has_alpha = "A" in pil_image.getbands() or "transparency" in pil_image.info
+        buffer = BytesIO()
+        pil_image.convert("RGBA" if has_alpha else "RGB").save(buffer, format="WEBP", quality=WEBP_QUALITY, method=4)
+        return buffer.getbuffer(), "webp"
+    if output_format == "png_opt" and image_ext == "png":
+        return _oxipng().optimize_from_memory(bytes(image_bytes), level=2), "png"
+    return image_bytes, image_ext
+
+
+# 以二进制方式写入新文件的标志（Windows上需要O_BINARY）
+_WRITE_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0)
+
+
+def _write_bytes(path, data):
+    """
+    通过文件描述符直接写入图片数据，不经过缓冲文件对象
+    
+    参数:
+        path (str): 输出文件路径
+        data (bytes): 图片数据
+    """
+    fd = os.open(path, _WRITE_FLAGS, 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+
+
+@lru_cache(maxsize=None)
+def _dct_matrix(n):
+    """生成n阶正交DCT-II变换矩阵"""
+    k = np.arange(n).reshape(-1, 1)
+    i = np.arange(n).reshape(1, -1)
+    matrix = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+    matrix[0, :] = np.sqrt(1.0 / n)
+    return matrix.astype(np.float32)
+
+
+def compute_phash(pil_image):
+    """
+    计算图像的64位感知哈希（pHash）
+    
+    参数:
+        pil_image (PIL.Image): 图像
+    
+    返回:
+        int: 64位无符号整数形式的pHash
+    """
+    from PIL import Image
+    
+    gray = pil_image.convert("L").resize((PHASH_IMAGE_SIZE, PHASH_IMAGE_SIZE), Image.BILINEAR)
+    pixels = np.asarray(gray, dtype=np.float32)
+    
+    # 二维DCT，只保留低频部分
+    dct_matrix = _dct_matrix(PHASH_IMAGE_SIZE)
+    dct = (dct_matrix @ pixels @ dct_matrix.T)[:PHASH_HASH_SIZE, :PHASH_HASH_SIZE]
+    
+    # 以除直流分量外的中位数为阈值生成64位指纹
+    bits = (dct > np.median(dct.flat[1:])).flatten()
+    return int(np.packbits(bits).view(">u8")[0])
+
+
+# 统计64位整数中置位数的SWAR常量，Numba中需保持uint64运算
+_M1 = np.uint64(0x5555555555555555)
+_M2 = np.uint64(0x3333333333333333)
+_M4 = np.uint64(0x0F0F0F0F0F0F0F0F)
+_H01 = np.uint64(0x0101010101010101)
+
+# 每个字节值的置位数，NumPy实现按字节查表统计汉明距离
+_POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def _duplicate_loop(hashes, max_distance, duplicate):
+    """
+    按出现顺序标记重复图像，结果写入duplicate
+    只使用标量运算和数组下标，供Numba编译；异或、置位计数和阈值比较在一次遍历中完成
+    
+    参数:
+        hashes: uint64数组，每个图像的pHash
+        max_distance (int): 视为重复的最大汉明距离
+        duplicate: 长度为N的布尔数组，初始全为False
+    """
+    for i in range(hashes.shape[0]):
+        for j in range(i):
+            if duplicate[j]:
+                continue
+            x = hashes[i] ^ hashes[j]
+            x = x - ((x >> np.uint64(1)) & _M1)
+            x = (x & _M2) + ((x >> np.uint64(2)) & _M2)
+            x = (x + (x >> np.uint64(4))) & _M4
+            if (x * _H01) >> np.uint64(56) <= max_distance:
+                duplicate[i] = True
+                break
+
+
+def _overlap_loop(R, overlap_threshold, keep):
+    """
+    按面积从大到小的顺序贪心过滤重叠矩形，结果写入keep
+    只使用标量运算和数组下标，供Numba编译；与已保留的矩形逐个比较，遇到需要过滤的情况立即停止
+    
+    参数:
+        R: (N, 5) 的数组 (x0, y0, x1, y1, area)，已按面积从大到小排序
+        overlap_threshold (float): 重叠阈值
+        keep: 长度为N的布尔数组，初始全为False
+    """
+    for j in range(R.shape[0]):
+        area = R[j, 4]
+        should_keep = True
+        if area > 0:
+            for i in range(j):
+                if not keep[i]:
+                    continue
+                w = min(R[i, 2], R[j, 2]) - max(R[i, 0], R[j, 0])
+                h = min(R[i, 3], R[j, 3]) - max(R[i, 1], R[j, 1])
+                if w > 0 and h > 0 and w * h / area > overlap_threshold:
+                    should_keep = False
+                    break
+        keep[j] = should_keep
+
+
+@lru_cache(maxsize=None)
+def _duplicate_kernel():
+    """用Numba编译_duplicate_loop，未安装Numba时返回None，由NumPy实现代替"""
+    try:
+        from numba import njit
+    except ImportError:
+        return None
+    return njit(cache=True)(_duplicate_loop)
+
+
+@lru_cache(maxsize=None)
+def _overlap_kernel():
+    """用Numba编译_overlap_loop，未安装Numba时返回None，由_overlap_numpy代替"""
+    try:
+        from numba import njit
+    except ImportError:
+        return None
+    return njit(cache=True)(_overlap_loop)
+
+
+def find_duplicate_images(phashes, max_distance=PHASH_MAX_DISTANCE):
+    """
+    根据pHash的汉明距离查找重复图像，每组相似图像只保留第一张
+    
+    参数:
+        phashes (list): 每个图像的pHash
+        max_distance (int): 视为重复的最大汉明距离
+    
+    返回:
+        numpy.ndarray: 布尔数组，True表示该图像是前面某张图像的重复
+    """
+    n = len(phashes)
+    duplicate = np.zeros(n, dtype=bool)
+    if n < 2:
+        return duplicate
+    
+    h = np.array(phashes, dtype=np.uint64)
+    
+    # 安装了Numba时逐对比较，不生成N×N的距离矩阵
+    kernel = _duplicate_kernel()
+    if kernel is not None:
+        kernel(h, max_distance, duplicate)
+        return duplicate
+    
+    # 按行分块，每次只计算一块图像与之前保留的图像之间的汉明距离，
+    # 内存占用为 块大小×保留数，不随图像数量平方增长
+    kept = np.empty(0, dtype=np.uint64)
+    for start in range(0, n, DUPLICATE_BLOCK_ROWS):
+        stop = min(start + DUPLICATE_BLOCK_ROWS, n)
+        block = h[start:stop]
+        block_duplicate = duplicate[start:stop]
+        
+        # 与之前各块中保留的图像相似即为重复
+        if len(kept):
+            block_duplicate[:] = (_hamming_distances(block, kept) <= max_distance).any(axis=1)
+        
+        # 块内按出现顺序保留每组中的第一张，保留的图像标记块内排在它之后的相似图像
+        similar = _hamming_distances(block, block) <= max_distance
+        for i in range(stop - start):
+            if not block_duplicate[i]:
+                block_duplicate[i + 1:] |= similar[i, i + 1:]
+        
+        kept = np.concatenate([kept, block[~block_duplicate]])
+    return duplicate
+
+
+def _hamming_distances(a, b):
+    """
+    计算两组64位哈希两两之间的汉明距离
+    
+    参数:
+        a (numpy.ndarray): uint64数组
+        b (numpy.ndarray): uint64数组
+    
+    返回:
+        numpy.ndarray: 形状为(len(a), len(b))的uint8数组
+    """
+    # 两两异或后按字节查表统计不同的位数
+    xor = a[:, None] ^ b[None, :]
+    return _POPCOUNT_TABLE[xor.view(np.uint8)].reshape(len(a), len(b), 8).sum(axis=-1, dtype=np.uint8)
+
+
+def filter_overlapping_rects(boxes, overlap_threshold):
+    """
+    按面积从大到小贪心地过滤与已保留矩形显著重叠的矩形
+    
+    参数:
+        boxes (numpy.ndarray): 形状为(N, 5)的数组，每行为 (x0, y0, x1, y1, area)
+        overlap_threshold (float): 重叠阈值，重叠面积占矩形自身面积的比例超过该值时过滤
+    
+    返回:
+        numpy.ndarray: 布尔数组，True表示保留该矩形
+    """
+    n = len(boxes)
+    # 按面积从大到小排序（稳定排序，面积相同时保持原顺序）
+    order = np.argsort(-boxes[:, 4], kind="stable")
+    R = boxes[order]
+    keep_sorted = np.zeros(n, dtype=bool)
+    
+    if n >= SWEEP_MIN_RECTS:
+        _overlap_sweep(R, overlap_threshold, keep_sorted)
+    elif _overlap_kernel() is not None:
+        _overlap_kernel()(R, overlap_threshold, keep_sorted)
+    else:
+        _overlap_numpy(R, overlap_threshold, keep_sorted)
+    
+    keep = np.empty(n, dtype=bool)
+    keep[order] = keep_sorted
+    return keep
+
+
+def _overlap_sweep(R, overlap_threshold, keep):
+    """
+    _overlap_loop的扫描线实现，参数相同
+    已保留的矩形按x0有序存放，每个矩形只与x方向可能相交的已保留矩形比较，
+    矩形较多且分散时远少于两两比较
+    """
+    rows = R.tolist()
+    # 已保留矩形的x0（升序）及对应的行号
+    kept_x0 = []
+    kept_rows = []
+    # 已保留矩形的最大宽度，x0小于 当前x0 - max_width 的矩形不可能与当前矩形相交
+    max_width = 0.0
+    
+    for j, (x0, y0, x1, y1, area) in enumerate(rows):
+        should_keep = True
+        if area > 0:
+            for k in range(bisect_left(kept_x0, x0 - max_width), bisect_left(kept_x0, x1)):
+                bx0, by0, bx1, by1, _ = rows[kept_rows[k]]
+                w = min(bx1, x1) - max(bx0, x0)
+                if w <= 0:
+                    continue
+                h = min(by1, y1) - max(by0, y0)
+                if h > 0 and w * h / area > overlap_threshold:
+                    should_keep = False
+                    break
+        keep[j] = should_keep
+        
+        if should_keep:
+            pos = bisect_right(kept_x0, x0)
+            kept_x0.insert(pos, x0)
+            kept_rows.insert(pos, j)
+            max_width = max(max_width, x1 - x0)
+
+
+def _overlap_numpy(R, overlap_threshold, keep):
+    """_overlap_loop的NumPy实现，一次性计算所有矩形两两之间的重叠关系，参数相同"""
+    # 一次性计算两两之间的重叠面积
+    ox0 = np.maximum(R[:, None, 0], R[None, :, 0])
+    oy0 = np.maximum(R[:, None, 1], R[None, :, 1])
+    ox1 = np.minimum(R[:, None, 2], R[None, :, 2])
+    oy1 = np.minimum(R[:, None, 3], R[None, :, 3])
+    inter = np.clip(ox1 - ox0, 0, None) * np.clip(oy1 - oy0, 0, None)
+    
+    # [i, j]为重叠面积占矩形j面积的比例（面积为0的矩形不视为被覆盖）
+    areas = R[None, :, 4]
+    ratio = np.divide(inter, areas, out=np.zeros_like(inter), where=areas > 0)
+    covers = np.triu(ratio > overlap_threshold, 1)
+    
+    # 依次保留未被任何已保留矩形覆盖的矩形
+    for j in range(len(keep)):
+        keep[j] = not (covers[:j, j] & keep[:j]).any()
+
+
+def _process_page(doc, page_idx, skip_xrefs=(), min_size=100, keep_bytes=True):
+    """
+    提取单个页面上的图像
+    
+    参数:
+        doc (fitz.Document): PDF文档
+        page_idx (int): 页码（从0开始）
+        skip_xrefs (set): 已在前面页面中出现过的图像xref，不再重复解码
+        min_size (int): 最小图像尺寸（像素）
+        keep_bytes (bool): 是否返回图像数据，用于过滤后保存
+    
+    返回:
+        list: 每个元素为 (图像信息, 图像数据)，不需要图像数据时为None
+    """
+    from PIL import Image
+    
+    logger.info("处理第 %d 页...", page_idx + 1)
+    page = doc[page_idx]
+    results = []
+    
+    # 获取页面上的所有图像
+    image_list = page.get_images(full=True)
+    
+    # 处理每个图像
+    for img_idx, img in enumerate(image_list):
+        try:
+            # 获取图像xref，同一图像对象只在首次出现的页面上提取
+            xref = img[0]
+            if xref in skip_xrefs:
+                continue
+            
+            # 提取图像
+            base_image = doc.extract_image(xref)
+            image_bytes = base_image["image"]
+            image_ext = base_image["ext"]
+            
+            # PyMuPDF提取时已给出图像尺寸
+            width, height = base_image["width"], base_image["height"]
+            
+            # 跳过太小的图像
+            if width * height < min_size:
+                continue
+            
+            # 计算图像感知哈希，用于识别重新编码或缩放过的重复图像
+            pil_image = Image.open(BytesIO(image_bytes))
+            phash = compute_phash(pil_image)
+            img_hash = f"{phash:016x}"
+            
+            # 获取图像在页面上的位置
+            try:
+                # 尝试获取图像的边界框
+                bbox = page.get_image_bbox(img)
+                if bbox:
+                    x0, y0, x1, y1 = bbox
+                else:
+                    # 如果无法获取边界框，使用默认值
+                    x0, y0 = 0, 0
+                    x1, y1 = width, height
+            except Exception as e:
+                logger.debug("  警告: 无法获取图像边界框: %s", e)
+                x0, y0 = 0, 0
+                x1, y1 = width, height
+            
+            # 创建图像信息
+            image_info = {
+                "page_index": page_idx + 1,
+                "image_index": img_idx + 1,
+                "width": width,
+                "height": height,
+                "format": image_ext.upper(),
+                "size_bytes": len(image_bytes),
+                "hash": img_hash,
+                "phash": phash,
+                "xref": xref,
+                "x0": x0,
+                "y0": y0,
+                "x1": x1,
+                "y1": y1
+            }
+            
+            results.append((image_info, (image_ext, image_bytes) if keep_bytes else None))
+            
+        except Exception as e:
+            logger.warning("  警告: 提取图像 #%d 时出错: %s", img_idx, e)
+    
+    return results
+
+
+# 工作进程中打开的PDF文档（PyMuPDF文档对象无法跨进程传递）
+_worker_doc = None
+
+
+def _init_page_worker(pdf_path, log_level=logging.INFO):
+    """工作进程初始化函数，每个进程只打开一次PDF文档，并沿用主进程的日志级别"""
+    import fitz  # PyMuPDF
+    
+    global _worker_doc
+    _configure_worker_logging(log_level)
+    _worker_doc = fitz.open(pdf_path)
+
+
+def _process_page_in_worker(page_idx, skip_xrefs, **options):
+    """在工作进程中提取单个页面上的图像"""
+    return _process_page(_worker_doc, page_idx, skip_xrefs, **options)
+
+
+def extract_images(pdf_path, output_dir, min_size=100, overlap_threshold=0.6, save_images=True,
+                   max_workers=None, output_format=None):
     """
     从PDF中提取图像，并过滤重叠图像
     
@@ -27,167 +483,117 @@ def extract_images(pdf_path, output_dir, min_size=100, overlap_threshold=0.6, sa
         min_size (int): 最小图像尺寸（像素）
         overlap_threshold (float): 重叠阈值，0-1之间
         save_images (bool): 是否保存图像
+        max_workers (int): 并行处理页面的进程数，默认为CPU核数，为1时不使用进程池
+        output_format (str): 保存图像的格式，默认保持原始数据，"webp"转为WebP，"png_opt"无损优化PNG
     
     返回:
         list: 提取的图像信息列表
     """
+    import fitz  # PyMuPDF
+    
+    if save_images:
+        _check_output_format(output_format)
+    
     # 确保输出目录存在
     if save_images and not os.path.exists(output_dir):
         os.makedirs(output_dir)
     
     # 打开PDF文件
     doc = fitz.open(pdf_path)
+    page_count = doc.page_count
+    
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    
+    page_options = {"min_size": min_size, "keep_bytes": save_images}
+    
+    # 同一图像对象（如徽标、页框）常被多个页面引用，只读取页面资源列出各xref所在的页面，
+    # 每个xref只在首次出现的页面上解码一次
+    xref_pages = defaultdict(list)
+    page_skip_xrefs = []
+    for page_idx in range(page_count):
+        skip_xrefs = set()
+        for img in doc.get_page_images(page_idx):
+            pages = xref_pages[img[0]]
+            if pages and pages[0] != page_idx + 1:
+                skip_xrefs.add(img[0])
+            if not pages or pages[-1] != page_idx + 1:
+                pages.append(page_idx + 1)
+        page_skip_xrefs.append(skip_xrefs)
+    
+    # 各页面互相独立，页数较多时使用进程池并行处理
+    if max_workers > 1 and page_count > 1:
+        # 子进程各自打开文档，主进程的文档不再需要
+        doc.close()
+        with ProcessPoolExecutor(max_workers=min(max_workers, page_count),
+                                 initializer=_init_page_worker,
+                                 initargs=(pdf_path, logger.getEffectiveLevel())) as executor:
+            page_results = list(executor.map(partial(_process_page_in_worker, **page_options),
+                                             range(page_count), page_skip_xrefs))
+    else:
+        page_results = [_process_page(doc, page_idx, page_skip_xrefs[page_idx], **page_options)
+                        for page_idx in range(page_count)]
+        
+        # 关闭PDF文档
+        doc.close()
     
     # 存储图像信息
     all_images = []
-    # 存储每页的图像矩形信息
-    page_rects = defaultdict(list)
+    # 存储每个图像的pHash
+    phashes = []
+    # 存储待保存图像的扩展名和数据
+    image_data = []
+    # 所有图像的页码和矩形按行存放在一个数组中，列为 (页码, x0, y0, x1, y1, 面积)
+    rects = np.empty((sum(len(results) for results in page_results), 6), dtype=np.float32)
     
-    # 遍历每一页
-    for page_idx, page in enumerate(doc):
-        print(f"处理第 {page_idx + 1} 页...")
-        
-        # 创建页面子目录
-        if save_images:
-            page_dir = os.path.join(output_dir, f"page_{page_idx + 1}")
-            if not os.path.exists(page_dir):
-                os.makedirs(page_dir)
-        
-        # 获取页面上的所有图像
-        image_list = page.get_images(full=True)
-        
-        # 处理每个图像
-        for img_idx, img in enumerate(image_list):
-            try:
-                # 获取图像xref
-                xref = img[0]
-                
-                # 提取图像
-                base_image = doc.extract_image(xref)
-                image_bytes = base_image["image"]
-                image_ext = base_image["ext"]
-                
-                # 使用PIL打开图像
-                pil_image = Image.open(BytesIO(image_bytes))
-                width, height = pil_image.size
-                
-                # 跳过太小的图像
-                if width * height < min_size:
-                    continue
-                
-                # 计算图像哈希值
-                img_hash = hashlib.md5(image_bytes).hexdigest()
-                
-                # 获取图像在页面上的位置
-                try:
-                    # 尝试获取图像的边界框
-                    bbox = page.get_image_bbox(img)
-                    if bbox:
-                        x0, y0, x1, y1 = bbox
-                    else:
-                        # 如果无法获取边界框，使用默认值
-                        x0, y0 = 0, 0
-                        x1, y1 = width, height
-                except Exception as e:
-                    print(f"  警告: 无法获取图像边界框: {e}")
-                    x0, y0 = 0, 0
-                    x1, y1 = width, height
-                
-                # 创建图像信息
-                image_info = {
-                    "page_index": page_idx + 1,
-                    "image_index": img_idx + 1,
-                    "width": width,
-                    "height": height,
-                    "format": image_ext.upper(),
-                    "size_bytes": len(image_bytes),
-                    "hash": img_hash,
-                    "x0": x0,
-                    "y0": y0,
-                    "x1": x1,
-                    "y1": y1
-                }
-                
-                # 保存图像
-                if save_images:
-                    output_filename = f"img{img_idx+1}_{img_hash[:8]}.{image_ext}"
-                    output_path = os.path.join(page_dir, output_filename)
-                    with open(output_path, "wb") as f:
-                        f.write(image_bytes)
-                    image_info["saved_path"] = output_path
-                
-                # 添加到结果列表
-                all_images.append(image_info)
-                
-                # 保存矩形信息
-                page_rects[page_idx].append({
-                    "rect": (x0, y0, x1, y1),
-                    "area": (x1 - x0) * (y1 - y0),
-                    "index": len(all_images) - 1
-                })
-                
-            except Exception as e:
-                print(f"  警告: 提取图像 #{img_idx} 时出错: {e}")
+    # 按页码顺序合并各页面的结果，同一页面的图像在rects中连续存放
+    for page_idx, results in enumerate(page_results):
+        for image_info, data in results:
+            # 记录引用该图像对象的所有页面
+            image_info["referenced_pages"] = xref_pages[image_info["xref"]]
+            rects[len(all_images), :5] = (page_idx, image_info["x0"], image_info["y0"],
+                                          image_info["x1"], image_info["y1"])
+            all_images.append(image_info)
+            phashes.append(image_info["phash"])
+            image_data.append(data)
+    
+    rects[:, 5] = (rects[:, 3] - rects[:, 1]) * (rects[:, 4] - rects[:, 2])
+    
+    # 过滤重复图像
+    duplicate = find_duplicate_images(phashes)
+    keep = ~duplicate
     
     # 过滤重叠图像
     if overlap_threshold < 1.0:
-        # 存储要保留的图像索引
-        indices_to_keep = set()
-        
-        # 按页面处理
-        for page_idx, rects in page_rects.items():
-            # 按面积从大到小排序
-            sorted_rects = sorted(rects, key=lambda x: x["area"], reverse=True)
-            
-            # 处理每个矩形
-            for i, rect1 in enumerate(sorted_rects):
-                # 如果已经决定保留这个图像，跳过进一步检查
-                if rect1["index"] in indices_to_keep:
-                    continue
-                    
-                # 默认保留这个图像
-                keep = True
-                
-                # 检查这个矩形是否与已保留的任何矩形有显著重叠
-                for kept_idx in indices_to_keep:
-                    # 找到已保留矩形的信息
-                    kept_rect_info = next((r for r in sorted_rects if r["index"] == kept_idx), None)
-                    if not kept_rect_info:
-                        continue
-                        
-                    # 获取两个矩形的坐标
-                    x0_1, y0_1, x1_1, y1_1 = rect1["rect"]
-                    x0_2, y0_2, x1_2, y1_2 = kept_rect_info["rect"]
-                    
-                    # 计算重叠区域
-                    overlap_x0 = max(x0_1, x0_2)
-                    overlap_y0 = max(y0_1, y0_2)
-                    overlap_x1 = min(x1_1, x1_2)
-                    overlap_y1 = min(y1_1, y1_2)
-                    
-                    # 检查是否有重叠
-                    if overlap_x0 < overlap_x1 and overlap_y0 < overlap_y1:
-                        # 计算重叠面积
-                        overlap_area = (overlap_x1 - overlap_x0) * (overlap_y1 - overlap_y0)
-                        
-                        # 计算当前矩形的面积
-                        rect1_area = rect1["area"]
-                        
-                        # 如果重叠面积占当前矩形的比例超过阈值，则不保留当前矩形
-                        if overlap_area / rect1_area > overlap_threshold:
-                            keep = False
-                            break
-                
-                # 如果决定保留这个图像
-                if keep:
-                    indices_to_keep.add(rect1["index"])
-        
-        # 只保留选定的图像
-        filtered_images = [img for i, img in enumerate(all_images) if i in indices_to_keep]
-        all_images = filtered_images
+        # 按页面处理，每页的图像是rects中的一段连续行，重复图像不参与比较
+        _, starts = np.unique(rects[:, 0], return_index=True)
+        bounds = np.append(starts, len(rects))
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            indices = start + np.flatnonzero(~duplicate[start:end])
+            if indices.size:
+                keep[indices] = filter_overlapping_rects(rects[indices, 1:], overlap_threshold)
     
-    # 关闭PDF文档
-    doc.close()
+    # 只保留选定的图像
+    kept_indices = np.flatnonzero(keep).tolist()
+    all_images = [all_images[i] for i in kept_indices]
+    
+    # 保存图像
+    if save_images:
+        for i, image_info in zip(kept_indices, all_images):
+            image_ext, image_bytes = image_data[i]
+            if output_format:
+                image_bytes, image_ext = _convert_image(image_bytes, image_ext, output_format)
+                image_info["format"] = image_ext.upper()
+                image_info["size_bytes"] = len(image_bytes)
+            
+            # 创建页面子目录
+            page_dir = os.path.join(output_dir, f"page_{image_info['page_index']}")
+            os.makedirs(page_dir, exist_ok=True)
+            
+            output_filename = f"img{image_info['image_index']}_{image_info['hash'][:8]}.{image_ext}"
+            output_path = os.path.join(page_dir, output_filename)
+            _write_bytes(output_path, image_bytes)
+            image_info["saved_path"] = output_path
     
     return all_images
 
@@ -247,6 +653,8 @@ def print_summary(images):
     for i, img in enumerate(images[:5]):
         print(f"\n图像 #{i+1}:")
         print(f"  页码: {img['page_index']}")
+        if len(img.get("referenced_pages", ())) > 1:
+            print(f"  引用页面: {', '.join(map(str, img['referenced_pages']))}")
         print(f"  尺寸: {img['width']}x{img['height']}像素")
         print(f"  格式: {img['format']}")
         print(f"  大小: {img['size_bytes']/1024:.2f} KB")
@@ -262,11 +670,17 @@ def main():
     parser.add_argument('--overlap-threshold', '-t', type=float, default=0.6, 
                         help='重叠面积比例阈值，默认为0.6，范围0-1之间')
     parser.add_argument('--no-save', '-n', action='store_true', help='不保存图像到文件系统')
+    parser.add_argument('--workers', '-w', type=int, default=None, help='并行处理页面的进程数，默认为CPU核数')
+    parser.add_argument('--quiet', '-q', action='store_true', help='不输出逐页处理进度')
+    parser.add_argument('--format', '-f', choices=['webp', 'png_opt'], default=None,
+                        help='保存图像的格式：webp转为WebP，png_opt无损优化PNG，默认保持原始数据')
     
     args = parser.parse_args()
     
+    logging.basicConfig(level=logging.WARNING if args.quiet else logging.INFO, format="%(message)s")
+    
     try:
-        print(f"开始处理PDF: {args.pdf_path}")
+        logger.info("开始处理PDF: %s", args.pdf_path)
         
         # 提取图像
         extracted_images = extract_images(
@@ -274,7 +688,9 @@ def main():
             args.output_dir,
             min_size=args.min_size,
             overlap_threshold=args.overlap_threshold,
-            save_images=not args.no_save
+            save_images=not args.no_save,
+            max_workers=args.workers,
+            output_format=args.format
         )
         
         # 打印摘要
@@ -2,21 +2,268 @@
 # -*- coding: utf-8 -*-
 
 """
-PDF图片提取工具 (使用pdfplumber和pypdfium2)
+PDF图片提取工具 (使用pdfplumber、PyMuPDF和pypdfium2)
 
 从PDF文件中提取图片并按页码分组保存到本地
 """
 
 import os
 import json
+import logging
 import hashlib
-import pdfplumber
-import pypdfium2 as pdfium
-from PIL import Image
 from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
 
+# pdfplumber、pypdfium2和PyMuPDF导入开销较大，在打开PDF的函数中再导入
 
-def extract_images_from_pdf(pdf_path, output_dir=None, save_images=True, group_by_page=True):
+# orjson为可选依赖，序列化大型结果时比标准库json快数倍
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+logger = logging.getLogger(__name__)
+
+
+def _configure_worker_logging(log_level):
+    """以spawn方式启动的工作进程没有日志配置，按主进程的级别配置，fork方式启动时沿用继承的配置"""
+    if not logging.getLogger().handlers:
+        logging.basicConfig(format="%(message)s")
+    logger.setLevel(log_level)
+
+
+# PNG压缩级别：编码是主要开销，使用最快的级别
+PNG_COMPRESS_LEVEL = 1
+
+# PyMuPDF给出的颜色分量数对应的颜色模式
+_COLORSPACE_MODES = {1: "L", 3: "RGB", 4: "CMYK"}
+
+# 保存图片时可选的输出格式：None保持原始数据，"webp"转为WebP，"png_opt"用oxipng无损优化PNG
+OUTPUT_FORMATS = (None, "webp", "png_opt")
+WEBP_QUALITY = 85
+
+
+@lru_cache(maxsize=None)
+def _oxipng():
+    """可选的pyoxipng模块（无损优化PNG），未安装时返回None"""
+    try:
+        import oxipng
+    except ImportError:
+        return None
+    return oxipng
+
+
+def _check_output_format(output_format):
+    """检查输出格式是否可用"""
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"不支持的输出格式: {output_format}，可选值为 webp、png_opt")
+    if output_format == "png_opt" and _oxipng() is None:
+        raise ImportError("输出格式png_opt需要安装pyoxipng")
+
+
+def _convert_image(image_bytes, image_ext, output_format):
+    """
+    按输出格式转换图片数据
+    
+    参数:
+        image_bytes (bytes): 原始图片数据
+        image_ext (str): 原始图片扩展名
+        output_format (str): 输出格式，取值见OUTPUT_FORMATS
+    
+    返回:
+        tuple: (图片数据, 扩展名)
+    """
+    if output_format == "webp":
+        from PIL import Image
+        
+        pil_image = Image.open(BytesIO(image_bytes))
+        has_alpha = "A" in pil_image.getbands() or "transparency" in pil_image.info
+        buffer = BytesIO()
+        pil_image.convert("RGBA" if has_alpha else "RGB").save(buffer, format="WEBP", quality=WEBP_QUALITY, method=4)
+        return buffer.getbuffer(), "webp"
+    if output_format == "png_opt" and image_ext == "png":
+        return _oxipng().optimize_from_memory(bytes(image_bytes), level=2), "png"
+    return image_bytes, image_ext
+
+
+# 以二进制方式写入新文件的标志（Windows上需要O_BINARY）
+_WRITE_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0)
+
+
+def _write_bytes(path, data):
+    """
+    通过文件描述符直接写入图片数据，不经过缓冲文件对象
+    
+    参数:
+        path (str): 输出文件路径
+        data (bytes): 图片数据
+    """
+    fd = os.open(path, _WRITE_FLAGS, 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+
+
+def _process_page(pdf, pdf_file, fitz_doc, page_index, output_dir=None, save_images=True, group_by_page=True,
+                  output_format=None):
+    """
+    提取单个页面上的图片
+    
+    参数:
+        pdf (pdfplumber.PDF): pdfplumber打开的PDF，用于获取图片位置
+        pdf_file (pypdfium2.PdfDocument): pypdfium2打开的PDF，用于渲染无法直接读取的图片
+        fitz_doc (fitz.Document): PyMuPDF打开的PDF，用于直接读取嵌入的图片数据
+        page_index (int): 页码（从0开始）
+        output_dir (str, 可选): 保存图片的目录
+        save_images (bool, 可选): 是否将图片保存到文件系统
+        group_by_page (bool, 可选): 是否按页码分组创建子文件夹保存图片
+        output_format (str, 可选): 保存图片的格式，取值见OUTPUT_FORMATS
+    
+    返回:
+        list: 该页面上的图片信息列表
+    """
+    results = []
+    
+    # 获取页面上的图片列表
+    image_list = pdf.pages[page_index].images
+    pdf_page = pdf_file[page_index]
+    
+    # 页面资源中图片XObject的名称与xref的对应关系，名称与pdfplumber图片对象的name一致
+    xrefs_by_name = {item[7]: item[0] for item in fitz_doc.get_page_images(page_index, full=True)}
+    
+    # 如果按页码分组并且有图片，创建页面目录
+    if group_by_page and save_images and image_list:
+        page_dir = os.path.join(output_dir, f"page_{page_index + 1}")
+        os.makedirs(page_dir, exist_ok=True)
+    
+    # 遍历页面上的每个图片
+    for img_index, img in enumerate(image_list):
+        # 使用pypdfium2提取图片内容
+        try:
+            # 获取图片位置信息
+            x0, y0, x1, y1 = img['x0'], img['top'], img['x1'], img['bottom']
+            width = int(x1 - x0)
+            height = int(y1 - y0)
+            
+            # 页面中嵌入的图片对象直接读取原始数据，无需渲染
+            base_image = None
+            xref = xrefs_by_name.get(img.get('name'))
+            if xref:
+                base_image = fitz_doc.extract_image(xref)
+            
+            if base_image:
+                image_bytes = base_image["image"]
+                image_ext = base_image["ext"]
+                image_format = image_ext.upper()
+                color_mode = _COLORSPACE_MODES.get(base_image["colorspace"], base_image.get("cs-name", "未知"))
+            else:
+                # 内联图片或表单XObject中的图片找不到对应的xref，回退为使用pypdfium2渲染该区域
+                bitmap = pdf_page.render(
+                    scale=1.0,
+                    rotation=0,
+                    crop=(x0, y0, x1, y1)
+                )
+                pil_image = bitmap.to_pil()
+                color_mode = pil_image.mode
+                img_byte_arr = BytesIO()
+                
+                # 渲染结果只编码一次，哈希和保存都使用这份数据；输出WebP时直接编码为WebP
+                if save_images and output_format == "webp":
+                    image_format = 'WEBP'
+                    pil_image.save(img_byte_arr, format=image_format, quality=WEBP_QUALITY, method=4)
+                else:
+                    image_format = 'PNG'
+                    pil_image.save(img_byte_arr, format=image_format, optimize=False,
+                                   compress_level=PNG_COMPRESS_LEVEL)
+                image_ext = image_format.lower()
+                image_bytes = img_byte_arr.getbuffer()
+            
+            # 计算图片哈希值，用于唯一标识（非加密用途，8字节BLAKE2b比MD5更快，直接读取缓冲区不复制）
+            img_hash = hashlib.blake2b(image_bytes, digest_size=8).hexdigest()
+            
+            # 收集图片信息
+            image_info = {
+                "page_index": page_index + 1,  # 页码（从1开始）
+                "img_index": img_index + 1,    # 图片在页面中的索引（从1开始）
+                "width": width,                # 宽度（像素）
+                "height": height,              # 高度（像素）
+                "format": image_ext,           # 格式（扩展名）
+                "format_description": image_format,  # 格式描述
+                "color_mode": color_mode,      # 颜色模式
+                "size_bytes": len(image_bytes),  # 图片大小（字节）
+                "blake2b_hash": img_hash,      # BLAKE2b-64哈希值
+                "x0": x0,                      # 左上角X坐标
+                "y0": y0,                      # 左上角Y坐标
+                "x1": x1,                      # 右下角X坐标
+                "y1": y1,                      # 右下角Y坐标
+            }
+            
+            # 如果需要保存图片
+            if save_images:
+                # 按输出格式转换，大小记录为转换后的数据大小
+                if output_format and image_ext != "webp":
+                    image_bytes, image_ext = _convert_image(image_bytes, image_ext, output_format)
+                    image_info["format"] = image_ext
+                    image_info["format_description"] = image_ext.upper()
+                    image_info["size_bytes"] = len(image_bytes)
+                
+                # 确定保存路径
+                if group_by_page:
+                    # 按页码分组创建子文件夹
+                    filename = f"img{img_index+1}_{img_hash[:8]}.{image_ext}"
+                    filepath = os.path.join(page_dir, filename)
+                else:
+                    # 不分组，直接保存到输出目录
+                    filename = f"page{page_index+1}_img{img_index+1}_{img_hash[:8]}.{image_ext}"
+                    filepath = os.path.join(output_dir, filename)
+                
+                # 直接写入已编码的图片数据，不再重新编码
+                _write_bytes(filepath, image_bytes)
+                
+                # 添加文件路径到图片信息
+                image_info["saved_path"] = filepath
+            
+            # 添加到结果列表
+            results.append(image_info)
+            
+        except Exception as e:
+            logger.warning("警告: 提取第%d页第%d张图片时出错: %s", page_index + 1, img_index + 1, e)
+            continue
+    
+    return results
+
+
+# 工作进程中打开的PDF（pdfplumber、pypdfium2和PyMuPDF文档对象都无法跨进程传递）
+_worker_pdf = None
+_worker_pdf_file = None
+_worker_fitz_doc = None
+
+
+def _init_page_worker(pdf_path, log_level=logging.INFO):
+    """工作进程初始化函数，每个进程只打开一次PDF，并沿用主进程的日志级别"""
+    import pdfplumber
+    import pypdfium2 as pdfium
+    import fitz  # PyMuPDF
+    
+    global _worker_pdf, _worker_pdf_file, _worker_fitz_doc
+    _configure_worker_logging(log_level)
+    _worker_pdf = pdfplumber.open(pdf_path)
+    _worker_pdf_file = pdfium.PdfDocument(pdf_path)
+    _worker_fitz_doc = fitz.open(pdf_path)
+
+
+def _process_page_in_worker(page_index, **options):
+    """在工作进程中提取单个页面上的图片"""
+    return _process_page(_worker_pdf, _worker_pdf_file, _worker_fitz_doc, page_index, **options)
+
+
+def extract_images_from_pdf(pdf_path, output_dir=None, save_images=True, group_by_page=True,
+                            max_workers=None, output_format=None):
     """
     从PDF文件中提取所有图片及其信息
     
@@ -25,10 +272,16 @@ def extract_images_from_pdf(pdf_path, output_dir=None, save_images=True, group_b
         output_dir (str, 可选): 保存图片的目录，如果save_images为True则必须提供
         save_images (bool, 可选): 是否将图片保存到文件系统，默认为True
         group_by_page (bool, 可选): 是否按页码分组创建子文件夹保存图片，默认为True
+        max_workers (int, 可选): 并行处理页面的进程数，默认为CPU核数，为1时不使用进程池
+        output_format (str, 可选): 保存图片的格式，默认保持原始数据，"webp"转为WebP，"png_opt"无损优化PNG
     
     返回:
         list: 包含所有图片信息的列表，每个元素是一个字典，包含图片的页码、索引、尺寸、格式等信息
     """
+    import pdfplumber
+    import pypdfium2 as pdfium
+    import fitz  # PyMuPDF
+    
     # 检查PDF文件是否存在
     if not os.path.exists(pdf_path):
         raise FileNotFoundError(f"PDF文件不存在: {pdf_path}")
@@ -37,6 +290,7 @@ def extract_images_from_pdf(pdf_path, output_dir=None, save_images=True, group_b
     if save_images:
         if not output_dir:
             raise ValueError("如果save_images为True，则必须提供output_dir参数")
+        _check_output_format(output_format)
         
         # 创建输出目录（如果不存在）
         os.makedirs(output_dir, exist_ok=True)
@@ -44,92 +298,36 @@ def extract_images_from_pdf(pdf_path, output_dir=None, save_images=True, group_b
     # 用于存储所有图片信息的列表
     all_images = []
     
-    # 使用pdfplumber打开PDF获取元数据
-    with pdfplumber.open(pdf_path) as pdf:
-        # 使用pypdfium2打开PDF获取图片数据
-        pdf_file = pdfium.PdfDocument(pdf_path)
-        
-        # 遍历PDF的每一页
-        for page_index, page in enumerate(pdf.pages):
-            # 获取页面上的图片列表
-            image_list = page.images
-            
-            # 如果按页码分组并且有图片，创建页面目录
-            if group_by_page and save_images and image_list:
-                page_dir = os.path.join(output_dir, f"page_{page_index + 1}")
-                os.makedirs(page_dir, exist_ok=True)
-            
-            # 遍历页面上的每个图片
-            for img_index, img in enumerate(image_list):
-                # 使用pypdfium2提取图片内容
-                try:
-                    # 获取图片位置信息
-                    x0, y0, x1, y1 = img['x0'], img['top'], img['x1'], img['bottom']
-                    width = int(x1 - x0)
-                    height = int(y1 - y0)
-                    
-                    # 使用pypdfium2从PDF中提取图片
-                    pdf_page = pdf_file[page_index]
-                    bitmap = pdf_page.render(
-                        scale=1.0,
-                        rotation=0,
-                        crop=(x0, y0, x1, y1)
-                    )
-                    pil_image = bitmap.to_pil()
-                    
-                    # 将图片转换为字节流以计算哈希值
-                    img_byte_arr = BytesIO()
-                    pil_image.save(img_byte_arr, format=pil_image.format or 'PNG')
-                    image_bytes = img_byte_arr.getvalue()
-                    
-                    # 计算图片哈希值，用于唯一标识
-                    img_hash = hashlib.md5(image_bytes).hexdigest()
-                    
-                    # 确定图片格式
-                    image_format = pil_image.format or 'PNG'
-                    image_ext = image_format.lower()
-                    
-                    # 收集图片信息
-                    image_info = {
-                        "page_index": page_index + 1,  # 页码（从1开始）
-                        "img_index": img_index + 1,    # 图片在页面中的索引（从1开始）
-                        "width": width,                # 宽度（像素）
-                        "height": height,              # 高度（像素）
-                        "format": image_ext,           # 格式（扩展名）
-                        "format_description": image_format,  # 格式描述
-                        "color_mode": pil_image.mode,  # 颜色模式
-                        "size_bytes": len(image_bytes),  # 图片大小（字节）
-                        "md5_hash": img_hash,          # MD5哈希值
-                        "x0": x0,                      # 左上角X坐标
-                        "y0": y0,                      # 左上角Y坐标
-                        "x1": x1,                      # 右下角X坐标
-                        "y1": y1,                      # 右下角Y坐标
-                    }
-                    
-                    # 如果需要保存图片
-                    if save_images:
-                        # 确定保存路径
-                        if group_by_page:
-                            # 按页码分组创建子文件夹
-                            filename = f"img{img_index+1}_{img_hash[:8]}.{image_ext}"
-                            filepath = os.path.join(page_dir, filename)
-                        else:
-                            # 不分组，直接保存到输出目录
-                            filename = f"page{page_index+1}_img{img_index+1}_{img_hash[:8]}.{image_ext}"
-                            filepath = os.path.join(output_dir, filename)
-                        
-                        # 保存图片
-                        pil_image.save(filepath)
-                        
-                        # 添加文件路径到图片信息
-                        image_info["saved_path"] = filepath
-                    
-                    # 添加到结果列表
-                    all_images.append(image_info)
-                    
-                except Exception as e:
-                    print(f"警告: 提取第{page_index+1}页第{img_index+1}张图片时出错: {e}")
-                    continue
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    
+    page_options = {
+        "output_dir": output_dir,
+        "save_images": save_images,
+        "group_by_page": group_by_page,
+        "output_format": output_format,
+    }
+    
+    # 使用pypdfium2打开PDF获取页数和图片数据
+    pdf_file = pdfium.PdfDocument(pdf_path)
+    page_count = len(pdf_file)
+    
+    # 各页面互相独立，页数较多时使用进程池并行处理
+    if max_workers > 1 and page_count > 1:
+        # 子进程各自打开文档，主进程的文档不再需要
+        pdf_file.close()
+        with ProcessPoolExecutor(max_workers=min(max_workers, page_count),
+                                 initializer=_init_page_worker,
+                                 initargs=(pdf_path, logger.getEffectiveLevel())) as executor:
+            for results in executor.map(partial(_process_page_in_worker, **page_options),
+                                        range(page_count)):
+                all_images.extend(results)
+    else:
+        # 使用pdfplumber打开PDF获取图片位置，PyMuPDF读取嵌入的图片数据
+        with pdfplumber.open(pdf_path) as pdf, fitz.open(pdf_path) as fitz_doc:
+            for page_index in range(page_count):
+                all_images.extend(_process_page(pdf, pdf_file, fitz_doc, page_index, **page_options))
+        pdf_file.close()
     
     return all_images
 
@@ -142,8 +340,13 @@ def save_image_info_to_json(image_info, output_json_path):
         image_info (list): 图片信息列表
         output_json_path (str): 输出JSON文件的路径
     """
-    with open(output_json_path, 'w', encoding='utf-8') as f:
-        json.dump(image_info, f, ensure_ascii=False, indent=2)
+    # 安装了orjson时使用其C实现序列化，否则使用标准库json
+    if orjson is not None:
+        with open(output_json_path, 'wb') as f:
+            f.write(orjson.dumps(image_info, default=float, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+    else:
+        with open(output_json_path, 'w', encoding='utf-8') as f:
+            json.dump(image_info, f, ensure_ascii=False, indent=2, default=float)
 
 
 def print_image_summary(image_info):
@@ -209,16 +412,23 @@ def main():
     parser.add_argument('--no-save', '-n', action='store_true', help='不保存图片到文件系统')
     parser.add_argument('--no-group', '-g', action='store_true', help='不按页码分组创建子文件夹')
     parser.add_argument('--json', '-j', help='将图片信息保存为JSON文件')
+    parser.add_argument('--workers', '-w', type=int, default=None, help='并行处理页面的进程数，默认为CPU核数')
+    parser.add_argument('--format', '-f', choices=['webp', 'png_opt'], default=None,
+                        help='保存图片的格式：webp转为WebP，png_opt无损优化PNG，默认保持原始数据')
     
     args = parser.parse_args()
     
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    
     try:
         # 提取图片
         image_info = extract_images_from_pdf(
             args.pdf_path, 
             output_dir=args.output_dir,
             save_images=not args.no_save,
-            group_by_page=not args.no_group
+            group_by_page=not args.no_group,
+            max_workers=args.workers,
+            output_format=args.format
         )
         
         # 打印摘要
@@ -14,49 +14,114 @@ import hashlib
 import numpy as np
 import pdfplumber
 import pypdfium2 as pdfium
-from PIL import Image, ImageChops
-from io import BytesIO
-from collections import defaultdict
+from PIL import Image
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache, partial
 
 
-def is_similar_image(img1, img2, threshold=0.9):
+# pHash参数：缩放到32x32后做DCT，取左上角8x8低频系数生成64位指纹
+PHASH_IMAGE_SIZE = 32
+PHASH_HASH_SIZE = 8
+
+# 保存图片的格式：自动选择时颜色数超过该值的图像按JPEG保存
+NATURAL_IMAGE_MIN_COLORS = 256
+SAVE_EXTENSIONS = {'PNG': 'png', 'JPEG': 'jpg'}
+SAVE_OPTIONS = {'PNG': {}, 'JPEG': {'quality': 90, 'optimize': False}}
+
+
+@lru_cache(maxsize=None)
+def _dct_matrix(n):
     """
-    比较两个PIL图像是否相似
+    生成n阶DCT-II变换矩阵
     
     参数:
-        img1 (PIL.Image): 第一个图像
-        img2 (PIL.Image): 第二个图像
-        threshold (float): 相似度阈值，0-1之间，越高要求越严格
+        n (int): 矩阵阶数
         
     返回:
-        bool: 如果图像相似则返回True，否则返回False
+        numpy.ndarray: 形状为(n, n)的DCT变换矩阵
     """
-    # 确保两个图像大小相同
-    if img1.size != img2.size:
-        # 调整大小以便比较
-        img2 = img2.resize(img1.size, Image.LANCZOS)
-    
-    # 转换为相同模式
-    if img1.mode != img2.mode:
-        if 'A' in img1.mode:
-            img1 = img1.convert('RGBA')
-            img2 = img2.convert('RGBA')
-        else:
-            img1 = img1.convert('RGB')
-            img2 = img2.convert('RGB')
+    k = np.arange(n).reshape(-1, 1)
+    i = np.arange(n).reshape(1, -1)
+    matrix = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+    matrix[0, :] = np.sqrt(1.0 / n)
+    return matrix
+
+
+def phash64(img):
+    """
+    计算图像的64位感知哈希（pHash）
     
-    # 计算差异
-    diff = ImageChops.difference(img1, img2)
+    参数:
+        img (PIL.Image 或 numpy.ndarray): 图像，数组形式时为uint8的RGB数组
+        
+    返回:
+        int: 64位无符号整数形式的pHash
+    """
+    if isinstance(img, np.ndarray):
+        img = Image.fromarray(img)
+    # 指纹只保留低频信息，双线性插值足够；reducing_gap先按整数倍快速缩小，大图无需对全部像素做卷积
+    gray = img.convert('L').resize((PHASH_IMAGE_SIZE, PHASH_IMAGE_SIZE), Image.BILINEAR, reducing_gap=2.0)
+    pixels = np.asarray(gray, dtype=np.float64)
+    
+    # 二维DCT，只保留左上角的低频部分
+    dct_matrix = _dct_matrix(PHASH_IMAGE_SIZE)
+    low_freq = (dct_matrix @ pixels @ dct_matrix.T)[:PHASH_HASH_SIZE, :PHASH_HASH_SIZE]
+    
+    # 以中位数为阈值生成64位指纹
+    bits = (low_freq > np.median(low_freq)).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def is_similar_image(hash1, hash2, max_distance=6):
+    """
+    根据pHash比较两个图像是否相似
     
-    # 计算差异程度
-    diff_array = np.array(diff)
-    non_zero = np.count_nonzero(diff_array)
-    total_pixels = diff_array.size
+    参数:
+        hash1 (int): 第一个图像的pHash
+        hash2 (int): 第二个图像的pHash
+        max_distance (int): 允许的最大汉明距离，64位中约6位对应0.9的相似度
+        
+    返回:
+        bool: 如果图像相似则返回True，否则返回False
+    """
+    return bin(hash1 ^ hash2).count('1') <= max_distance
+
+
+def choose_save_format(img, output_format='auto'):
+    """
+    确定图片的保存格式
     
-    # 计算相似度 (0-1)
-    similarity = 1 - (non_zero / total_pixels)
+    参数:
+        img (PIL.Image): 图像
+        output_format (str): 'png'、'jpeg'，或'auto'按图像内容选择
+        
+    返回:
+        str: 'PNG'或'JPEG'
+    """
+    if output_format != 'auto':
+        return output_format.upper()
+    
+    # 颜色数超过阈值的RGB/灰度图像视为照片等自然图像，用JPEG保存，
+    # 文件更小、编码更快；颜色较少的图表、线稿和带透明通道的图像保持PNG，避免压缩伪影
+    if img.mode in ('RGB', 'L') and img.getcolors(NATURAL_IMAGE_MIN_COLORS) is None:
+        return 'JPEG'
+    return 'PNG'
+
+
+def size_differs(width1, height1, width2, height2, tolerance=0.1):
+    """
+    检查两个图像的宽或高是否相差超过给定比例，相差较大的图像不可能是重复图像
     
-    return similarity >= threshold
+    参数:
+        width1, height1 (int): 第一个图像的宽和高
+        width2, height2 (int): 第二个图像的宽和高
+        tolerance (float): 允许的相对差异
+        
+    返回:
+        bool: 如果宽或高相差超过tolerance则返回True，否则返回False
+    """
+    return (abs(width1 - width2) > tolerance * max(width1, width2)
+            or abs(height1 - height2) > tolerance * max(height1, height2))
 
 
 def is_too_small(img, min_pixels=100):
@@ -74,29 +139,29 @@ def is_too_small(img, min_pixels=100):
     return width * height < min_pixels
 
 
+def _to_rgb_array(img):
+    """将PIL图像转换为uint8的RGB数组，已是RGB模式时不复制像素；传入数组时原样返回"""
+    if isinstance(img, np.ndarray):
+        return img
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+    return np.asarray(img, dtype=np.uint8)
+
+
 def is_mostly_white(img, threshold=0.95):
     """
     检查图像是否主要是白色
     
     参数:
-        img (PIL.Image): 图像
+        img (PIL.Image 或 numpy.ndarray): 图像，数组形式时为uint8的RGB数组
         threshold (float): 白色像素比例阈值
         
     返回:
         bool: 如果图像主要是白色则返回True，否则返回False
     """
-    if img.mode != 'RGB':
-        img = img.convert('RGB')
-    
-    # 将图像转换为numpy数组
-    img_array = np.array(img)
-    
-    # 计算接近白色的像素数量
-    # RGB值都大于240认为是白色
-    white_pixels = np.sum((img_array > 240).all(axis=2))
-    total_pixels = img_array.shape[0] * img_array.shape[1]
-    
-    return white_pixels / total_pixels >= threshold
+    # RGB值都大于240认为是白色，即三个通道的最小值大于240
+    img_array = _to_rgb_array(img)
+    return np.count_nonzero(img_array.min(axis=2) > 240) >= threshold * img_array.shape[0] * img_array.shape[1]
 
 
 def is_mostly_black(img, threshold=0.95):
@@ -104,24 +169,33 @@ def is_mostly_black(img, threshold=0.95):
     检查图像是否主要是黑色
     
     参数:
-        img (PIL.Image): 图像
+        img (PIL.Image 或 numpy.ndarray): 图像，数组形式时为uint8的RGB数组
         threshold (float): 黑色像素比例阈值
         
     返回:
         bool: 如果图像主要是黑色则返回True，否则返回False
     """
-    if img.mode != 'RGB':
-        img = img.convert('RGB')
-    
-    # 将图像转换为numpy数组
-    img_array = np.array(img)
-    
-    # 计算接近黑色的像素数量
-    # RGB值都小于15认为是黑色
-    black_pixels = np.sum((img_array < 15).all(axis=2))
-    total_pixels = img_array.shape[0] * img_array.shape[1]
+    # RGB值都小于15认为是黑色，即三个通道的最大值小于15
+    img_array = _to_rgb_array(img)
+    return np.count_nonzero(img_array.max(axis=2) < 15) >= threshold * img_array.shape[0] * img_array.shape[1]
+
+
+def classify_fill(img, threshold=0.95):
+    """
+    一次转换同时检查图像是否主要是白色或黑色
     
-    return black_pixels / total_pixels >= threshold
+    参数:
+        img (PIL.Image 或 numpy.ndarray): 图像，数组形式时为uint8的RGB数组
+        threshold (float): 白色或黑色像素比例阈值
+        
+    返回:
+        bool: 如果图像主要是白色或黑色则返回True，否则返回False
+    """
+    img_array = _to_rgb_array(img)
+    min_pixels = threshold * img_array.shape[0] * img_array.shape[1]
+    if np.count_nonzero(img_array.min(axis=2) > 240) >= min_pixels:
+        return True
+    return np.count_nonzero(img_array.max(axis=2) < 15) >= min_pixels
 
 
 def is_contained_in(rect1, rect2, tolerance=0.9):
@@ -159,8 +233,360 @@ def is_contained_in(rect1, rect2, tolerance=0.9):
     return overlap_area / area1 >= tolerance
 
 
+def is_contained_in_any(boxes, k, tolerance=0.9, scratch=None):
+    """
+    检查第k个矩形是否基本包含在其他任一矩形中，判断规则与is_contained_in相同
+    
+    参数:
+        boxes (numpy.ndarray): 形状为(N, 4)的数组，每行为 (x0, y0, x1, y1)
+        k (int): 要检查的矩形的行号
+        tolerance (float): 容差，0-1之间
+        scratch (numpy.ndarray, 可选): 形状为(2, N)的临时数组，逐个检查同一页的矩形时复用
+        
+    返回:
+        bool: 如果矩形k基本包含在其他矩形中则返回True，否则返回False
+    """
+    if scratch is None:
+        scratch = np.empty((2, len(boxes)), dtype=np.float64)
+    x0, y0, x1, y1 = boxes[k]
+    area = (x1 - x0) * (y1 - y0)
+    if area <= 0:
+        return False
+    
+    # 与所有矩形的重叠宽度和高度，不重叠时截为0
+    w, h = scratch
+    np.minimum(boxes[:, 2], x1, out=w)
+    w -= np.maximum(boxes[:, 0], x0)
+    np.clip(w, 0, None, out=w)
+    np.minimum(boxes[:, 3], y1, out=h)
+    h -= np.maximum(boxes[:, 1], y0)
+    np.clip(h, 0, None, out=h)
+    w *= h
+    
+    # 矩形k与自身的重叠比例为1，因此需要至少两个满足条件的矩形
+    return np.count_nonzero(w >= tolerance * area) > 1
+
+
+def _overlap_loop(R, overlap_threshold, keep):
+    """
+    按面积从大到小的顺序贪心过滤重叠矩形，结果写入keep
+    只使用标量运算和数组下标，供Numba编译；已保留矩形的行号存放在栈中，只与已保留的矩形比较
+    
+    参数:
+        R: (N, 5) 的数组 (x0, y0, x1, y1, area)，已按面积从大到小排序
+        overlap_threshold (float): 重叠阈值
+        keep: 长度为N的布尔数组，初始全为False
+    """
+    kept = np.empty(R.shape[0], dtype=np.int64)
+    n_kept = 0
+    for j in range(R.shape[0]):
+        area = R[j, 4]
+        should_keep = True
+        if area > 0:
+            for k in range(n_kept):
+                i = kept[k]
+                w = min(R[i, 2], R[j, 2]) - max(R[i, 0], R[j, 0])
+                h = min(R[i, 3], R[j, 3]) - max(R[i, 1], R[j, 1])
+                if w > 0 and h > 0 and w * h / area > overlap_threshold:
+                    should_keep = False
+                    break
+        if should_keep:
+            keep[j] = True
+            kept[n_kept] = j
+            n_kept += 1
+
+
+@lru_cache(maxsize=None)
+def _overlap_kernel():
+    """用Numba编译_overlap_loop，未安装Numba时返回None，由_overlap_numpy代替"""
+    try:
+        from numba import njit
+    except ImportError:
+        return None
+    return njit(cache=True)(_overlap_loop)
+
+
+def _overlap_numpy(R, overlap_threshold, keep):
+    """_overlap_loop的NumPy实现，一次性计算所有矩形两两之间的重叠关系，参数相同"""
+    ox0 = np.maximum(R[:, None, 0], R[None, :, 0])
+    oy0 = np.maximum(R[:, None, 1], R[None, :, 1])
+    ox1 = np.minimum(R[:, None, 2], R[None, :, 2])
+    oy1 = np.minimum(R[:, None, 3], R[None, :, 3])
+    inter = np.clip(ox1 - ox0, 0, None) * np.clip(oy1 - oy0, 0, None)
+    
+    # [i, j]为重叠面积占矩形j面积的比例（面积为0的矩形不视为被覆盖）
+    areas = R[None, :, 4]
+    ratio = np.divide(inter, areas, out=np.zeros_like(inter), where=areas > 0)
+    covers = np.triu(ratio > overlap_threshold, 1)
+    
+    # 依次保留未被任何已保留矩形覆盖的矩形
+    for j in range(len(keep)):
+        keep[j] = not (covers[:j, j] & keep[:j]).any()
+
+
+def filter_overlapping_rects(boxes, overlap_threshold):
+    """
+    按面积从大到小贪心地过滤与已保留矩形显著重叠的矩形
+    
+    参数:
+        boxes (numpy.ndarray): 形状为(N, 5)的数组，每行为 (x0, y0, x1, y1, area)
+        overlap_threshold (float): 重叠阈值，重叠面积占矩形自身面积的比例超过该值时过滤
+    
+    返回:
+        numpy.ndarray: 布尔数组，True表示保留该矩形
+    """
+    n = len(boxes)
+    # 按面积从大到小排序（稳定排序，面积相同时保持原顺序）
+    order = np.argsort(-boxes[:, 4], kind='stable')
+    R = np.ascontiguousarray(boxes[order])
+    keep_sorted = np.zeros(n, dtype=bool)
+    
+    kernel = _overlap_kernel()
+    if kernel is not None:
+        kernel(R, overlap_threshold, keep_sorted)
+    else:
+        _overlap_numpy(R, overlap_threshold, keep_sorted)
+    
+    keep = np.empty(n, dtype=bool)
+    keep[order] = keep_sorted
+    return keep
+
+
+def _process_page(pdf, pdf_file, page_index, save_pool, pending_saves, output_dir=None, save_images=True,
+                  group_by_page=True, min_size=100, filter_duplicates=True, filter_contained=True,
+                  overlap_threshold=0.8, output_format='auto'):
+    """
+    提取并过滤单个页面上的图片
+    
+    参数:
+        pdf (pdfplumber.PDF): pdfplumber打开的PDF，用于获取图片位置
+        pdf_file (pdfium.PdfDocument): pypdfium2打开的PDF，用于渲染页面
+        page_index (int): 页码（从0开始）
+        save_pool (ThreadPoolExecutor): 后台保存图片的线程池
+        pending_saves (list): 本次提取尚未完成的保存，新提交的保存追加到其中
+        其余参数同extract_images_from_pdf
+    
+    返回:
+        list: 当前页面保留的图片信息列表
+    """
+    print(f"处理第{page_index + 1}页...")
+    
+    # 获取页面上的图片列表
+    image_list = pdf.pages[page_index].images
+    
+    # 如果按页码分组并且有图片，创建页面目录
+    if group_by_page and save_images and image_list:
+        page_dir = os.path.join(output_dir, f"page_{page_index + 1}")
+        os.makedirs(page_dir, exist_ok=True)
+    
+    # 存储当前页面的图像 [宽, 高, pHash（未计算时为None）, 像素数组, 图片信息]
+    page_images = []
+    
+    # 存储当前页面的图像矩形坐标 (x0, y0, x1, y1)，用于后处理过滤重叠图像
+    page_rects = []
+    
+    # 整页渲染的位图及其像素数组，第一次需要裁剪图片时才渲染；像素数组引用位图的缓冲区，位图需一并保留
+    full_page_bitmap = None
+    full_page_pixels = None
+    
+    # 一次性取出页面上所有图片的坐标，供包含关系检查使用
+    if filter_contained and image_list:
+        boxes = np.array([(i['x0'], i['top'], i['x1'], i['bottom']) for i in image_list],
+                         dtype=np.float64)
+        scratch = np.empty((2, len(boxes)), dtype=np.float64)
+    
+    # 遍历页面上的每个图片
+    for img_index, img in enumerate(image_list):
+        # 使用pypdfium2提取图片内容
+        try:
+            # 获取图片位置信息
+            x0, y0, x1, y1 = img['x0'], img['top'], img['x1'], img['bottom']
+            width = int(x1 - x0)
+            height = int(y1 - y0)
+            
+            # 跳过太小的图像
+            if width * height < min_size:
+                continue
+            
+            # 使用pypdfium2渲染整页（每页只渲染一次），再从中裁剪出图片区域
+            # 按1倍缩放渲染时像素坐标即为以左上角为原点的PDF坐标，与pdfplumber的x0/top一致
+            # rev_byteorder使位图按RGB顺序存放，to_numpy直接引用位图缓冲区，不复制像素
+            if full_page_pixels is None:
+                full_page_bitmap = pdf_file[page_index].render(scale=1.0, rotation=0, rev_byteorder=True)
+                full_page_pixels = full_page_bitmap.to_numpy()[:, :, :3]
+            
+            # 裁剪出的像素数组同样是位图的视图，供各项检查共用；超出页面的部分截掉
+            pixels = full_page_pixels[max(int(y0), 0):max(int(y1), 0), max(int(x0), 0):max(int(x1), 0)]
+            
+            # 过滤主要是白色或黑色的图像
+            if classify_fill(pixels):
+                continue
+            
+            # 检查是否被其他图像包含
+            if filter_contained and is_contained_in_any(boxes, img_index, scratch=scratch):
+                continue
+            
+            # 检查是否与已提取的图像重复：宽高相差超过10%的图像直接视为不同，
+            # 尺寸相近时才比较64位指纹的汉明距离，指纹在第一次需要比较时才计算
+            phash = None
+            if filter_duplicates and page_images:
+                duplicate = False
+                for entry in page_images:
+                    if size_differs(width, height, entry[0], entry[1]):
+                        continue
+                    if phash is None:
+                        phash = phash64(pixels)
+                    if entry[2] is None:
+                        entry[2] = phash64(entry[3])
+                    if is_similar_image(phash, entry[2]):
+                        duplicate = True
+                        break
+                
+                if duplicate:
+                    continue
+            
+            # 直接对像素数据计算哈希值，用于唯一标识，无需先编码为PNG
+            # 像素数据相同但尺寸不同的图像不应视为同一张，因此一并计入哈希
+            raw = np.ascontiguousarray(pixels)
+            hasher = hashlib.blake2b(f"RGB:{raw.shape}".encode(), digest_size=8)
+            hasher.update(raw)
+            img_hash = hasher.hexdigest()
+            
+            # 确定图片格式（裁剪出的图像没有源格式，保存为PNG）
+            if save_images:
+                pil_image = Image.fromarray(raw)
+                image_format = choose_save_format(pil_image, output_format)
+            else:
+                image_format = 'PNG'
+            image_ext = SAVE_EXTENSIONS[image_format]
+            
+            # 收集图片信息
+            image_info = {
+                "page_index": page_index + 1,  # 页码（从1开始）
+                "img_index": img_index + 1,    # 图片在页面中的索引（从1开始）
+                "width": width,                # 宽度（像素）
+                "height": height,              # 高度（像素）
+                "format": image_ext,           # 格式（扩展名）
+                "format_description": image_format,  # 格式描述
+                "color_mode": 'RGB',           # 颜色模式
+                "size_bytes": raw.nbytes,      # 图片大小（字节），保存后为文件大小
+                "blake2b_hash": img_hash,      # BLAKE2b-64哈希值
+                "x0": x0,                      # 左上角X坐标
+                "y0": y0,                      # 左上角Y坐标
+                "x1": x1,                      # 右下角X坐标
+                "y1": y1,                      # 右下角Y坐标
+            }
+            
+            # 如果需要保存图片
+            if save_images:
+                # 确定保存路径
+                if group_by_page:
+                    # 按页码分组创建子文件夹
+                    filename = f"img{img_index+1}_{img_hash[:8]}.{image_ext}"
+                    filepath = os.path.join(page_dir, filename)
+                else:
+                    # 不分组，直接保存到输出目录
+                    filename = f"page{page_index+1}_img{img_index+1}_{img_hash[:8]}.{image_ext}"
+                    filepath = os.path.join(output_dir, filename)
+                
+                # 添加文件路径到图片信息
+                image_info["saved_path"] = filepath
+                
+                # 只在保存时才转换为PIL图像（RGB数组会复制一份，不再引用页面位图），
+                # 编码和写入在后台线程中进行，完成后再记录文件大小
+                _save_image_async(pil_image, image_info, image_format, save_pool, pending_saves)
+            
+            # 添加到当前页面图像列表
+            page_images.append([width, height, phash, pixels, image_info])
+            
+            # 保存矩形信息用于后处理
+            page_rects.append((x0, y0, x1, y1))
+            
+        except Exception as e:
+            print(f"警告: 提取第{page_index+1}页第{img_index+1}张图片时出错: {e}")
+            continue
+    
+    # 后处理：进一步过滤重叠图像，各页面互相独立
+    if filter_contained and overlap_threshold < 1.0 and page_rects:
+        # 按列存放的 (x0, y0, x1, y1, area) 数组，行号与page_images一一对应
+        boxes = np.empty((len(page_rects), 5), dtype=np.float64)
+        boxes[:, :4] = page_rects
+        boxes[:, 4] = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+        keep = filter_overlapping_rects(boxes, overlap_threshold)
+        return [entry[-1] for entry, k in zip(page_images, keep) if k]
+    
+    return [entry[-1] for entry in page_images]
+
+
+def _save_image_async(image, image_info, image_format, save_pool, pending_saves):
+    """
+    提交一个后台任务把图片保存到image_info["saved_path"]，调用_wait_for_saves等待保存完成
+    PIL编码时释放GIL，保存可与后续页面的渲染重叠
+    
+    参数:
+        image (PIL.Image): 要保存的图片
+        image_info (dict): 图片信息
+        image_format (str): 保存格式，'PNG'或'JPEG'
+        save_pool (ThreadPoolExecutor): 后台保存图片的线程池
+        pending_saves (list): 本次提取尚未完成的保存，新提交的保存追加到其中
+    """
+    future = save_pool.submit(image.save, image_info["saved_path"], format=image_format,
+                              **SAVE_OPTIONS[image_format])
+    pending_saves.append((future, image_info))
+
+
+def _wait_for_saves(image_infos, pending_saves):
+    """
+    等待本次提取的后台保存完成，记录文件大小，并去掉保存失败的图片信息
+    
+    参数:
+        image_infos (list): 图片信息列表
+        pending_saves (list): 本次提取尚未完成的保存
+    
+    返回:
+        list: 去掉保存失败的图片后的列表
+    """
+    failed = set()
+    for future, info in pending_saves:
+        try:
+            future.result()
+            info["size_bytes"] = os.path.getsize(info["saved_path"])
+        except Exception as e:
+            print(f"警告: 保存图片 {info['saved_path']} 时出错: {e}")
+            failed.add(id(info))
+    
+    if not failed:
+        return image_infos
+    return [info for info in image_infos if id(info) not in failed]
+
+
+# 工作进程中打开的PDF（pdfplumber和pypdfium2的文档对象无法跨进程传递）
+_worker_pdf = None
+_worker_pdf_file = None
+
+# 工作进程中保存图片的线程池，工作进程每次只执行一个任务，不会被并发使用
+_worker_save_pool = None
+
+
+def _init_page_worker(pdf_path):
+    """工作进程初始化函数，每个进程只打开一次PDF"""
+    global _worker_pdf, _worker_pdf_file, _worker_save_pool
+    _worker_save_pool = ThreadPoolExecutor(max_workers=4)
+    _worker_pdf = pdfplumber.open(pdf_path)
+    _worker_pdf_file = pdfium.PdfDocument(pdf_path)
+
+
+def _process_page_in_worker(page_index, **options):
+    """在工作进程中提取单个页面上的图片，返回前等待本页的图片保存完成"""
+    pending_saves = []
+    page_images = _process_page(_worker_pdf, _worker_pdf_file, page_index, _worker_save_pool, pending_saves,
+                                **options)
+    return _wait_for_saves(page_images, pending_saves)
+
+
 def extract_images_from_pdf(pdf_path, output_dir=None, save_images=True, group_by_page=True, 
-                           min_size=100, filter_duplicates=True, filter_contained=True, overlap_threshold=0.8):
+                           min_size=100, filter_duplicates=True, filter_contained=True, overlap_threshold=0.8,
+                           max_workers=None, output_format='auto', pdf_type=None):
     """
     从PDF文件中提取所有图片及其信息，并进行智能过滤
     
@@ -172,6 +598,9 @@ def extract_images_from_pdf(pdf_path, output_dir=None, save_images=True, group_b
         min_size (int, 可选): 图像的最小像素数，小于此值的图像将被过滤，默认为100
         filter_duplicates (bool, 可选): 是否过滤重复图像，默认为True
         filter_contained (bool, 可选): 是否过滤被其他图像包含的小图像，默认为True
+        max_workers (int, 可选): 并行处理页面的进程数，默认为CPU核数，为1时不使用进程池
+        output_format (str, 可选): 保存图片的格式，'png'、'jpeg'，默认'auto'对照片类图像使用JPEG，其余使用PNG
+        pdf_type (PDFType 或 str, 可选): PDF类型，为'auto'时用PDFAnalyzer检测，默认不区分类型
     
     返回:
         list: 包含所有图片信息的列表，每个元素是一个字典，包含图片的页码、索引、尺寸、格式等信息
@@ -180,6 +609,21 @@ def extract_images_from_pdf(pdf_path, output_dir=None, save_images=True, group_b
     if not os.path.exists(pdf_path):
         raise FileNotFoundError(f"PDF文件不存在: {pdf_path}")
     
+    # 扫描PDF每页通常只有一张整页图像，矢量PDF几乎没有图像对象，
+    # 包含、重复和重叠过滤只对数字PDF中排版软件生成的嵌套图像有意义，其余类型直接跳过
+    if pdf_type is not None:
+        from pdf_tools.pdf_analyzer import PDFAnalyzer, PDFType
+        
+        if pdf_type == 'auto':
+            with PDFAnalyzer(pdf_path) as analyzer:
+                pdf_type = analyzer.get_pdf_type()
+            print(f"PDF类型: {pdf_type.value}")
+        
+        if PDFType(pdf_type) in (PDFType.SCANNED, PDFType.VECTOR):
+            filter_contained = False
+            filter_duplicates = False
+            overlap_threshold = 1.0
+    
     # 如果需要保存图片，检查输出目录
     if save_images:
         if not output_dir:
@@ -191,204 +635,47 @@ def extract_images_from_pdf(pdf_path, output_dir=None, save_images=True, group_b
     # 用于存储所有图片信息的列表
     all_images = []
     
-    # 用于存储每页的图像矩形信息，用于后处理过滤重叠图像
-    page_rects = defaultdict(list)
-    
-    # 使用pdfplumber打开PDF获取元数据
-    with pdfplumber.open(pdf_path) as pdf:
-        # 使用pypdfium2打开PDF获取图片数据
-        pdf_file = pdfium.PdfDocument(pdf_path)
-        
-        # 遍历PDF的每一页
-        for page_index, page in enumerate(pdf.pages):
-            print(f"处理第{page_index + 1}页...")
-            
-            # 获取页面上的图片列表
-            image_list = page.images
-            
-            # 如果按页码分组并且有图片，创建页面目录
-            if group_by_page and save_images and image_list:
-                page_dir = os.path.join(output_dir, f"page_{page_index + 1}")
-                os.makedirs(page_dir, exist_ok=True)
-            
-            # 存储当前页面的图像和坐标
-            page_images = []
-            
-            # 遍历页面上的每个图片
-            for img_index, img in enumerate(image_list):
-                # 使用pypdfium2提取图片内容
-                try:
-                    # 获取图片位置信息
-                    x0, y0, x1, y1 = img['x0'], img['top'], img['x1'], img['bottom']
-                    width = int(x1 - x0)
-                    height = int(y1 - y0)
-                    
-                    # 跳过太小的图像
-                    if width * height < min_size:
-                        continue
-                    
-                    # 使用pypdfium2从PDF中提取图片
-                    pdf_page = pdf_file[page_index]
-                    bitmap = pdf_page.render(
-                        scale=1.0,
-                        rotation=0,
-                        crop=(x0, y0, x1, y1)
-                    )
-                    pil_image = bitmap.to_pil()
-                    
-                    # 过滤主要是白色或黑色的图像
-                    if is_mostly_white(pil_image) or is_mostly_black(pil_image):
-                        continue
-                    
-                    # 检查是否被其他图像包含
-                    if filter_contained:
-                        contained = False
-                        for other_img in image_list:
-                            if other_img == img:
-                                continue
-                            
-                            other_x0, other_y0 = other_img['x0'], other_img['top']
-                            other_x1, other_y1 = other_img['x1'], other_img['bottom']
-                            
-                            if is_contained_in((x0, y0, x1, y1), 
-                                              (other_x0, other_y0, other_x1, other_y1)):
-                                contained = True
-                                break
-                        
-                        if contained:
-                            continue
-                    
-                    # 检查是否与已提取的图像重复
-                    if filter_duplicates and page_images:
-                        duplicate = False
-                        for existing_img, _ in page_images:
-                            if is_similar_image(pil_image, existing_img):
-                                duplicate = True
-                                break
-                        
-                        if duplicate:
-                            continue
-                    
-                    # 将图片转换为字节流以计算哈希值
-                    img_byte_arr = BytesIO()
-                    pil_image.save(img_byte_arr, format=pil_image.format or 'PNG')
-                    image_bytes = img_byte_arr.getvalue()
-                    
-                    # 计算图片哈希值，用于唯一标识
-                    img_hash = hashlib.md5(image_bytes).hexdigest()
-                    
-                    # 确定图片格式
-                    image_format = pil_image.format or 'PNG'
-                    image_ext = image_format.lower()
-                    
-                    # 收集图片信息
-                    image_info = {
-                        "page_index": page_index + 1,  # 页码（从1开始）
-                        "img_index": img_index + 1,    # 图片在页面中的索引（从1开始）
-                        "width": width,                # 宽度（像素）
-                        "height": height,              # 高度（像素）
-                        "format": image_ext,           # 格式（扩展名）
-                        "format_description": image_format,  # 格式描述
-                        "color_mode": pil_image.mode,  # 颜色模式
-                        "size_bytes": len(image_bytes),  # 图片大小（字节）
-                        "md5_hash": img_hash,          # MD5哈希值
-                        "x0": x0,                      # 左上角X坐标
-                        "y0": y0,                      # 左上角Y坐标
-                        "x1": x1,                      # 右下角X坐标
-                        "y1": y1,                      # 右下角Y坐标
-                    }
-                    
-                    # 如果需要保存图片
-                    if save_images:
-                        # 确定保存路径
-                        if group_by_page:
-                            # 按页码分组创建子文件夹
-                            filename = f"img{img_index+1}_{img_hash[:8]}.{image_ext}"
-                            filepath = os.path.join(page_dir, filename)
-                        else:
-                            # 不分组，直接保存到输出目录
-                            filename = f"page{page_index+1}_img{img_index+1}_{img_hash[:8]}.{image_ext}"
-                            filepath = os.path.join(output_dir, filename)
-                        
-                        # 保存图片
-                        pil_image.save(filepath)
-                        
-                        # 添加文件路径到图片信息
-                        image_info["saved_path"] = filepath
-                    
-                    # 添加到结果列表
-                    all_images.append(image_info)
-                    
-                    # 添加到当前页面图像列表
-                    page_images.append((pil_image, image_info))
-                    
-                    # 保存矩形信息用于后处理
-                    page_rects[page_index].append({
-                        "rect": (x0, y0, x1, y1),
-                        "area": (x1 - x0) * (y1 - y0),
-                        "index": len(all_images) - 1  # 图像在all_images中的索引
-                    })
-                    
-                except Exception as e:
-                    print(f"警告: 提取第{page_index+1}页第{img_index+1}张图片时出错: {e}")
-                    continue
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    
+    page_options = {
+        "output_dir": output_dir,
+        "save_images": save_images,
+        "group_by_page": group_by_page,
+        "min_size": min_size,
+        "filter_duplicates": filter_duplicates,
+        "filter_contained": filter_contained,
+        "overlap_threshold": overlap_threshold,
+        "output_format": output_format,
+    }
     
-    # 后处理：进一步过滤重叠图像
-    if filter_contained and overlap_threshold < 1.0:
-        # 存储要保留的图像索引
-        indices_to_keep = set()
-        
-        # 按页面处理
-        for page_idx, rects in page_rects.items():
-            # 按面积从大到小排序
-            sorted_rects = sorted(rects, key=lambda x: x["area"], reverse=True)
+    # 使用pypdfium2打开PDF获取页数和图片数据
+    pdf_file = pdfium.PdfDocument(pdf_path)
+    page_count = len(pdf_file)
+    
+    # 各页面（包括重叠图像的后处理）互相独立，页数较多时使用进程池并行处理
+    if max_workers > 1 and page_count > 1:
+        # 子进程各自打开文档，主进程的文档不再需要
+        pdf_file.close()
+        with ProcessPoolExecutor(max_workers=min(max_workers, page_count),
+                                 initializer=_init_page_worker,
+                                 initargs=(pdf_path,)) as executor:
+            for results in executor.map(partial(_process_page_in_worker, **page_options),
+                                        range(page_count)):
+                all_images.extend(results)
+    else:
+        # 图片在后台保存，与后续页面的处理重叠，全部页面处理完后统一等待
+        # 线程池和尚未完成的保存都只属于本次调用，返回时线程池随之关闭，并发调用互不影响
+        pending_saves = []
+        with ThreadPoolExecutor(max_workers=4) as save_pool:
+            # 使用pdfplumber打开PDF获取图片位置
+            with pdfplumber.open(pdf_path) as pdf:
+                for page_index in range(page_count):
+                    all_images.extend(_process_page(pdf, pdf_file, page_index, save_pool, pending_saves,
+                                                    **page_options))
+            pdf_file.close()
             
-            # 处理每个矩形
-            for i, rect1 in enumerate(sorted_rects):
-                # 如果已经决定保留这个图像，跳过进一步检查
-                if rect1["index"] in indices_to_keep:
-                    continue
-                    
-                # 默认保留这个图像
-                keep = True
-                
-                # 检查这个矩形是否与已保留的任何矩形有显著重叠
-                for kept_idx in indices_to_keep:
-                    # 找到已保留矩形的信息
-                    kept_rect_info = next((r for r in sorted_rects if r["index"] == kept_idx), None)
-                    if not kept_rect_info:
-                        continue
-                        
-                    # 获取两个矩形的坐标
-                    x0_1, y0_1, x1_1, y1_1 = rect1["rect"]
-                    x0_2, y0_2, x1_2, y1_2 = kept_rect_info["rect"]
-                    
-                    # 计算重叠区域
-                    overlap_x0 = max(x0_1, x0_2)
-                    overlap_y0 = max(y0_1, y0_2)
-                    overlap_x1 = min(x1_1, x1_2)
-                    overlap_y1 = min(y1_1, y1_2)
-                    
-                    # 检查是否有重叠
-                    if overlap_x0 < overlap_x1 and overlap_y0 < overlap_y1:
-                        # 计算重叠面积
-                        overlap_area = (overlap_x1 - overlap_x0) * (overlap_y1 - overlap_y0)
-                        
-                        # 计算当前矩形的面积
-                        rect1_area = rect1["area"]
-                        
-                        # 如果重叠面积占当前矩形的比例超过阈值，则不保留当前矩形
-                        if overlap_area / rect1_area > overlap_threshold:
-                            keep = False
-                            break
-                
-                # 如果决定保留这个图像
-                if keep:
-                    indices_to_keep.add(rect1["index"])
-        
-        # 只保留选定的图像
-        filtered_images = [img for i, img in enumerate(all_images) if i in indices_to_keep]
-        return filtered_images
+            all_images = _wait_for_saves(all_images, pending_saves)
     
     return all_images
 
@@ -418,46 +705,34 @@ def print_image_summary(image_info):
     
     print(f"共找到 {len(image_info)} 张图片")
     
-    # 按页面分组统计
-    pages_with_images = defaultdict(list)
-    for img in image_info:
-        pages_with_images[img["page_index"]].append(img)
+    # 按页面分组统计，页码为数组下标
+    pages = np.fromiter((img["page_index"] for img in image_info), dtype=np.int64, count=len(image_info))
+    per_page = np.bincount(pages)
+    pages_with_images = np.flatnonzero(per_page)
     
     print(f"包含图片的页面数: {len(pages_with_images)}")
     
     # 打印每页的图片数量
     print("\n每页图片数量:")
-    for page, images in sorted(pages_with_images.items()):
-        print(f"  - 第{page}页: {len(images)}张图片")
+    for page in pages_with_images:
+        print(f"  - 第{page}页: {per_page[page]}张图片")
     
     # 统计图片格式
-    formats = {}
-    for img in image_info:
-        fmt = img.get("format", "未知").upper()
-        formats[fmt] = formats.get(fmt, 0) + 1
+    formats, format_counts = np.unique([img.get("format", "未知").upper() for img in image_info],
+                                       return_counts=True)
     
     print("\n图片格式统计:")
-    for fmt, count in formats.items():
+    for fmt, count in zip(formats, format_counts):
         print(f"  - {fmt}: {count}张")
     
-    # 统计图片尺寸分布
-    sizes = {
-        "小图 (<10KB)": 0,
-        "中图 (10KB-100KB)": 0,
-        "大图 (>100KB)": 0
-    }
-    
-    for img in image_info:
-        size_kb = img["size_bytes"] / 1024
-        if size_kb < 10:
-            sizes["小图 (<10KB)"] += 1
-        elif size_kb < 100:
-            sizes["中图 (10KB-100KB)"] += 1
-        else:
-            sizes["大图 (>100KB)"] += 1
+    # 统计图片尺寸分布，区间为 [0, 10KB)、[10KB, 100KB)、[100KB, +∞)
+    sizes_kb = np.fromiter((img["size_bytes"] for img in image_info), dtype=np.float64,
+                           count=len(image_info)) / 1024
+    size_counts, _ = np.histogram(sizes_kb, bins=[0, 10, 100, np.inf])
+    size_labels = ("小图 (<10KB)", "中图 (10KB-100KB)", "大图 (>100KB)")
     
     print("\n图片尺寸统计:")
-    for size_cat, count in sizes.items():
+    for size_cat, count in zip(size_labels, size_counts):
         print(f"  - {size_cat}: {count}张")
     
     # 打印前5张图片的详细信息
@@ -492,6 +767,11 @@ def main():
     parser.add_argument('--overlap-threshold', '-t', type=float, default=0.8, 
                         help='重叠面积比例阈值，默认为0.8，范围0-1之间')
     parser.add_argument('--json', '-j', help='将图片信息保存为JSON文件')
+    parser.add_argument('--workers', '-w', type=int, default=None, help='并行处理页面的进程数，默认为CPU核数')
+    parser.add_argument('--format', '-f', choices=['auto', 'png', 'jpeg'], default='auto',
+                        help='保存图片的格式，默认auto：照片类图像使用JPEG，其余使用PNG')
+    parser.add_argument('--no-detect-type', action='store_true',
+                        help='不检测PDF类型，对扫描PDF和矢量PDF也进行包含、重复和重叠过滤')
     
     args = parser.parse_args()
     
@@ -507,7 +787,10 @@ def main():
             min_size=args.min_size,
             filter_duplicates=not args.no_filter_duplicates,
             filter_contained=not args.no_filter_contained,
-            overlap_threshold=args.overlap_threshold
+            overlap_threshold=args.overlap_threshold,
+            max_workers=args.workers,
+            output_format=args.format,
+            pdf_type=None if args.no_detect_type else 'auto'
         )
         
         print(f"图片提取完成，共提取 {len(image_info)} 张图片")
@@ -12,6 +12,18 @@ import sys
 import fitz  # PyMuPDF
 import argparse
 from datetime import datetime
+from functools import lru_cache
+
+
+@lru_cache(maxsize=None)
+def _zoom_matrix(dpi):
+    """
+    按DPI计算页面渲染的缩放矩阵 (DPI / 72，因为PDF的默认DPI是72)
+    fitz.Matrix只作为输入使用，不会被修改，可以在页面之间共享
+    """
+    zoom_factor = dpi / 72
+    return fitz.Matrix(zoom_factor, zoom_factor)
+
 
 class PDFPageExtractor:
     """PDF页面提取器类，用于将PDF页面转换为图像"""
@@ -79,25 +91,30 @@ class PDFPageExtractor:
         if page_num < 1 or page_num > self.page_count:
             raise ValueError(f"页码超出范围: {page_num}，PDF共有 {self.page_count} 页")
         
-        # 获取页面
-        page = self.doc[page_num - 1]
-        
-        # 计算缩放因子 (DPI / 72，因为PDF的默认DPI是72)
-        zoom_factor = dpi / 72
-        
-        # 渲染页面为图像
-        pix = page.get_pixmap(matrix=fitz.Matrix(zoom_factor, zoom_factor))
-        
         # 确保输出目录存在
         output_dir = os.path.dirname(output_path)
-        if output_dir and not os.path.exists(output_dir):
-            os.makedirs(output_dir)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
         
-        # 保存图像
-        pix.save(output_path)
+        # 渲染并保存页面
+        self._render_page(self.doc[page_num - 1], output_path, _zoom_matrix(dpi))
         
         return output_path
     
+    @staticmethod
+    def _render_page(page, output_path, mat):
+        """
+        按缩放矩阵渲染页面并保存为图像
+        
+        参数:
+            page (fitz.Page): 页面对象
+            output_path (str): 输出文件路径
+            mat (fitz.Matrix): 缩放矩阵
+        """
+        # 页面渲染结果不需要透明通道，不生成alpha通道可减少1/4的像素数据
+        pix = page.get_pixmap(matrix=mat, alpha=False)
+        pix.save(output_path)
+    
     def extract_all_pages(self, output_dir, dpi=300, output_format="png", page_range=None):
         """
         提取所有页面为图像
@@ -112,8 +129,7 @@ class PDFPageExtractor:
             list: 输出文件路径列表
         """
         # 确保输出目录存在
-        if not os.path.exists(output_dir):
-            os.makedirs(output_dir)
+        os.makedirs(output_dir, exist_ok=True)
         
         # 确定页码范围
         start_page = 1
@@ -125,10 +141,13 @@ class PDFPageExtractor:
         
         output_files = []
         
-        # 提取每一页
-        for page_num in range(start_page, end_page + 1):
+        # 所有页面共用同一个缩放矩阵
+        mat = _zoom_matrix(dpi)
+        
+        # 提取每一页，页码范围已经校验过，直接按顺序遍历页面
+        for page_num, page in enumerate(self.doc.pages(start_page - 1, end_page), start_page):
             output_file = os.path.join(output_dir, f"page_{page_num}.{output_format}")
-            self.extract_page(page_num, output_file, dpi, output_format)
+            self._render_page(page, output_file, mat)
             output_files.append(output_file)
             print(f"已提取第 {page_num} 页到 {output_file}")
         
@@ -11,6 +11,9 @@ import os
 import pdfplumber
 from enum import Enum
 
+# 矢量图形数超过该值时判断为矢量PDF (CAD)
+VECTOR_THRESHOLD = 1000
+
 class PDFType(Enum):
     """PDF类型枚举"""
     VECTOR = "vector"  # 矢量PDF (CAD或矢量图形)
@@ -62,38 +65,43 @@ class PDFAnalyzer:
             "总矩形数": 0
         }
         
-        # 分析前3页或所有页面（取较小值）
-        pages_to_analyze = min(3, self.page_count)
+        # 抽样分析首页、中间页和末页（页数不足3页时分析所有页面）
+        # 封面常为扫描图或插图，只看前几页容易误判，分散抽样在同样开销下更有代表性
+        sample_indexes = sorted({0, self.page_count // 2, self.page_count - 1}) if self.page_count else []
+        pages = self.pdf.pages
         
-        for i in range(pages_to_analyze):
-            page = self.pdf.pages[i]
-            
-            # 获取页面文本
-            text = page.extract_text() or ""
-            text_chars = len(text)
+        for i in sample_indexes:
+            page = pages[i]
             
-            # 获取页面图像
-            images = page.images
-            image_count = len(images)
+            # 页面尺寸和旋转角度每页只读取一次
+            width, height, rotation = page.width, page.height, page.rotation
             
+            # 先统计开销较小的对象数量，文本提取（按行和单词聚合字符）放在最后
             # 获取矢量图形
-            curves = page.curves
-            curves_count = len(curves)
+            curves_count = len(page.curves)
+            lines_count = len(page.lines)
+            rects_count = len(page.rects)
+            vector_count = curves_count + lines_count + rects_count
             
-            lines = page.lines
-            lines_count = len(lines)
+            # 获取页面图像
+            image_count = len(page.images)
             
-            rects = page.rects
-            rects_count = len(rects)
+            # 累计矢量图形数超过阈值时，无论文本和其余页面如何都判断为矢量PDF，
+            # 不再提取这一页的文本，也不再分析后续页面
+            is_vector = self.analysis_result["总矢量图形数"] + vector_count > VECTOR_THRESHOLD
             
-            vector_count = curves_count + lines_count + rects_count
+            # 获取页面文本，页面上没有字符时提取结果必然为空
+            if is_vector or not page.chars:
+                text_chars = 0
+            else:
+                text_chars = len(page.extract_text() or "")
             
             # 更新页面信息
             page_info = {
                 "页码": i + 1,
-                "宽度": page.width,
-                "高度": page.height,
-                "旋转": page.rotation,
+                "宽度": width,
+                "高度": height,
+                "旋转": rotation,
                 "文本字符数": text_chars,
                 "图像数": image_count,
                 "矢量图形数": vector_count,
@@ -111,6 +119,9 @@ class PDFAnalyzer:
             self.analysis_result["总曲线数"] += curves_count
             self.analysis_result["总直线数"] += lines_count
             self.analysis_result["总矩形数"] += rects_count
+            
+            if is_vector:
+                break
         
         # 确定PDF类型
         self._determine_pdf_type()
@@ -122,7 +133,7 @@ class PDFAnalyzer:
         total_vectors = self.analysis_result["总矢量图形数"]
         
         # 判断PDF类型
-        if total_vectors > 1000:
+        if total_vectors > VECTOR_THRESHOLD:
             # 如果矢量图形数量很多，判断为矢量PDF (CAD)
             self.pdf_type = PDFType.VECTOR
         elif total_images > 0 and total_text < 100:
@@ -10,19 +10,310 @@
 import os
 import sys
 import argparse
-import pdfplumber
+import logging
 from PIL import Image
 import fitz  # PyMuPDF
+import numpy as np
+import xxhash
 import shutil
 from datetime import datetime
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache, partial
 from pdf_analyzer import PDFAnalyzer, PDFType
 
+
+logger = logging.getLogger(__name__)
+
+
+def _configure_worker_logging(log_level):
+    """以spawn方式启动的工作进程没有日志配置，按主进程的级别配置，fork方式启动时沿用继承的配置"""
+    if not logging.getLogger().handlers:
+        logging.basicConfig(format="%(message)s")
+    logger.setLevel(log_level)
+
+
+# PNG默认压缩级别：保存时间主要花在zlib压缩上，级别1比默认的6快数倍，文件只略大
+PNG_COMPRESS_LEVEL = 1
+
+# 整页渲染的颜色模式：灰度图的数据量只有RGB的三分之一，仅用于OCR、文字识别等不需要颜色的后续处理
+COLOR_MODES = {"rgb": fitz.csRGB, "gray": fitz.csGRAY}
+
+# 串行渲染时编码和写入PNG的线程数，编码期间释放GIL，下一页的渲染可以同时进行
+WRITER_THREADS = 2
+
+
+@lru_cache(maxsize=None)
+def _zoom_matrix(dpi):
+    """
+    按DPI计算页面渲染的缩放矩阵 (DPI / 72，因为PDF的默认DPI是72)
+    fitz.Matrix只作为输入使用，不会被修改，可以在页面之间共享
+    """
+    zoom_factor = dpi / 72
+    return fitz.Matrix(zoom_factor, zoom_factor)
+
+
+@lru_cache(maxsize=None)
+def _pyvips():
+    """可选的pyvips模块（libvips绑定，PNG编码比PIL快得多），未安装时返回None"""
+    try:
+        import pyvips
+    except (ImportError, OSError):
+        return None
+    return pyvips
+
+
+def _save_pixmap_png(pix, output_path, compress_level=PNG_COMPRESS_LEVEL):
+    """
+    将像素图保存为PNG，安装了pyvips时由libvips编码，否则通过PIL保存
+    （MuPDF自带的PNG编码器不能调整压缩级别）
+    
+    参数:
+        pix (fitz.Pixmap): 像素图
+        output_path (str): 输出文件路径
+        compress_level (int): PNG压缩级别（0-9）
+    """
+    pyvips = _pyvips()
+    if pyvips is not None:
+        # 直接引用像素图的缓冲区，不复制像素
+        image = pyvips.Image.new_from_memory(pix.samples_mv, pix.width, pix.height, pix.n, "uchar")
+        image.pngsave(output_path, compression=compress_level)
+    else:
+        pix.pil_save(output_path, format="PNG", compress_level=compress_level)
+
+
+# 直接写文件时使用的打开标志（Windows上需要O_BINARY，其他平台上没有该常量）
+_WRITE_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_CLOEXEC", 0) | getattr(os, "O_BINARY", 0)
+
+
+def _write_file(output_path, data):
+    """
+    用os.open/os.write把整块数据写入文件，不经过Python文件对象的缓冲层
+    
+    参数:
+        output_path (str): 输出文件路径
+        data (bytes): 文件内容
+    """
+    fd = os.open(output_path, _WRITE_FLAGS, 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+
+
+def _write_page_image(image, output_path, page_num, compress_level):
+    """
+    在写入线程中将已复制出的页面图像编码并保存为PNG
+    
+    参数:
+        image (pyvips.Image | PIL.Image.Image): 页面图像
+        output_path (str): 输出文件路径
+        page_num (int): 页码（从0开始）
+        compress_level (int): PNG压缩级别（0-9）
+        
+    返回:
+        bool: 是否保存成功
+    """
+    try:
+        if isinstance(image, Image.Image):
+            image.save(output_path, "PNG", compress_level=compress_level)
+        else:
+            image.pngsave(output_path, compression=compress_level)
+    except Exception as e:
+        logger.warning("  警告: 提取第%d页时出错: %s", page_num + 1, e)
+        return False
+    
+    logger.debug("已提取第 %d 页到 %s", page_num + 1, output_path)
+    return True
+
+
+def _render_page(page, mat, output_dir, compress_level=PNG_COMPRESS_LEVEL, writer=None, skip_blank=True,
+                 color_mode="rgb"):
+    """
+    将单个页面渲染为PNG图像
+    
+    参数:
+        page (fitz.Page): 页面对象
+        mat (fitz.Matrix): 缩放矩阵
+        output_dir (str): 输出目录
+        compress_level (int): PNG压缩级别（0-9）
+        writer (ThreadPoolExecutor): 写入线程池，指定时只在当前线程渲染，编码和写入交给线程池
+        skip_blank (bool): 是否跳过空白页（不输出图像，按未渲染计数）
+        color_mode (str): 颜色模式，'rgb'或'gray'
+        
+    返回:
+        bool | Future: 是否渲染成功；指定了writer且渲染成功时返回结果为bool的Future
+    """
+    page_num = page.number
+    logger.debug("处理第 %d 页...", page_num + 1)
+    
+    try:
+        # 没有内容流也没有注释的页面必然是空白页，不必渲染
+        if skip_blank and not page.get_contents() and page.first_annot is None:
+            logger.debug("第 %d 页为空白页，已跳过", page_num + 1)
+            return False
+        
+        # 渲染页面为像素图
+        pix = page.get_pixmap(matrix=mat, colorspace=COLOR_MODES[color_mode], alpha=False)
+        
+        # 渲染结果只有一种颜色时也是空白页，不必编码和写入（is_unicolor在C代码中遇到第二种颜色即停止）
+        if skip_blank and pix.is_unicolor:
+            logger.debug("第 %d 页为空白页，已跳过", page_num + 1)
+            return False
+        
+        # 构建输出文件路径
+        output_path = os.path.join(output_dir, f"page_{page_num + 1}.png")
+        
+        if writer is not None:
+            # MuPDF对象只在当前线程中使用：先把像素复制出来，再交给写入线程编码和写入
+            pyvips = _pyvips()
+            if pyvips is not None:
+                image = pyvips.Image.new_from_memory(pix.samples, pix.width, pix.height, pix.n, "uchar")
+            else:
+                mode = "L" if pix.n == 1 else "RGB"
+                image = Image.frombuffer(mode, (pix.width, pix.height), pix.samples, "raw", mode, 0, 1)
+            return writer.submit(_write_page_image, image, output_path, page_num, compress_level)
+        
+        # 保存图像
+        _save_pixmap_png(pix, output_path, compress_level)
+        
+        logger.debug("已提取第 %d 页到 %s", page_num + 1, output_path)
+        return True
+        
+    except Exception as e:
+        logger.warning("  警告: 提取第%d页时出错: %s", page_num + 1, e)
+        return False
+
+
+def _page_result(result):
+    """取出_render_page的结果，返回Future时等待写入完成"""
+    return result.result() if isinstance(result, Future) else result
+
+
+def _filter_overlapping_boxes(boxes, areas, overlap_threshold, filter_contained, min_area):
+    """
+    按顺序贪心地过滤被已保留边界框包含或严重重叠的边界框
+    判断规则与PDFImageExtractor._is_contained和_calculate_overlap_area相同，只比较水平方向相交的边界框对
+    
+    参数:
+        boxes (numpy.ndarray): 形状为(N, 4)的数组，每行为 (x0, y0, x1, y1)，已按面积从大到小排序
+        areas (numpy.ndarray): 每个边界框的面积
+        overlap_threshold (float): 重叠面积占较小边界框面积的比例阈值
+        filter_contained (bool): 是否过滤被已保留边界框包含的边界框
+        min_area (float): 最小面积，小于此面积的边界框直接过滤
+        
+    返回:
+        numpy.ndarray: 布尔数组，True表示保留该边界框
+    """
+    keep = np.zeros(len(boxes), dtype=bool)
+    
+    # 安装了Numba时逐对比较已保留的边界框，不生成N×N的矩阵
+    kernel = _greedy_filter_kernel()
+    if kernel is not None:
+        kernel(np.ascontiguousarray(boxes), np.ascontiguousarray(areas), overlap_threshold,
+               filter_contained, min_area, keep)
+        return keep
+    
+    n = len(boxes)
+    x0, y0, x1, y1 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    
+    # 扫描线：按x0排序后，每个边界框只与x0落在自身[x0, x1]区间内的边界框配对，
+    # 水平方向不相交的两个边界框既不会重叠也不会互相包含，不必比较
+    by_x = np.argsort(x0, kind="stable")
+    ends = np.searchsorted(x0[by_x], x1[by_x], side="right")
+    counts = np.maximum(ends - np.arange(n) - 1, 0)
+    first = np.repeat(np.arange(n), counts)
+    second = first + 1 + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    
+    # 每一对中排在前面（面积较大）的为i，排在后面的为j
+    i = np.minimum(by_x[first], by_x[second])
+    j = np.maximum(by_x[first], by_x[second])
+    
+    # 重叠面积占较小者面积的比例超过阈值时，i过滤j
+    inter = (np.clip(np.minimum(x1[i], x1[j]) - np.maximum(x0[i], x0[j]), 0, None)
+             * np.clip(np.minimum(y1[i], y1[j]) - np.maximum(y0[i], y0[j]), 0, None))
+    smaller = np.minimum(areas[i], areas[j])
+    suppresses = np.divide(inter, smaller, out=np.zeros_like(inter), where=smaller > 0) > overlap_threshold
+    
+    # j被i包含时，i过滤j
+    if filter_contained:
+        suppresses |= (x0[j] >= x0[i]) & (y0[j] >= y0[i]) & (x1[j] <= x1[i]) & (y1[j] <= y1[i])
+    
+    # 按j分组，bounds[j]:bounds[j + 1]为能过滤j的边界框
+    i, j = i[suppresses], j[suppresses]
+    grouped = np.argsort(j, kind="stable")
+    i, j = i[grouped], j[grouped]
+    bounds = np.searchsorted(j, np.arange(n + 1))
+    
+    # 依次保留未被任何已保留边界框过滤的边界框
+    for k in range(n):
+        if areas[k] >= min_area:
+            keep[k] = not keep[i[bounds[k]:bounds[k + 1]]].any()
+    return keep
+
+
+def _greedy_filter_loop(boxes, areas, overlap_threshold, filter_contained, min_area, keep):
+    """
+    _filter_overlapping_boxes的逐对比较实现，结果写入keep（初始全为False），其余参数相同
+    只使用标量运算和数组下标，供Numba编译；与已保留的边界框逐个比较，遇到需要过滤的情况立即停止
+    """
+    for j in range(boxes.shape[0]):
+        if areas[j] < min_area:
+            continue
+        should_keep = True
+        for i in range(j):
+            if not keep[i]:
+                continue
+            if (filter_contained and boxes[j, 0] >= boxes[i, 0] and boxes[j, 1] >= boxes[i, 1]
+                    and boxes[j, 2] <= boxes[i, 2] and boxes[j, 3] <= boxes[i, 3]):
+                should_keep = False
+                break
+            w = min(boxes[i, 2], boxes[j, 2]) - max(boxes[i, 0], boxes[j, 0])
+            h = min(boxes[i, 3], boxes[j, 3]) - max(boxes[i, 1], boxes[j, 1])
+            smaller = min(areas[i], areas[j])
+            if w > 0 and h > 0 and smaller > 0 and w * h / smaller > overlap_threshold:
+                should_keep = False
+                break
+        keep[j] = should_keep
+
+
+@lru_cache(maxsize=None)
+def _greedy_filter_kernel():
+    """用Numba编译_greedy_filter_loop，未安装Numba时返回None，由NumPy实现代替"""
+    try:
+        from numba import njit
+    except ImportError:
+        return None
+    return njit(cache=True)(_greedy_filter_loop)
+
+
+# 工作进程中打开的PDF文档（PyMuPDF文档对象无法跨进程传递）
+_worker_doc = None
+
+
+def _init_render_worker(pdf_path, log_level=logging.INFO):
+    """工作进程初始化函数，每个进程只打开一次PDF文档，并沿用主进程的日志级别"""
+    global _worker_doc
+    _configure_worker_logging(log_level)
+    _worker_doc = fitz.open(pdf_path)
+
+
+def _render_page_in_worker(page_num, dpi, output_dir, compress_level=PNG_COMPRESS_LEVEL, skip_blank=True,
+                           color_mode="rgb"):
+    """在工作进程中渲染单个页面"""
+    return _render_page(_worker_doc[page_num], _zoom_matrix(dpi), output_dir, compress_level,
+                        skip_blank=skip_blank, color_mode=color_mode)
+
+
 class PDFImageExtractor:
     """智能PDF图像提取器类"""
     
     def __init__(self, pdf_path, output_dir=None, min_size=100, 
                  filter_duplicates=True, filter_contained=True, 
-                 overlap_threshold=0.8, force_mode=None, dpi=300):
+                 overlap_threshold=0.8, force_mode=None, dpi=300, max_workers=None,
+                 compress_level=PNG_COMPRESS_LEVEL, skip_blank_pages=True, color_mode="rgb"):
         """
         初始化PDF图像提取器
         
@@ -35,6 +326,11 @@ class PDFImageExtractor:
             overlap_threshold (float): 重叠面积比例阈值，范围0-1
             force_mode (str): 强制使用指定的提取模式，可选值：'vector', 'scanned', 'digital'
             dpi (int): 输出图像的DPI，默认为300
+            max_workers (int): 整页渲染时的并行进程数，默认为CPU核数，为1时不使用进程池
+            compress_level (int): 保存PNG的压缩级别（0-9），默认为1
+            skip_blank_pages (bool): 整页渲染时是否跳过空白页
+            color_mode (str): 整页渲染的颜色模式，'rgb'或'gray'（灰度仅适用于OCR等不需要颜色的用途，
+                              数字PDF模式直接保存嵌入的图像，不受影响）
         """
         if not os.path.exists(pdf_path):
             raise FileNotFoundError(f"PDF文件不存在: {pdf_path}")
@@ -46,6 +342,12 @@ class PDFImageExtractor:
         self.overlap_threshold = overlap_threshold
         self.force_mode = force_mode
         self.dpi = dpi
+        self.max_workers = max_workers
+        self.compress_level = compress_level
+        self.skip_blank_pages = skip_blank_pages
+        if color_mode not in COLOR_MODES:
+            raise ValueError(f"无效的颜色模式: {color_mode}")
+        self.color_mode = color_mode
         
         # 设置输出目录
         if output_dir is None:
@@ -66,7 +368,7 @@ class PDFImageExtractor:
             try:
                 self.pdf_type = PDFType(self.force_mode)
             except ValueError:
-                print(f"警告: 无效的强制模式 '{self.force_mode}'，使用自动检测的类型: {self.pdf_type.value}")
+                logger.warning("警告: 无效的强制模式 '%s'，使用自动检测的类型: %s", self.force_mode, self.pdf_type.value)
         
         # 打印PDF信息
         self._print_pdf_info()
@@ -89,95 +391,78 @@ class PDFImageExtractor:
             if key in metadata and metadata[key]:
                 print(f"  {key}: {metadata[key]}")
     
-    def _extract_vector_pdf(self):
-        """
-        提取矢量PDF (CAD或矢量图形) 的图像
-        使用整页渲染方法
+    def _render_all_pages(self, label):
         """
-        print(f"处理矢量PDF (CAD或矢量图形)，使用整页渲染模式...")
+        提取矢量PDF (CAD或矢量图形)、扫描PDF和文本PDF的图像
+        使用整页渲染方法：将所有页面渲染为PNG图像，页数较多时使用进程池并行渲染
         
-        # 打开PDF文件
-        doc = fitz.open(self.pdf_path)
-        extracted_count = 0
+        参数:
+            label (str): 日志中显示的PDF类型名称
         
-        # 遍历所有页面
-        for page_num in range(doc.page_count):
-            print(f"处理第 {page_num + 1} 页...")
-            
-            # 获取页面
-            page = doc[page_num]
+        返回:
+            int: 成功渲染的页面数量
+        """
+        logger.info("处理%s，使用整页渲染模式...", label)
+        
+        # 页数取自分析阶段的结果，使用进程池时主进程不必再解析一遍文档
+        page_count = self.analyzer.page_count
+        
+        max_workers = self.max_workers or os.cpu_count() or 1
+        
+        # 各页面互相独立，页数较多时在子进程中渲染（PyMuPDF文档对象无法跨进程传递，子进程各自打开）
+        if max_workers > 1 and page_count > 1:
+            with ProcessPoolExecutor(max_workers=min(max_workers, page_count),
+                                     initializer=_init_render_worker,
+                                     initargs=(self.pdf_path, logger.getEffectiveLevel())) as executor:
+                results = list(executor.map(
+                    partial(_render_page_in_worker, dpi=self.dpi, output_dir=self.output_dir,
+                            compress_level=self.compress_level, skip_blank=self.skip_blank_pages,
+                            color_mode=self.color_mode),
+                    range(page_count)))
+        else:
+            # 打开PDF文件
+            doc = fitz.open(self.pdf_path)
             
-            # 计算缩放因子 (DPI / 72，因为PDF的默认DPI是72)
-            zoom_factor = self.dpi / 72
+            # 缩放矩阵、输出目录和压缩级别在所有页面间不变，循环外只取一次，按顺序遍历页面
+            mat = _zoom_matrix(self.dpi)
+            output_dir = self.output_dir
+            compress_level = self.compress_level
+            skip_blank = self.skip_blank_pages
+            color_mode = self.color_mode
             
-            # 创建一个矩阵来应用缩放
-            mat = fitz.Matrix(zoom_factor, zoom_factor)
+            # 当前线程渲染下一页的同时，写入线程编码并写入上一页
+            results = []
+            pending = deque()
+            with ThreadPoolExecutor(max_workers=WRITER_THREADS) as writer:
+                for page in doc:
+                    pending.append(_render_page(page, mat, output_dir, compress_level, writer, skip_blank,
+                                                color_mode))
+                    # 渲染快于写入时限制排队的页面数，避免所有页面的像素同时留在内存中
+                    if len(pending) > 2 * WRITER_THREADS:
+                        results.append(_page_result(pending.popleft()))
+                results.extend(_page_result(result) for result in pending)
             
-            try:
-                # 渲染页面为像素图
-                pix = page.get_pixmap(matrix=mat, alpha=False)
-                
-                # 构建输出文件路径
-                output_path = os.path.join(self.output_dir, f"page_{page_num + 1}.png")
-                
-                # 保存图像
-                pix.save(output_path)
-                
-                print(f"已提取第 {page_num + 1} 页到 {output_path}")
-                extracted_count += 1
-                
-            except Exception as e:
-                print(f"  警告: 提取第{page_num + 1}页时出错: {e}")
+            # 关闭文档
+            doc.close()
         
-        # 关闭文档
-        doc.close()
-        
-        return extracted_count
+        return sum(results)
     
-    def _extract_scanned_pdf(self):
+    def iter_page_arrays(self):
         """
-        提取扫描PDF的图像
-        使用整页渲染方法
-        """
-        print(f"处理扫描PDF，使用整页渲染模式...")
-        
-        # 打开PDF文件
-        doc = fitz.open(self.pdf_path)
-        extracted_count = 0
+        逐页渲染，直接返回像素数组而不编码为PNG，供OCR等需要像素数据的后续处理使用
         
-        # 遍历所有页面
-        for page_num in range(doc.page_count):
-            print(f"处理第 {page_num + 1} 页...")
-            
-            # 获取页面
-            page = doc[page_num]
-            
-            # 计算缩放因子 (DPI / 72，因为PDF的默认DPI是72)
-            zoom_factor = self.dpi / 72
-            
-            # 创建一个矩阵来应用缩放
-            mat = fitz.Matrix(zoom_factor, zoom_factor)
-            
-            try:
-                # 渲染页面为像素图
-                pix = page.get_pixmap(matrix=mat, alpha=False)
-                
-                # 构建输出文件路径
-                output_path = os.path.join(self.output_dir, f"page_{page_num + 1}.png")
-                
-                # 保存图像
-                pix.save(output_path)
-                
-                print(f"已提取第 {page_num + 1} 页到 {output_path}")
-                extracted_count += 1
-                
-            except Exception as e:
-                print(f"  警告: 提取第{page_num + 1}页时出错: {e}")
-        
-        # 关闭文档
-        doc.close()
-        
-        return extracted_count
+        返回:
+            generator: 依次产生 (页码（从0开始）, 形状为(高, 宽, 通道数)的uint8数组，RGB为3通道，灰度为1通道)；
+                       数组持有自己的像素数据（只读），像素图释放后仍然有效，可以跨迭代保留
+        """
+        mat = _zoom_matrix(self.dpi)
+        colorspace = COLOR_MODES[self.color_mode]
+        with fitz.open(self.pdf_path) as doc:
+            for page_num, page in enumerate(doc):
+                pix = page.get_pixmap(matrix=mat, colorspace=colorspace, alpha=False)
+                # samples_mv不持有像素图，生成器前进后像素图即被释放，视图会指向已释放的内存；
+                # samples复制一份像素到bytes对象，数组引用该对象，生命周期与像素图无关
+                yield page_num, np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width, pix.n)
     
     def _is_overlap(self, box1, box2):
         """
@@ -208,20 +493,24 @@ class PDFImageExtractor:
         返回:
             float: 重叠面积占较小边界框的比例
         """
-        if not self._is_overlap(box1, box2):
-            return 0.0
+        # 拆成局部变量，逐个坐标轴检查，某个方向上不重叠时立即返回（与_is_overlap的判断相同）
+        ax0, ay0, ax1, ay1 = box1
+        bx0, by0, bx1, by1 = box2
         
-        # 计算重叠区域
-        x_overlap = max(0, min(box1[2], box2[2]) - max(box1[0], box2[0]))
-        y_overlap = max(0, min(box1[3], box2[3]) - max(box1[1], box2[1]))
-        overlap_area = x_overlap * y_overlap
+        x_overlap = min(ax1, bx1) - max(ax0, bx0)
+        if x_overlap <= 0:
+            return 0.0
+        y_overlap = min(ay1, by1) - max(ay0, by0)
+        if y_overlap <= 0:
+            return 0.0
         
-        # 计算两个边界框的面积
-        area1 = (box1[2] - box1[0]) * (box1[3] - box1[1])
-        area2 = (box2[2] - box2[0]) * (box2[3] - box2[1])
+        # 较小边界框的面积为0时没有可比较的面积，不做除法
+        smaller_area = min((ax1 - ax0) * (ay1 - ay0), (bx1 - bx0) * (by1 - by0))
+        if smaller_area <= 0:
+            return 0.0
         
         # 返回重叠面积占较小边界框的比例
-        return overlap_area / min(area1, area2)
+        return x_overlap * y_overlap / smaller_area
     
     def _is_contained(self, box1, box2):
         """
@@ -250,109 +539,111 @@ class PDFImageExtractor:
         if not images:
             return []
         
-        # 按面积从大到小排序
-        sorted_images = sorted(images, 
-                              key=lambda img: (img["width"] * img["height"]), 
-                              reverse=True)
-        
-        filtered_images = []
-        for i, img1 in enumerate(sorted_images):
-            box1 = (img1["x0"], img1["top"], img1["x1"], img1["bottom"])
-            area1 = img1["width"] * img1["height"]
-            
-            # 如果面积太小，跳过
-            if area1 < self.min_size * self.min_size:
-                continue
-            
-            # 检查是否被之前添加的更大图像包含或严重重叠
-            should_add = True
-            for img2 in filtered_images:
-                box2 = (img2["x0"], img2["top"], img2["x1"], img2["bottom"])
-                
-                # 如果启用了包含过滤，检查当前图像是否被已添加的图像包含
-                if self.filter_contained and self._is_contained(box1, box2):
-                    should_add = False
-                    break
-                
-                # 检查重叠程度
-                overlap_ratio = self._calculate_overlap_area(box1, box2)
-                if overlap_ratio > self.overlap_threshold:
-                    should_add = False
-                    break
-            
-            if should_add:
-                filtered_images.append(img1)
+        # 按面积从大到小排序（稳定排序，面积相同时保持原顺序）
+        boxes = np.array([(img["x0"], img["top"], img["x1"], img["bottom"]) for img in images], dtype=np.float64)
+        areas = np.array([img["width"] * img["height"] for img in images], dtype=np.float64)
+        order = np.argsort(-areas, kind="stable")
         
-        return filtered_images
+        keep = _filter_overlapping_boxes(boxes[order], areas[order], self.overlap_threshold,
+                                         self.filter_contained, self.min_size * self.min_size)
+        return [images[i] for i in order[keep]]
     
     def _extract_digital_pdf(self):
         """
         提取数字PDF的图像
-        使用图像对象提取方法
+        使用图像对象提取方法：直接取出PDF中嵌入的图像数据流（JPEG/PNG等），不解码也不重新编码
         """
-        print(f"处理数字PDF，使用图像对象提取模式...")
+        logger.info("处理数字PDF，使用图像对象提取模式...")
         
         # 打开PDF文件
-        with pdfplumber.open(self.pdf_path) as pdf:
+        with fitz.open(self.pdf_path) as doc:
             extracted_count = 0
-            image_hashes = set()  # 用于检测重复图像
+            failed_count = 0
+            seen_xrefs = set()  # 已提取的图像对象，同一图像在多个页面上引用时只提取一次
+            image_hashes = set()  # 用于检测内容相同的不同图像对象
+            
+            # 在所有页面和图像间不变的设置，循环外只取一次
+            min_area = self.min_size * self.min_size
+            filter_overlaps = self.filter_contained or self.overlap_threshold < 1.0
+            filter_duplicates = self.filter_duplicates
+            output_dir = self.output_dir
             
             # 遍历所有页面
-            for page_num, page in enumerate(pdf.pages):
-                print(f"处理第 {page_num + 1} 页...")
+            for page in doc:
+                page_num = page.number
+                logger.debug("处理第 %d 页...", page_num + 1)
                 
-                # 获取页面上的所有图像
-                images = page.images
+                # 获取页面上的所有图像及其在页面上的位置
+                images = []
+                for item in page.get_images(full=True):
+                    bbox = page.get_image_bbox(item)
+                    if bbox.is_empty or bbox.is_infinite:
+                        continue
+                    images.append({"xref": item[0], "x0": bbox.x0, "top": bbox.y0, "x1": bbox.x1,
+                                   "bottom": bbox.y1, "width": bbox.width, "height": bbox.height})
                 
                 # 如果需要过滤重叠图像
-                if self.filter_contained or self.overlap_threshold < 1.0:
+                if filter_overlaps:
                     images = self._filter_overlapping_images(images)
                 
-                # 提取每个图像
+                # 提取每个图像：尺寸和重复检查都不会出错，放在try之外，只有读取和写入数据流可能失败
                 for i, img in enumerate(images):
-                    try:
-                        # 获取图像尺寸
-                        width = img["width"]
-                        height = img["height"]
-                        
-                        # 如果图像太小，跳过
-                        if width * height < self.min_size * self.min_size:
+                    # 如果图像太小，跳过
+                    if img["width"] * img["height"] < min_area:
+                        continue
+                    
+                    # 如果需要过滤重复图像，已提取过的图像对象不再读取数据流
+                    xref = img["xref"]
+                    if filter_duplicates:
+                        if xref in seen_xrefs:
                             continue
+                        seen_xrefs.add(xref)
+                    
+                    # 提取图像数据流
+                    try:
+                        image_info = doc.extract_image(xref)
+                    except Exception as e:
+                        logger.debug("  提取第%d页第%d张图片时出错: %s", page_num + 1, i + 1, e)
+                        image_info = None
+                    
+                    # 如果提取失败，跳过
+                    if not image_info:
+                        failed_count += 1
+                        continue
+                    
+                    image_data = image_info["image"]
+                    
+                    # 如果需要过滤重复图像
+                    if filter_duplicates:
+                        # 计算图像哈希：对压缩后的数据流计算xxh3（在C代码中完成，不解码像素），
+                        # 数据流通常比解码后的像素小得多，也不需要先生成像素图再取Pixmap.digest
+                        image_hash = xxhash.xxh3_64_intdigest(image_data)
                         
-                        # 提取图像
-                        image = page.crop((img["x0"], img["top"], img["x1"], img["bottom"]))
-                        
-                        # 如果提取失败，跳过
-                        if image is None:
-                            print(f"  警告: 提取第{page_num + 1}页第{i + 1}张图片时出错: 提取结果为空")
+                        # 如果是重复图像，跳过
+                        if image_hash in image_hashes:
                             continue
                         
-                        # 转换为PIL图像
-                        pil_image = Image.frombytes("RGB", (image.width, image.height), image.original.tobytes())
-                        
-                        # 如果需要过滤重复图像
-                        if self.filter_duplicates:
-                            # 计算图像哈希
-                            image_hash = hash(pil_image.tobytes())
-                            
-                            # 如果是重复图像，跳过
-                            if image_hash in image_hashes:
-                                continue
-                            
-                            # 添加到哈希集合
-                            image_hashes.add(image_hash)
-                        
-                        # 构建输出文件路径
-                        output_path = os.path.join(self.output_dir, f"page_{page_num + 1}_image_{i + 1}.png")
-                        
-                        # 保存图像
-                        pil_image.save(output_path)
-                        
-                        print(f"  已提取第{page_num + 1}页第{i + 1}张图片到 {output_path}")
-                        extracted_count += 1
-                        
-                    except Exception as e:
-                        print(f"  警告: 提取第{page_num + 1}页第{i + 1}张图片时出错: {e}")
+                        # 添加到哈希集合
+                        image_hashes.add(image_hash)
+                    
+                    # 构建输出文件路径，扩展名与嵌入的图像格式一致
+                    output_path = os.path.join(output_dir,
+                                               f"page_{page_num + 1}_image_{i + 1}.{image_info['ext']}")
+                    
+                    # 保存图像
+                    try:
+                        _write_file(output_path, image_data)
+                    except OSError as e:
+                        logger.debug("  保存第%d页第%d张图片时出错: %s", page_num + 1, i + 1, e)
+                        failed_count += 1
+                        continue
+                    
+                    logger.debug("  已提取第%d页第%d张图片到 %s", page_num + 1, i + 1, output_path)
+                    extracted_count += 1
+        
+        # 提取失败的图像只汇总报告一次，每张图片的错误信息在--verbose时输出
+        if failed_count:
+            logger.warning("  警告: 有 %d 张图片提取失败", failed_count)
         
         return extracted_count
     
@@ -368,25 +659,24 @@ class PDFImageExtractor:
         try:
             # 根据PDF类型选择提取方法
             if self.pdf_type == PDFType.VECTOR:
-                extracted_count = self._extract_vector_pdf()
+                extracted_count = self._render_all_pages("矢量PDF (CAD或矢量图形)")
             elif self.pdf_type == PDFType.SCANNED:
-                extracted_count = self._extract_scanned_pdf()
+                extracted_count = self._render_all_pages("扫描PDF")
             elif self.pdf_type == PDFType.DIGITAL:
                 extracted_count = self._extract_digital_pdf()
             else:
                 # 对于文本PDF，使用整页渲染方法
-                print(f"处理文本PDF，使用整页渲染模式...")
-                extracted_count = self._extract_vector_pdf()
+                extracted_count = self._render_all_pages("文本PDF")
             
             # 如果没有提取到图像，尝试使用另一种方法
             if extracted_count == 0:
-                print("\n未找到图像，尝试使用备用方法...")
+                logger.info("\n未找到图像，尝试使用备用方法...")
                 
                 if self.pdf_type == PDFType.DIGITAL:
-                    print("尝试使用整页渲染模式...")
-                    extracted_count = self._extract_vector_pdf()
+                    logger.info("尝试使用整页渲染模式...")
+                    extracted_count = self._render_all_pages("数字PDF")
                 else:
-                    print("尝试使用图像对象提取模式...")
+                    logger.info("尝试使用图像对象提取模式...")
                     extracted_count = self._extract_digital_pdf()
         
         finally:
@@ -395,13 +685,13 @@ class PDFImageExtractor:
         
         # 如果仍然没有提取到图像，打印提示
         if extracted_count == 0:
-            print("\nPDF中未找到图像")
+            logger.info("\nPDF中未找到图像")
             # 如果输出目录是空的，删除它
             if len(os.listdir(self.output_dir)) == 0:
                 shutil.rmtree(self.output_dir)
         else:
-            print(f"\n提取完成！共提取 {extracted_count} 张图像")
-            print(f"输出目录: {os.path.abspath(self.output_dir)}")
+            logger.info("\n提取完成！共提取 %d 张图像", extracted_count)
+            logger.info("输出目录: %s", os.path.abspath(self.output_dir))
         
         return extracted_count
 
@@ -425,9 +715,21 @@ def main():
     parser.add_argument('--force-digital-mode', '-g', action='store_const', const='digital', dest='force_mode',
                         help='强制使用数字PDF提取模式（图像对象提取）')
     parser.add_argument('--dpi', '-p', type=int, default=300, help='输出图像的DPI（适用于整页渲染模式）')
+    parser.add_argument('--workers', '-w', type=int, default=None,
+                        help='整页渲染时的并行进程数，默认为CPU核数')
+    parser.add_argument('--compress-level', '-z', type=int, default=PNG_COMPRESS_LEVEL, choices=range(10),
+                        metavar='0-9', help=f'保存PNG的压缩级别（0-9），默认为{PNG_COMPRESS_LEVEL}')
+    parser.add_argument('--keep-blank-pages', action='store_false', dest='skip_blank_pages',
+                        help='整页渲染时也输出空白页')
+    parser.add_argument('--color-mode', choices=sorted(COLOR_MODES), default='rgb',
+                        help='整页渲染的颜色模式，gray仅适用于OCR等不需要颜色的用途')
+    
+    parser.add_argument('--verbose', '-V', action='store_true', help='输出每一页的处理进度')
     
     args = parser.parse_args()
     
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO, format="%(message)s")
+    
     try:
         # 创建提取器
         extractor = PDFImageExtractor(
@@ -438,7 +740,11 @@ def main():
             filter_contained=args.filter_contained,
             overlap_threshold=args.overlap_threshold,
             force_mode=args.force_mode,
-            dpi=args.dpi
+            dpi=args.dpi,
+            max_workers=args.workers,
+            compress_level=args.compress_level,
+            skip_blank_pages=args.skip_blank_pages,
+            color_mode=args.color_mode
         )
         
         # 提取图像
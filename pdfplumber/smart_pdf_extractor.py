@@ -5,17 +5,223 @@
 智能PDF图像提取器
 
 自动检测PDF类型并选择最合适的图像提取方法
+
+pdfplumber、pypdfium2和numpy导入较慢，在首次使用时才导入，
+只查看帮助或参数有误时命令行可以立即返回
 """
 
 import os
 import sys
+import math
 import argparse
-import pdfplumber
-import pypdfium2 as pdfium
-from PIL import Image
 from io import BytesIO
-import hashlib
-from collections import defaultdict
+import xxhash
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache, partial
+
+
+# 各输出格式的文件扩展名和保存参数：PNG用最低的压缩级别，以文件略大换取快数倍的编码速度；
+# 扫描页面多为照片类内容，JPEG编码比PNG快得多，文件也小得多
+SAVE_EXTENSIONS = {"PNG": "png", "JPEG": "jpg"}
+SAVE_OPTIONS = {
+    "PNG": {"compress_level": 1},
+    "JPEG": {"quality": 90, "optimize": False, "progressive": False},
+}
+
+
+# 整页位图超过该字节数时分条带渲染：PDFium的单个位图不能超过2GB，
+# 超大图纸按高分辨率渲染时整页位图会创建失败，分条带渲染后再拼接为PIL图像
+TILE_RENDER_THRESHOLD = 1024 * 1024 * 1024
+
+# 分条带渲染时每个条带的高度（像素）
+TILE_HEIGHT = 2048
+
+
+class _HashingWriter:
+    """写入编码后图像数据的文件对象，写入的同时计算哈希，不必在编码完成后再遍历一遍数据"""
+    
+    def __init__(self):
+        self.hasher = xxhash.xxh3_128()
+        self.buffer = BytesIO()
+    
+    def write(self, data):
+        self.hasher.update(data)
+        return self.buffer.write(data)
+
+
+def _render_page_tiled(pdf_page, scale, grayscale=False, tile_height=TILE_HEIGHT):
+    """
+    将页面分成水平条带逐条渲染，拼接为一张PIL图像
+    
+    参数:
+        pdf_page (pdfium.PdfPage): 页面对象
+        scale (float): 缩放因子
+        grayscale (bool): 是否渲染为8位灰度图像
+        tile_height (int): 每个条带的高度（像素）
+        
+    返回:
+        PIL.Image.Image: 整页图像
+    """
+    from PIL import Image
+    
+    # 与PdfPage.render计算整页位图高度的方式一致
+    height = math.ceil(pdf_page.get_height() * scale)
+    
+    image = None
+    for y in range(0, height, tile_height):
+        rows = min(tile_height, height - y)
+        
+        # crop为从页面四边裁掉的宽度（PDF单位，顺序为左、下、右、上），只保留当前条带
+        # PdfPage.render按 ceil(crop * scale) 换算为像素，少算半个像素，换算结果恰为整数像素，
+        # 条带与整页渲染的像素行对齐，不会因浮点误差多出或错开一行
+        crop_top = max(0, (y - 0.5) / scale)
+        crop_bottom = max(0, (height - y - rows - 0.5) / scale)
+        bitmap = pdf_page.render(scale=scale, crop=(0, crop_bottom, 0, crop_top),
+                                 grayscale=grayscale, rev_byteorder=True)
+        strip = bitmap.to_pil()
+        
+        if image is None:
+            image = Image.new(strip.mode, (strip.width, height))
+        image.paste(strip, (0, y))
+    
+    return image
+
+
+def _render_page_image(pdf_page, dpi, format, grayscale=False):
+    """
+    将页面渲染并编码为图像文件数据
+    
+    参数:
+        pdf_page (pdfium.PdfPage): 页面对象
+        dpi (int): 渲染分辨率
+        format (str): 图像格式
+        grayscale (bool): 是否渲染为8位灰度图像（每像素1字节，渲染和编码的数据量只有RGB的三分之一）
+        
+    返回:
+        tuple: (编码后的图像数据, 图像数据的哈希值, 宽度, 高度)
+    """
+    # 计算缩放因子 (DPI / 72，因为PDF的默认DPI是72)
+    scale = dpi / 72
+    
+    # 渲染页面为图像，直接按RGB字节序输出，转换为PIL图像时不必再交换通道；
+    # 灰度渲染时PDFium直接输出8位灰度位图，转换后为"L"模式的PIL图像；整页位图过大时分条带渲染
+    page_width, page_height = pdf_page.get_size()
+    bytes_per_pixel = 1 if grayscale else 3
+    if page_width * scale * page_height * scale * bytes_per_pixel > TILE_RENDER_THRESHOLD:
+        pil_image = _render_page_tiled(pdf_page, scale, grayscale)
+    else:
+        bitmap = pdf_page.render(scale=scale, grayscale=grayscale, rev_byteorder=True)
+        
+        # 转换为PIL图像
+        pil_image = bitmap.to_pil()
+    
+    # 编码为图像文件数据，编码的同时计算哈希（在工作进程中并行完成），保存时直接使用这份数据，不再重复编码
+    writer = _HashingWriter()
+    pil_image.save(writer, format=format, **SAVE_OPTIONS.get(format.upper(), {}))
+    width, height = pil_image.size
+    return writer.buffer.getvalue(), writer.hasher.hexdigest(), width, height
+
+
+def _select_non_overlapping(sorted_rects, overlap_threshold):
+    """
+    按顺序贪心地选出与已选矩形都没有显著重叠的矩形
+    
+    参数:
+        sorted_rects (list): 按面积从大到小排序的矩形信息列表，每项包含"rect" (x0, y0, x1, y1)和"area"
+        overlap_threshold (float): 重叠面积占当前矩形面积的比例阈值
+        
+    返回:
+        list: 保留的矩形在sorted_rects中的位置
+    """
+    import numpy as np
+    
+    rects = np.array([r["rect"] for r in sorted_rects], dtype=np.float64).reshape(-1, 4)
+    areas = np.array([r["area"] for r in sorted_rects], dtype=np.float64)
+    
+    # 安装了Numba时逐个与已保留的矩形比较，不生成N×N的矩阵
+    kernel = _select_non_overlapping_kernel()
+    if kernel is not None:
+        keep = np.zeros(len(sorted_rects), dtype=np.bool_)
+        kernel(rects, areas, overlap_threshold, keep)
+        return np.flatnonzero(keep).tolist()
+    
+    x0, y0, x1, y1 = rects[:, 0], rects[:, 1], rects[:, 2], rects[:, 3]
+    
+    # 一次性计算所有矩形两两之间的重叠面积，[i, j]为重叠面积占矩形i面积的比例
+    overlap_w = np.clip(np.minimum(x1[:, None], x1[None, :]) - np.maximum(x0[:, None], x0[None, :]), 0, None)
+    overlap_h = np.clip(np.minimum(y1[:, None], y1[None, :]) - np.maximum(y0[:, None], y0[None, :]), 0, None)
+    overlap_area = overlap_w * overlap_h
+    ratio = np.divide(overlap_area, areas[:, None], out=np.zeros_like(overlap_area), where=areas[:, None] > 0)
+    overlaps = ratio > overlap_threshold
+    
+    # 依次保留与已保留矩形的重叠比例都不超过阈值的矩形
+    kept = []
+    for i in range(len(sorted_rects)):
+        if not overlaps[i, kept].any():
+            kept.append(i)
+    return kept
+
+
+def _select_non_overlapping_loop(rects, areas, overlap_threshold, keep):
+    """
+    _select_non_overlapping的逐个比较实现，结果写入keep（初始全为False），其余参数相同
+    只使用标量运算和数组下标，供Numba编译；遇到重叠超过阈值的已保留矩形立即停止
+    """
+    for i in range(rects.shape[0]):
+        should_keep = True
+        for j in range(i):
+            if not keep[j]:
+                continue
+            w = min(rects[i, 2], rects[j, 2]) - max(rects[i, 0], rects[j, 0])
+            h = min(rects[i, 3], rects[j, 3]) - max(rects[i, 1], rects[j, 1])
+            if w > 0 and h > 0 and areas[i] > 0 and w * h / areas[i] > overlap_threshold:
+                should_keep = False
+                break
+        keep[i] = should_keep
+
+
+@lru_cache(maxsize=None)
+def _select_non_overlapping_kernel():
+    """用Numba编译_select_non_overlapping_loop，未安装Numba时返回None，由NumPy实现代替"""
+    try:
+        from numba import njit
+    except ImportError:
+        return None
+    return njit(cache=True)(_select_non_overlapping_loop)
+
+
+def _object_bounds(page_object):
+    """
+    获取页面对象的边界框（PDF坐标，原点在左下角）
+    pypdfium2 5起PdfObject.get_pos更名为get_bounds，两种版本都支持
+    
+    参数:
+        page_object (pdfium.PdfObject): 页面对象
+        
+    返回:
+        tuple: (left, bottom, right, top)
+    """
+    get_bounds = getattr(page_object, "get_bounds", None) or page_object.get_pos
+    return get_bounds()
+
+
+# 工作进程中打开的PDF文档（PDFium文档对象无法跨进程传递）
+_worker_pdf = None
+
+
+def _init_render_worker(pdf_path):
+    """工作进程初始化函数，每个进程只打开一次PDF文档"""
+    global _worker_pdf
+    import pypdfium2 as pdfium
+    
+    _worker_pdf = pdfium.PdfDocument(pdf_path)
+
+
+def _render_page_in_worker(page_idx, dpi, format, grayscale=False):
+    """在工作进程中渲染单个页面"""
+    return _render_page_image(_worker_pdf[page_idx], dpi, format, grayscale)
+
 
 class SmartPDFExtractor:
     """智能PDF提取器，可自动检测PDF类型并选择合适的提取方法"""
@@ -33,18 +239,25 @@ class SmartPDFExtractor:
         self.pdf_path = pdf_path
         self.pdf_type = None  # 'scanned' 或 'digital'
         
-        # 打开PDF文件
-        self.pdf_plumber = pdfplumber.open(pdf_path)
+        import pypdfium2 as pdfium
+        
+        # 打开PDF文件；pdfplumber文档只在需要元数据时才打开，见pdf_plumber属性
         self.pdf_pdfium = pdfium.PdfDocument(pdf_path)
+        self._pdf_plumber = None
         
         # 获取基本信息
-        self.page_count = len(self.pdf_plumber.pages)
+        self.page_count = len(self.pdf_pdfium)
+        
+        # 保存图片的线程池：PIL编码PNG时释放GIL，编码和写入与下一张图片、下一页的渲染同时进行
+        self._save_pool = ThreadPoolExecutor(max_workers=4)
         
         # 分析PDF类型
         self._analyze_pdf_type()
     
     def _analyze_pdf_type(self):
         """分析PDF类型，判断是扫描PDF还是数字PDF"""
+        import pdfplumber
+        
         # 初始化计数器
         text_pages = 0
         image_pages = 0
@@ -52,24 +265,26 @@ class SmartPDFExtractor:
         # 分析前3页或所有页面（取较小值）
         pages_to_analyze = min(3, self.page_count)
         
-        for i in range(pages_to_analyze):
-            page = self.pdf_plumber.pages[i]
-            
-            # 获取页面文本
-            text = page.extract_text() or ""
-            
-            # 获取页面图像
-            images = page.images
-            
-            # 计算文本字符数和图像数量
-            text_chars = len(text)
-            image_count = len(images)
-            
-            # 判断页面类型
-            if text_chars > 100:  # 如果页面包含大量文本
-                text_pages += 1
-            if image_count > 0:  # 如果页面包含图像
-                image_pages += 1
+        # 只为要分析的页面单独打开一个pdfplumber文档，分析完立即释放pdfminer的解析结果
+        with pdfplumber.open(self.pdf_path, pages=list(range(1, pages_to_analyze + 1))) as sample:
+            for i, page in enumerate(sample.pages):
+                # 计算文本字符数和图像数量：只需要字符的数量，直接数字符对象，
+                # 不必像extract_text那样再做文字组装和版面分析
+                text_chars = len(page.chars)
+                image_count = len(page.images)
+                
+                # 判断页面类型
+                if text_chars > 100:  # 如果页面包含大量文本
+                    text_pages += 1
+                if image_count > 0:  # 如果页面包含图像
+                    image_pages += 1
+                
+                # 剩余页面无论结果如何都不会改变结论时，提前结束分析
+                remaining = pages_to_analyze - i - 1
+                if text_pages > 0 and text_pages >= image_pages + remaining:
+                    break
+                if text_pages + remaining < max(image_pages, 1):
+                    break
         
         # 根据分析结果判断PDF类型
         if text_pages > 0 and text_pages >= image_pages:
@@ -77,6 +292,14 @@ class SmartPDFExtractor:
         else:
             self.pdf_type = 'scanned'  # 扫描PDF或主要是图像的PDF
     
+    @property
+    def pdf_plumber(self):
+        """完整的pdfplumber文档，首次访问时才打开"""
+        if self._pdf_plumber is None:
+            import pdfplumber
+            self._pdf_plumber = pdfplumber.open(self.pdf_path)
+        return self._pdf_plumber
+    
     def get_pdf_type(self):
         """获取PDF类型"""
         return self.pdf_type
@@ -102,7 +325,8 @@ class SmartPDFExtractor:
         return info
     
     def extract_images(self, output_dir, min_size=100, filter_duplicates=True, 
-                      filter_contained=True, overlap_threshold=0.8):
+                      filter_contained=True, overlap_threshold=0.8, max_workers=None, page_format="jpeg",
+                      grayscale=False):
         """
         提取PDF中的图像
         
@@ -112,6 +336,9 @@ class SmartPDFExtractor:
             filter_duplicates (bool): 是否过滤重复图像
             filter_contained (bool): 是否过滤被包含的图像
             overlap_threshold (float): 重叠阈值
+            max_workers (int): 整页提取时的并行进程数，默认为CPU核数，为1时不使用进程池
+            page_format (str): 整页提取时的图像格式，'jpeg'或'png'
+            grayscale (bool): 整页提取时是否渲染为灰度图像（扫描文档多为黑白，供OCR使用时不需要颜色）
             
         返回:
             list: 提取的图像信息列表
@@ -123,100 +350,132 @@ class SmartPDFExtractor:
         # 根据PDF类型选择提取方法
         if self.pdf_type == 'scanned':
             print("检测到扫描PDF，使用整页提取模式...")
-            return self._extract_pages_as_images(output_dir)
+            return self._extract_pages_as_images(output_dir, format=page_format, max_workers=max_workers,
+                                                 grayscale=grayscale)
         else:
             print("检测到数字PDF，使用图像对象提取模式...")
             return self._extract_image_objects(output_dir, min_size, 
                                               filter_duplicates, filter_contained, 
                                               overlap_threshold)
     
-    def _extract_pages_as_images(self, output_dir, dpi=300, format="png"):
-        """将PDF页面作为图像提取（适用于扫描PDF）"""
+    def _extract_pages_as_images(self, output_dir, dpi=300, format="jpeg", max_workers=None, grayscale=False):
+        """将PDF页面作为图像提取（适用于扫描PDF），页数较多时使用进程池并行渲染"""
         extracted_images = []
         
-        # 遍历每一页
-        for page_idx in range(self.page_count):
-            print(f"处理第 {page_idx + 1} 页...")
-            
-            # 创建页面子目录
-            page_dir = os.path.join(output_dir, f"page_{page_idx + 1}")
-            os.makedirs(page_dir, exist_ok=True)
-            
-            # 获取页面
-            pdf_page = self.pdf_pdfium[page_idx]
-            
-            # 计算缩放因子 (DPI / 72，因为PDF的默认DPI是72)
-            scale = dpi / 72
-            
-            # 渲染页面为图像
-            bitmap = pdf_page.render(scale=scale)
-            
-            # 转换为PIL图像
-            pil_image = bitmap.to_pil()
-            
-            # 计算图像哈希值
-            img_byte_arr = BytesIO()
-            pil_image.save(img_byte_arr, format=format)
-            image_bytes = img_byte_arr.getvalue()
-            img_hash = hashlib.md5(image_bytes).hexdigest()
-            
-            # 构建输出文件名
-            output_filename = f"page_{page_idx+1}_{img_hash[:8]}.{format.lower()}"
-            output_path = os.path.join(page_dir, output_filename)
-            
-            # 保存图像
-            pil_image.save(output_path)
-            
-            # 记录图像信息
-            width, height = pil_image.size
-            image_info = {
-                "page_index": page_idx + 1,
-                "width": width,
-                "height": height,
-                "format": format.upper(),
-                "size_bytes": len(image_bytes),
-                "hash": img_hash,
-                "saved_path": output_path,
-                "extraction_method": "page_render"
-            }
-            
-            extracted_images.append(image_info)
-            print(f"  保存页面图像: {output_filename}")
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+        
+        # 各页面互相独立，页数较多时在子进程中渲染和编码（PDFium文档对象无法跨进程传递，子进程各自打开），
+        # 哈希、创建目录和写入文件在主进程中完成
+        if max_workers > 1 and self.page_count > 1:
+            with ProcessPoolExecutor(max_workers=min(max_workers, self.page_count),
+                                     initializer=_init_render_worker,
+                                     initargs=(self.pdf_path,)) as executor:
+                rendered_pages = executor.map(partial(_render_page_in_worker, dpi=dpi, format=format,
+                                                      grayscale=grayscale),
+                                              range(self.page_count))
+                for page_idx, rendered in enumerate(rendered_pages):
+                    extracted_images.append(self._save_page_image(output_dir, page_idx, *rendered, format))
+        else:
+            for page_idx in range(self.page_count):
+                rendered = _render_page_image(self.pdf_pdfium[page_idx], dpi, format, grayscale)
+                extracted_images.append(self._save_page_image(output_dir, page_idx, *rendered, format))
         
         return extracted_images
     
+    def _save_page_image(self, output_dir, page_idx, image_bytes, img_hash, width, height, format):
+        """
+        保存渲染好的页面图像
+        
+        参数:
+            output_dir (str): 输出目录
+            page_idx (int): 页码（从0开始）
+            image_bytes (bytes): 编码后的图像数据
+            img_hash (str): 图像数据的哈希值
+            width (int): 图像宽度
+            height (int): 图像高度
+            format (str): 图像格式
+            
+        返回:
+            dict: 图像信息
+        """
+        print(f"处理第 {page_idx + 1} 页...")
+        
+        # 创建页面子目录
+        page_dir = os.path.join(output_dir, f"page_{page_idx + 1}")
+        os.makedirs(page_dir, exist_ok=True)
+        
+        # 构建输出文件名
+        output_filename = f"page_{page_idx+1}_{img_hash[:8]}.{SAVE_EXTENSIONS.get(format.upper(), format.lower())}"
+        output_path = os.path.join(page_dir, output_filename)
+        
+        # 保存图像
+        with open(output_path, "wb") as f:
+            f.write(image_bytes)
+        
+        # 记录图像信息
+        image_info = {
+            "page_index": page_idx + 1,
+            "width": width,
+            "height": height,
+            "format": format.upper(),
+            "size_bytes": len(image_bytes),
+            "hash": img_hash,
+            "saved_path": output_path,
+            "extraction_method": "page_render"
+        }
+        
+        print(f"  保存页面图像: {output_filename}")
+        return image_info
+    
     def _extract_image_objects(self, output_dir, min_size=100, filter_duplicates=True, 
                               filter_contained=True, overlap_threshold=0.8):
         """提取PDF中的图像对象（适用于数字PDF）"""
+        import pypdfium2 as pdfium
+        import pypdfium2.raw as pdfium_c
+        
         # 存储图像信息
         all_images = []
         
-        # 用于检测重复图像的哈希集合
+        # 用于检测重复图像的哈希集合，保存16字节的摘要而不是32个字符的十六进制字符串，图片很多时占用的内存少得多
         image_hashes = set()
         
+        # 已提取图片对象的原始（压缩）数据流哈希，同一图片在多处出现时不必再渲染
+        stream_hashes = set()
+        
         # 用于存储每页的图像矩形信息，用于后处理过滤重叠图像
         page_rects = defaultdict(list)
         
+        # 已提交到线程池、尚未完成的保存任务，每项为 (在all_images中的位置, Future)
+        pending_saves = []
+        
         # 遍历PDF的每一页
         for page_index in range(self.page_count):
             print(f"处理第 {page_index + 1} 页...")
             
-            # 获取页面
-            page = self.pdf_plumber.pages[page_index]
+            # 获取页面：图片对象直接由PDFium枚举，不必经pdfplumber（pdfminer）解析整个页面
+            pdf_page = self.pdf_pdfium[page_index]
+            page_height = pdf_page.get_height()
             
-            # 如果按页码分组，创建页面目录
+            # 页面目录，在本页第一张需要保存的图片处创建，没有图片保留下来的页面不创建空目录
             page_dir = os.path.join(output_dir, f"page_{page_index + 1}")
-            os.makedirs(page_dir, exist_ok=True)
+            page_dir_created = False
             
             # 存储当前页面的图像和坐标
             page_images = []
             
+            # 整页渲染结果，在第一张需要提取的图片处渲染，本页其余图片都从中裁剪，
+            # 每页只渲染一次，而不是每张图片各渲染一次
+            page_bitmap = None
+            page_pil = None
+            
             # 遍历页面上的每个图片
-            for img_index, img in enumerate(page.images):
+            for img_index, img in enumerate(pdf_page.get_objects(filter=[pdfium_c.FPDF_PAGEOBJ_IMAGE])):
                 # 使用pypdfium2提取图片内容
                 try:
-                    # 获取图片位置信息
-                    x0, y0, x1, y1 = img['x0'], img['top'], img['x1'], img['bottom']
+                    # 获取图片位置信息，PDFium的坐标原点在左下角，换算为以左上角为原点
+                    left, bottom, right, top = _object_bounds(img)
+                    x0, y0, x1, y1 = left, page_height - top, right, page_height - bottom
                     width = int(x1 - x0)
                     height = int(y1 - y0)
                     
@@ -224,34 +483,43 @@ class SmartPDFExtractor:
                     if width * height < min_size:
                         continue
                     
-                    # 使用pypdfium2从PDF中提取图片
-                    pdf_page = self.pdf_pdfium[page_index]
+                    # 先对图片对象的原始数据流计算哈希，重复的图片在渲染之前就跳过
+                    if filter_duplicates:
+                        stream_hash = xxhash.xxh3_128_digest(img.get_data(decode_simple=False))
+                        if stream_hash in stream_hashes:
+                            print(f"  跳过重复图片: 第{page_index+1}页第{img_index+1}张图片")
+                            continue
+                        stream_hashes.add(stream_hash)
+                    
+                    # 使用pypdfium2渲染页面，从中裁剪出图片（scale=1.0时像素坐标与PDF坐标一致）
                     try:
-                        bitmap = pdf_page.render(
-                            scale=1.0,
-                            rotation=0,
-                            crop=(x0, y0, x1, y1)
-                        )
-                        pil_image = bitmap.to_pil()
-                    except Exception as e:
+                        if page_pil is None:
+                            page_bitmap = pdf_page.render(scale=1.0, rev_byteorder=True)
+                            page_pil = page_bitmap.to_pil()
+                        crop_x0, crop_y0 = int(x0), int(y0)
+                        pil_image = page_pil.crop((crop_x0, crop_y0, crop_x0 + width, crop_y0 + height))
+                    except pdfium.PdfiumError as e:
                         print(f"  警告: 提取第{page_index+1}页第{img_index+1}张图片时出错: {e}")
                         continue
                     
-                    # 将图片转换为字节流以计算哈希值
-                    img_byte_arr = BytesIO()
-                    pil_image.save(img_byte_arr, format=pil_image.format or 'PNG')
-                    image_bytes = img_byte_arr.getvalue()
-                    
-                    # 计算图片哈希值，用于唯一标识
-                    img_hash = hashlib.md5(image_bytes).hexdigest()
+                    # 计算图片哈希值，用于唯一标识：直接对像素数据计算，不必为了哈希先编码一遍PNG，
+                    # 尺寸一并计入，避免像素数相同的纯色图像互相冲突
+                    hasher = xxhash.xxh3_128(f"{pil_image.mode}:{pil_image.size}".encode())
+                    hasher.update(pil_image.tobytes())
+                    img_digest = hasher.digest()
                     
-                    # 如果需要过滤重复图片且哈希值已存在，则跳过
-                    if filter_duplicates and img_hash in image_hashes:
-                        print(f"  跳过重复图片: 第{page_index+1}页第{img_index+1}张图片")
-                        continue
+                    # 如果需要过滤重复图片
+                    if filter_duplicates:
+                        # 哈希值已存在，则跳过
+                        if img_digest in image_hashes:
+                            print(f"  跳过重复图片: 第{page_index+1}页第{img_index+1}张图片")
+                            continue
+                        
+                        # 添加哈希值到集合
+                        image_hashes.add(img_digest)
                     
-                    # 添加哈希值到集合
-                    image_hashes.add(img_hash)
+                    # 文件名和图片信息中使用十六进制形式的哈希值
+                    img_hash = img_digest.hex()
                     
                     # 确定图片格式
                     image_format = pil_image.format or 'PNG'
@@ -261,17 +529,19 @@ class SmartPDFExtractor:
                     output_filename = f"img{img_index+1}_{img_hash[:8]}.{image_ext}"
                     output_path = os.path.join(page_dir, output_filename)
                     
-                    # 保存图片
-                    pil_image.save(output_path)
+                    # 创建页面目录
+                    if not page_dir_created:
+                        os.makedirs(page_dir, exist_ok=True)
+                        page_dir_created = True
                     
-                    # 收集图片信息
+                    # 收集图片信息（文件大小在保存完成后填写）
                     image_info = {
                         "page_index": page_index + 1,
                         "img_index": img_index + 1,
                         "width": width,
                         "height": height,
                         "format": image_ext.upper(),
-                        "size_bytes": len(image_bytes),
+                        "size_bytes": None,
                         "hash": img_hash,
                         "saved_path": output_path,
                         "x0": x0,
@@ -284,6 +554,10 @@ class SmartPDFExtractor:
                     # 添加到结果列表
                     all_images.append(image_info)
                     
+                    # 保存图片（只在这里编码一次），交给线程池编码和写入；pil_image之后不再修改
+                    future = self._save_pool.submit(pil_image.save, output_path, **SAVE_OPTIONS.get(image_format, {}))
+                    pending_saves.append((len(all_images) - 1, future))
+                    
                     # 保存矩形信息用于后处理
                     page_rects[page_index].append({
                         "rect": (x0, y0, x1, y1),
@@ -293,9 +567,19 @@ class SmartPDFExtractor:
                     
                     print(f"  提取图像: {output_filename}")
                     
-                except Exception as e:
+                except pdfium.PdfiumError as e:
+                    # 只跳过PDFium无法读取的图片（如数据流损坏），其余异常说明代码或依赖版本有问题，直接抛出，
+                    # 不能当作“PDF中没有图片”处理
                     print(f"  警告: 处理第{page_index+1}页第{img_index+1}张图片时出错: {e}")
                     continue
+            
+            # 本页处理完毕，立即释放PDFium页面和整页渲染结果，不等垃圾回收
+            page_pil = None
+            page_bitmap = None
+            pdf_page.close()
+        
+        # 等待所有图片保存完成，保存失败的图片不参与后处理，也不计入结果
+        failed_indices = self._wait_for_saves(all_images, pending_saves)
         
         # 后处理：过滤重叠图像
         if filter_contained and overlap_threshold < 1.0 and all_images:
@@ -305,58 +589,44 @@ class SmartPDFExtractor:
             # 按页面处理
             for page_idx, rects in page_rects.items():
                 # 按面积从大到小排序
-                sorted_rects = sorted(rects, key=lambda x: x["area"], reverse=True)
+                sorted_rects = sorted((rect for rect in rects if rect["index"] not in failed_indices),
+                                      key=lambda x: x["area"], reverse=True)
                 
-                # 处理每个矩形
-                for i, rect1 in enumerate(sorted_rects):
-                    # 如果已经决定保留这个图像，跳过进一步检查
-                    if rect1["index"] in indices_to_keep:
-                        continue
-                        
-                    # 默认保留这个图像
-                    keep = True
-                    
-                    # 检查这个矩形是否与已保留的任何矩形有显著重叠
-                    for kept_idx in indices_to_keep:
-                        # 找到已保留矩形的信息
-                        kept_rect_info = next((r for r in sorted_rects if r["index"] == kept_idx), None)
-                        if not kept_rect_info:
-                            continue
-                            
-                        # 获取两个矩形的坐标
-                        x0_1, y0_1, x1_1, y1_1 = rect1["rect"]
-                        x0_2, y0_2, x1_2, y1_2 = kept_rect_info["rect"]
-                        
-                        # 计算重叠区域
-                        overlap_x0 = max(x0_1, x0_2)
-                        overlap_y0 = max(y0_1, y0_2)
-                        overlap_x1 = min(x1_1, x1_2)
-                        overlap_y1 = min(y1_1, y1_2)
-                        
-                        # 检查是否有重叠
-                        if overlap_x0 < overlap_x1 and overlap_y0 < overlap_y1:
-                            # 计算重叠面积
-                            overlap_area = (overlap_x1 - overlap_x0) * (overlap_y1 - overlap_y0)
-                            
-                            # 计算当前矩形的面积
-                            rect1_area = rect1["area"]
-                            
-                            # 如果重叠面积占当前矩形的比例超过阈值，则不保留当前矩形
-                            if overlap_area / rect1_area > overlap_threshold:
-                                keep = False
-                                break
-                    
-                    # 如果决定保留这个图像
-                    if keep:
-                        indices_to_keep.add(rect1["index"])
+                # 保留与已保留的矩形都没有显著重叠的矩形
+                for i in _select_non_overlapping(sorted_rects, overlap_threshold):
+                    indices_to_keep.add(sorted_rects[i]["index"])
             
             # 只保留选定的图像
             filtered_images = [img for i, img in enumerate(all_images) if i in indices_to_keep]
             print(f"过滤后保留 {len(filtered_images)}/{len(all_images)} 张图像")
             all_images = filtered_images
+        elif failed_indices:
+            all_images = [img for i, img in enumerate(all_images) if i not in failed_indices]
         
         return all_images
     
+    def _wait_for_saves(self, images, pending_saves):
+        """
+        等待线程池中的保存任务完成，并记录保存后的文件大小
+        
+        参数:
+            images (list): 图像信息列表
+            pending_saves (list): 保存任务列表，每项为 (在images中的位置, Future)
+            
+        返回:
+            set: 保存失败的图像在images中的位置
+        """
+        failed_indices = set()
+        for index, future in pending_saves:
+            image_info = images[index]
+            try:
+                future.result()
+                image_info["size_bytes"] = os.path.getsize(image_info["saved_path"])
+            except Exception as e:
+                print(f"  警告: 保存第{image_info['page_index']}页第{image_info['img_index']}张图片时出错: {e}")
+                failed_indices.add(index)
+        return failed_indices
+    
     def print_summary(self, images):
         """打印提取图像的摘要信息"""
         if not images:
@@ -365,11 +635,18 @@ class SmartPDFExtractor:
         
         print(f"\n成功提取 {len(images)} 张图像")
         
-        # 按页面统计
-        pages_count = {}
+        # 一次遍历统计页面、格式、尺寸和提取方法
+        size_categories = ["小图 (<10KB)", "中图 (10KB-100KB)", "大图 (>100KB)"]
+        pages_count = Counter()
+        formats = Counter()
+        size_counts = [0, 0, 0]
+        methods = Counter()
         for img in images:
-            page = img["page_index"]
-            pages_count[page] = pages_count.get(page, 0) + 1
+            pages_count[img["page_index"]] += 1
+            formats[img["format"]] += 1
+            size_bytes = img["size_bytes"]
+            size_counts[0 if size_bytes < 10 * 1024 else 1 if size_bytes < 100 * 1024 else 2] += 1
+            methods[img.get("extraction_method", "未知")] += 1
         
         print(f"包含图像的页面数: {len(pages_count)}")
         
@@ -378,42 +655,17 @@ class SmartPDFExtractor:
         for page, count in sorted(pages_count.items()):
             print(f"  - 第{page}页: {count}张图像")
         
-        # 统计图像格式
-        formats = {}
-        for img in images:
-            fmt = img["format"]
-            formats[fmt] = formats.get(fmt, 0) + 1
-        
+        # 打印图像格式统计
         print("\n图像格式统计:")
         for fmt, count in formats.items():
             print(f"  - {fmt}: {count}张")
         
-        # 统计图像尺寸分布
-        sizes = {
-            "小图 (<10KB)": 0,
-            "中图 (10KB-100KB)": 0,
-            "大图 (>100KB)": 0
-        }
-        
-        for img in images:
-            size_kb = img["size_bytes"] / 1024
-            if size_kb < 10:
-                sizes["小图 (<10KB)"] += 1
-            elif size_kb < 100:
-                sizes["中图 (10KB-100KB)"] += 1
-            else:
-                sizes["大图 (>100KB)"] += 1
-        
+        # 打印图像尺寸分布
         print("\n图像尺寸统计:")
-        for size_cat, count in sizes.items():
+        for size_cat, count in zip(size_categories, size_counts):
             print(f"  - {size_cat}: {count}张")
         
-        # 统计提取方法
-        methods = {}
-        for img in images:
-            method = img.get("extraction_method", "未知")
-            methods[method] = methods.get(method, 0) + 1
-        
+        # 打印提取方法统计
         print("\n提取方法统计:")
         for method, count in methods.items():
             method_name = "整页渲染" if method == "page_render" else "图像对象提取"
@@ -431,9 +683,11 @@ class SmartPDFExtractor:
                 print(f"  保存路径: {img['saved_path']}")
     
     def close(self):
-        """关闭PDF文档"""
-        if hasattr(self, 'pdf_plumber'):
-            self.pdf_plumber.close()
+        """关闭PDF文档和保存图片的线程池"""
+        if hasattr(self, '_save_pool'):
+            self._save_pool.shutdown(wait=True)
+        if getattr(self, '_pdf_plumber', None) is not None:
+            self._pdf_plumber.close()
         if hasattr(self, 'pdf_pdfium'):
             self.pdf_pdfium.close()
     
@@ -460,6 +714,12 @@ def main():
                         help='强制使用整页提取模式，忽略自动检测')
     parser.add_argument('--force-object-mode', '-b', action='store_true',
                         help='强制使用图像对象提取模式，忽略自动检测')
+    parser.add_argument('--page-format', '-f', choices=['jpeg', 'png'], default='jpeg',
+                        help='整页提取时的图像格式，默认为jpeg')
+    parser.add_argument('--grayscale', '-g', action='store_true',
+                        help='整页提取时渲染为灰度图像，适用于供OCR使用的黑白扫描文档')
+    parser.add_argument('--workers', '-w', type=int, default=None,
+                        help='整页提取时的并行进程数，默认为CPU核数')
     
     args = parser.parse_args()
     
@@ -487,7 +747,10 @@ def main():
             min_size=args.min_size,
             filter_duplicates=not args.no_filter_duplicates,
             filter_contained=not args.no_filter_contained,
-            overlap_threshold=args.overlap_threshold
+            overlap_threshold=args.overlap_threshold,
+            max_workers=args.workers,
+            page_format=args.page_format,
+            grayscale=args.grayscale
         )
         
         # 打印摘要